@@ -0,0 +1,166 @@
+import json
+import os
+import struct
+
+import numpy as np
+import pygame
+
+from settings import BACKGROUND_LAYERS, FROG_FRAMES, MAPCOMPONENTS, SPRITE_FOLDER
+from sprite_atlas import load_sources
+
+# Everything the renderer loads at startup, decoded and converted, in one
+# file that's read in one go. Made from the PNGs the first time the game
+# starts, and again whenever one of them or the bundle layout changes.
+BUNDLE_FILE = "assets.bundle"
+MAGIC = b"FROGPAK1"
+# magic, header length
+PREFIX = struct.Struct("<8sI")
+# Change when what's in the bundle changes
+VERSION = 2
+
+
+class Assets:
+    # textures: {path: Surface} of the map component textures and the
+    # background layers, unscaled
+    # frog_sources: SpriteAtlas sources, see sprite_atlas.load_sources()
+    def __init__(self, textures, frog_sources, data=None):
+        self.textures = textures
+        self.frog_sources = frog_sources
+        # The bundle, surfaces and arrays read from it use its memory
+        self.data = data
+
+
+def texture_files():
+    return list(
+        dict.fromkeys([path for path, _, _ in BACKGROUND_LAYERS] + MAPCOMPONENTS)
+    )
+
+
+def source_files():
+    return texture_files() + [
+        os.path.join(SPRITE_FOLDER, os.path.basename(frame)) for frame in FROG_FRAMES
+    ]
+
+
+def pixel_format():
+    # pygame.image.tobytes() format with the same bytes as the display's
+    # alpha surfaces, so surfaces made from the bundle don't need converting
+    screen = pygame.display.get_surface()
+    return "BGRA" if screen.get_masks()[0] == 0xFF0000 else "RGBA"
+
+
+def bundle_key():
+    # Sizes and times of the source files instead of their hashes, so
+    # checking the bundle is up to date doesn't read them
+    files = []
+    for path in source_files():
+        stat = os.stat(path)
+        files.append([path, stat.st_size, stat.st_mtime_ns])
+    return {
+        "version": VERSION,
+        "format": pixel_format(),
+        "files": files,
+    }
+
+
+def build_assets():
+    # Loads everything from the PNGs, like the renderer did before the bundle
+    textures = {
+        path: pygame.image.load(path).convert_alpha() for path in texture_files()
+    }
+    return Assets(textures, load_sources(FROG_FRAMES))
+
+
+def surface_array(surface, format):
+    # Pixels as (height, width, 4) in a pygame.image.tobytes() format
+    width, height = surface.get_size()
+    return np.frombuffer(pygame.image.tobytes(surface, format), np.uint8).reshape(
+        height, width, 4
+    )
+
+
+def array_surface(array, format):
+    # Uses the array's memory, no copy
+    height, width, _ = array.shape
+    return pygame.image.frombuffer(array, (width, height), format)
+
+
+def save_bundle(path, key, assets):
+    format = key["format"]
+    arrays = {}
+    for texture, surface in assets.textures.items():
+        arrays[f"texture/{texture}"] = surface_array(surface, format)
+    for (frame, facing_left), source in assets.frog_sources.items():
+        for part, array in zip(("hls", "pixels", "alpha"), source):
+            arrays[f"frog/{frame}/{int(facing_left)}/{part}"] = array
+
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        entries[name] = [offset, array.dtype.str, array.shape]
+        offset += array.nbytes
+    header = json.dumps({"key": key, "entries": entries, "size": offset}).encode()
+    # Written next to it and swapped in, so a game starting meanwhile never
+    # reads a half written bundle
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(PREFIX.pack(MAGIC, len(header)) + header)
+        for array in arrays.values():
+            file.write(np.ascontiguousarray(array).tobytes())
+    os.replace(temporary, path)
+
+
+def read_bundle(path, key):
+    # Returns Assets, or None when the bundle is missing, out of date, cut
+    # short or corrupt, and gets built again
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None
+    try:
+        return parse_bundle(data, key)
+    except (struct.error, ValueError, KeyError, TypeError):
+        return None
+
+
+def parse_bundle(data, key):
+    magic, length = PREFIX.unpack_from(data)
+    if magic != MAGIC:
+        return None
+    header = json.loads(data[PREFIX.size : PREFIX.size + length])
+    start = PREFIX.size + length
+    if header["key"] != key or len(data) != start + header["size"]:
+        return None
+
+    arrays = {}
+    for name, (offset, dtype, shape) in header["entries"].items():
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        arrays[name] = np.frombuffer(data, dtype, count, start + offset).reshape(shape)
+
+    textures = {}
+    frog_sources = {}
+    for name, array in arrays.items():
+        kind, _, rest = name.partition("/")
+        if kind == "texture":
+            textures[rest] = array_surface(array, key["format"])
+        elif kind == "frog" and name.endswith("/hls"):
+            frame, facing_left, _ = rest.rsplit("/", 2)
+            prefix = f"frog/{frame}/{facing_left}"
+            frog_sources[(frame, facing_left == "1")] = (
+                array,
+                arrays[f"{prefix}/pixels"],
+                arrays[f"{prefix}/alpha"],
+            )
+    return Assets(textures, frog_sources, data)
+
+
+def load_assets(path=BUNDLE_FILE):
+    # Needs the display, the bundle holds pixels in its alpha format
+    key = bundle_key()
+    assets = read_bundle(path, key)
+    if assets is None:
+        assets = build_assets()
+        save_bundle(path, key, assets)
+    return assets
@@ -0,0 +1,106 @@
+# Measures memory with tracemalloc: bytes per frog and per platform, and for
+# each tick of a room with bots playing, the most memory the tick had
+# allocated at once on top of what it started with and what it left behind.
+# Run from the repository root:
+#   python -m benchmarks.bench_allocations
+import random
+import statistics
+import time
+import tracemalloc
+
+from profiling import percentile
+from rooms import Room
+from settings import PLAYER_COLORS
+from simulation import MapComponent, Player
+
+ENTITIES = 1000
+PLAYERS = 100
+WARMUP_TICKS = 120
+TICKS = 600
+
+
+def entity_bytes(make):
+    # Average bytes each of ENTITIES objects holds while they're all alive
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    entities = [make(i) for i in range(ENTITIES)]
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del entities
+    return used / ENTITIES
+
+
+def play(put, players, rng, tick):
+    # Controllers send a move every few ticks, and sometimes grab
+    if tick % 6 == 0:
+        for sprite_id in list(players):
+            put("move", sprite_id, (rng.randint(-100, 100), rng.randint(-100, 100)))
+            if rng.random() < 0.02:
+                put("grab", sprite_id, None)
+
+
+def measure(label, step):
+    # step(tick) runs one tick
+    for tick in range(WARMUP_TICKS):
+        step(tick)
+    peaks = []
+    retained = []
+    times = []
+    tracemalloc.start()
+    for tick in range(WARMUP_TICKS, WARMUP_TICKS + TICKS):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        step(tick)
+        times.append(time.perf_counter() - start)
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        retained.append(current - before)
+    tracemalloc.stop()
+    print(
+        f"{label}: transient p50 {percentile(peaks, 0.5) / 1024:.1f} KiB, "
+        f"max {max(peaks) / 1024:.1f} KiB, retained "
+        f"{statistics.mean(retained):+.0f} B/tick, "
+        f"{statistics.mean(times) * 1000:.3f} ms/tick (traced)"
+    )
+
+
+def new_room(rng):
+    room = Room("bench")
+    colors = list(PLAYER_COLORS)
+    for i in range(PLAYERS):
+        room.put("connect", f"bot{i}", colors[i % len(colors)])
+    room.tick()
+    for player in room.simulation.players.values():
+        player.rect.x += rng.randint(-800, 800)
+    return room
+
+
+if __name__ == "__main__":
+    print(f"Player: {entity_bytes(lambda i: Player(i, 'Green')):.0f} B each")
+    print(
+        "MapComponent: "
+        f"{entity_bytes(lambda i: MapComponent(200, 80, None, i, 0, 'x')):.0f} "
+        "B each"
+    )
+
+    print(f"{PLAYERS} players, {TICKS} ticks")
+    rng = random.Random(0)
+    simulation = new_room(rng).simulation
+
+    def step(tick):
+        play(simulation.apply, simulation.players, rng, tick)
+        simulation.step()
+
+    measure("  Simulation.step()", step)
+    measure("  Simulation.snapshot()", lambda tick: simulation.snapshot())
+
+    rng = random.Random(0)
+    room = new_room(rng)
+
+    def tick_room(tick):
+        play(room.put, room.simulation.players, rng, tick)
+        room.tick()
+
+    measure("  Room.tick()", tick_room)
+    print(f"{len(room.simulation.players)} players alive at the end")
@@ -0,0 +1,140 @@
+# Compares the grab and death bookkeeping of the simulation against the old
+# version that scanned every frog, with frogs grabbing each other a lot,
+# and checks both play out the same. Run from the repository root:
+#   python -m benchmarks.bench_bookkeeping
+import random
+import time
+
+from settings import WINDOW_HEIGHT
+from simulation import Simulation
+
+PLAYER_COUNTS = [10, 100, 500, 1000]
+TICKS = 200
+# Chance a frog presses grab when its controller sends input
+GRAB_CHANCE = 0.1
+
+
+class ScanningSimulation(Simulation):
+    # Finds carried frogs, the lowest and highest frog and the fallen frogs
+    # by looking at every frog, the way the simulation used to
+    def carry(self, sprite, object_sprite):
+        object_sprite.grabbed = sprite.id
+        sprite.grabbing = True
+
+    def grab(self, sprite_id):
+        sprite = self.players.get(sprite_id)
+        if sprite is not None and sprite.grabbing:
+            sprite.grabbing = False
+            for object_sprite in list(self.players.values()):
+                if object_sprite.grabbed == sprite.id:
+                    object_sprite.grabbed = False
+                    object_sprite.velocity.x = -20 if sprite.facing_left else 20
+        super().grab(sprite_id)
+
+    def kill(self, sprite):
+        for grabbed_sprite in self.players.values():
+            if grabbed_sprite.grabbed == sprite.id:
+                grabbed_sprite.grabbed = False
+        self.players.pop(sprite.id, None)
+
+    def step(self, profiler=None):
+        dead = []
+        sprites_list = list(self.players.values())
+        for sprite in sprites_list:
+            sprite.update(
+                self.map_index,
+                {
+                    other.id: other
+                    for other in sprites_list
+                    if other.id != sprite.id and other.grabbed == sprite.id
+                },
+            )
+        if profiler is not None:
+            profiler.lap("physics")
+
+        lowest = None
+        highest = None
+        for player in self.players.values():
+            if lowest is None or player.rect.bottom > lowest.rect.bottom:
+                lowest = player
+            if highest is None or player.rect.top < highest.rect.top:
+                highest = player
+        if lowest is not None and lowest.rect.bottom - highest.rect.top > WINDOW_HEIGHT:
+            self.kill(lowest)
+            dead.append(lowest.id)
+        for sprite in sprites_list:
+            if sprite.rect.top > WINDOW_HEIGHT and sprite.id in self.players:
+                self.kill(sprite)
+                dead.append(sprite.id)
+        if profiler is not None:
+            profiler.lap("death_checks")
+
+        self.tick += 1
+        return dead
+
+
+class Laps:
+    # Just enough of FrameProfiler for step()
+    def __init__(self):
+        self.totals = {"physics": 0.0, "death_checks": 0.0}
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.totals[phase] += now - self.last
+        self.last = now
+
+
+def run(simulation_class, player_count):
+    random.seed(0)
+    simulation = simulation_class()
+    for i in range(player_count):
+        player = simulation.add_player(f"p{i}", "Green")
+        player.rect.x = random.randint(0, 1850)
+
+    laps = Laps()
+    grab_time = 0.0
+    history = []
+    for tick in range(TICKS):
+        if tick % 6 == 0:
+            start = time.perf_counter()
+            for sprite_id in list(simulation.players):
+                simulation.move(
+                    sprite_id, random.randint(-100, 100), random.randint(-100, 100)
+                )
+                if random.random() < GRAB_CHANCE:
+                    simulation.grab(sprite_id)
+            grab_time += time.perf_counter() - start
+        laps.last = time.perf_counter()
+        for dead_player_id in simulation.step(laps):
+            player = simulation.add_player(f"{dead_player_id}/{tick}", "Pink")
+            player.rect.x = random.randint(0, 1850)
+        history.append(
+            [
+                (player.id, tuple(player.rect), player.grabbed)
+                for player in simulation.players.values()
+            ]
+        )
+    carrying = sum(player.grabbing for player in simulation.players.values())
+    return laps.totals, grab_time, history, carrying
+
+
+if __name__ == "__main__":
+    print("ms per tick: physics (with carrying), death checks, input and grabs")
+    for player_count in PLAYER_COUNTS:
+        results = {}
+        for name, simulation_class in (
+            ("scan", ScanningSimulation),
+            ("indexed", Simulation),
+        ):
+            totals, grab_time, history, carrying = run(simulation_class, player_count)
+            results[name] = history
+            print(
+                f"{player_count:>5} players {name:<8}: "
+                f"physics {totals['physics'] / TICKS * 1000:7.2f}  "
+                f"death checks {totals['death_checks'] / TICKS * 1000:6.3f}  "
+                f"input {grab_time / TICKS * 1000:6.2f}  "
+                f"({carrying} frogs carrying at the end)"
+            )
+        if results["scan"] != results["indexed"]:
+            raise AssertionError(f"{player_count} players: the indexed version differs")
@@ -0,0 +1,83 @@
+# Times finding who a frog grabs in a crowded lobby, looking at every frog
+# versus the spatial hash of frog centers, and checks both pick the same
+# frog. Run from the repository root:
+#   python -m benchmarks.bench_grab
+import random
+import time
+
+from profiling import percentile
+from simulation import GRAB_REACH, Simulation
+
+PLAYER_COUNTS = [10, 100, 500, 1000]
+TICKS = 300
+# Chance a frog presses grab on a tick
+GRAB_CHANCE = 0.1
+
+
+def scan_target(simulation, sprite):
+    # The same rule as Simulation.grab_target(), looking at every frog
+    x, y = sprite.rect.center
+    target = None
+    nearest = None
+    for object_sprite in simulation.players.values():
+        dx = object_sprite.rect.centerx - x
+        dy = abs(object_sprite.rect.centery - y)
+        if sprite.facing_left:
+            dx = -dx
+        if 0 < dx < GRAB_REACH and dy < 10:
+            distance = dx * dx + dy * dy
+            if nearest is None or distance < nearest:
+                target = object_sprite
+                nearest = distance
+    return target
+
+
+def run(player_count):
+    random.seed(0)
+    simulation = Simulation()
+    for i in range(player_count):
+        player = simulation.add_player(f"p{i}", "Green")
+        player.rect.x = random.randint(0, 1850)
+    # Let them land on the ground, where they crowd together
+    for _ in range(60):
+        simulation.step()
+
+    scan_times = []
+    index_times = []
+    grabbed = 0
+    for tick in range(TICKS):
+        for sprite_id in list(simulation.players):
+            simulation.move(sprite_id, random.randint(-100, 100), 0)
+            if random.random() < GRAB_CHANCE:
+                sprite = simulation.players[sprite_id]
+                start = time.perf_counter()
+                expected = scan_target(simulation, sprite)
+                scan_times.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                target = simulation.grab_target(sprite)
+                index_times.append(time.perf_counter() - start)
+                if target is not expected:
+                    raise AssertionError(
+                        f"tick {tick}: {sprite_id} grabbed the wrong frog"
+                    )
+                grabbed += target is not None
+                simulation.grab(sprite_id)
+        for dead_player_id in simulation.step():
+            player = simulation.add_player(f"{dead_player_id}/{tick}", "Pink")
+            player.rect.x = random.randint(0, 1850)
+    return scan_times, index_times, grabbed
+
+
+if __name__ == "__main__":
+    print("us per grab (p50 / p99), and ms of grabs per tick")
+    for player_count in PLAYER_COUNTS:
+        scan_times, index_times, grabbed = run(player_count)
+        print(
+            f"{player_count:>5} players, {len(index_times)} grabs, {grabbed} hit a frog"
+        )
+        for name, times in (("scan", scan_times), ("index", index_times)):
+            print(
+                f"  {name:<6}: {percentile(times, 0.5) * 1e6:7.1f} / "
+                f"{percentile(times, 0.99) * 1e6:7.1f} us, "
+                f"{sum(times) / TICKS * 1000:6.3f} ms/tick"
+            )
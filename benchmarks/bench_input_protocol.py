@@ -0,0 +1,278 @@
+# Compares the controller input protocols on made up but thumb-like
+# joystick traces: the old controller sending the joystick as JSON every
+# 100 ms, and inputs sent only on change (see controls.py), as an integer
+# and as a Socket.IO binary attachment. Reports messages and bytes per
+# player per second on the websocket both ways, and how long a joystick
+# change waits before it's sent. Checks first that a room applying held
+# inputs plays the same as one getting the old moves. Run from the
+# repository root:
+#   python -m benchmarks.bench_input_protocol
+import math
+import random
+
+from socketio import packet
+
+from controls import INPUT, INPUT_INTERVAL_MS, INPUT_STEP, encode_input
+from profiling import percentile
+from recording import state_hash
+from rooms import Room
+from settings import TICK_RATE
+
+PLAYERS = 20
+SECONDS = 120
+# Touch events per second while the thumb is on the joystick
+TOUCH_RATE = 60
+OLD_INTERVAL_MS = 100
+# Socket.IO ids are 20 characters
+SPRITE_ID = "x" * 20
+CHECK_TICKS = 1200
+
+
+def thumb_trace(rng):
+    # [(ms, x, y)] of the joystick callbacks as joy.js gives them, and the
+    # times of the grab button presses
+    events = []
+    grabs = []
+    now = 0.0
+    step = 1000 / TOUCH_RATE
+    end = SECONDS * 1000
+    while now < end:
+        # Thumb off the stick
+        now += rng.uniform(300, 3000)
+        events.append((now, 0, 0))
+        # Push it somewhere, maybe up to jump, and hold it there with the
+        # thumb wobbling a little
+        target_x = rng.choice((-1, 1)) * rng.uniform(30, 100)
+        target_y = rng.uniform(60, 100) if rng.random() < 0.3 else rng.gauss(0, 10)
+        ramp = rng.uniform(100, 250)
+        hold = rng.uniform(300, 2500)
+        start = now
+        while now - start < ramp + hold:
+            now += step
+            t = min(1.0, (now - start) / ramp)
+            x = target_x * t + rng.gauss(0, 1.5)
+            y = target_y * t + rng.gauss(0, 1.5)
+            events.append((now, round(max(-100, min(100, x))), round(y)))
+        # Let go, it snaps back to the middle
+        now += step
+        events.append((now, 0, 0))
+        if rng.random() < 0.4:
+            grabs.append(start + rng.uniform(0, ramp + hold))
+    return [event for event in events if event[0] < end], sorted(grabs)
+
+
+def old_messages(events, grabs):
+    # [(ms, event, data)] the old controller sent
+    messages = []
+    index = 0
+    x = y = 0
+    for tick in range(SECONDS * 1000 // OLD_INTERVAL_MS):
+        now = tick * OLD_INTERVAL_MS
+        while index < len(events) and events[index][0] <= now:
+            _, x, y = events[index]
+            index += 1
+        # joy.js gives the position as strings
+        messages.append((now, "move", {"x": str(x), "y": str(y)}))
+    messages += [(now, "grab", {"sprite_id": SPRITE_ID}) for now in grabs]
+    return sorted(messages, key=lambda message: message[0])
+
+
+def new_messages(events, grabs):
+    # [(ms, sequence, x, y, grab)] the controller sends now, the same steps
+    # as the joystick callback, sendInput() and queueInput() in
+    # templates/index.html, and for each how long since the stick moved far
+    # enough to send it
+    messages = []
+    waits = []
+    timeline = [(now, "stick", x, y) for now, x, y in events]
+    timeline += [(now, "grab", 0, 0) for now in grabs]
+    timeline.sort(key=lambda entry: entry[0])
+    stick = [0, 0]
+    sent = [0, 0]
+    timer = None
+    moved_at = None
+
+    def send(now, grab=False):
+        nonlocal moved_at
+        messages.append((now, len(messages) + 1, stick[0], stick[1], grab))
+        waits.append(now - (now if moved_at is None else moved_at))
+        sent[:] = stick
+        moved_at = None
+        return now
+
+    last_sent = send(0)
+    for now, kind, x, y in timeline:
+        if timer is not None and timer <= now:
+            last_sent = send(timer)
+            timer = None
+        if kind == "grab":
+            timer = None
+            last_sent = send(now, grab=True)
+            continue
+        x = max(-100, min(100, x))
+        y = max(-100, min(100, y))
+        stick[:] = (
+            math.floor(x / INPUT_STEP + 0.5) * INPUT_STEP,
+            math.floor(y / INPUT_STEP + 0.5) * INPUT_STEP,
+        )
+        moved = abs(x - sent[0]) >= INPUT_STEP or abs(y - sent[1]) >= INPUT_STEP
+        if moved and moved_at is None:
+            moved_at = now
+        if moved and timer is None:
+            if now - last_sent >= INPUT_INTERVAL_MS:
+                last_sent = send(now)
+            else:
+                timer = last_sent + INPUT_INTERVAL_MS
+    if timer is not None:
+        send(timer)
+    return messages, waits
+
+
+def websocket_bytes(payload, from_client=True):
+    # Frame header, plus the mask key on frames from the browser
+    header = 2 if len(payload) < 126 else 4
+    return len(payload) + header + (4 if from_client else 0)
+
+
+def text_message_bytes(event, data, from_client=True):
+    # Engine.IO message packet "4" around the Socket.IO packet
+    encoded = packet.Packet(packet.EVENT, data=[event, data]).encode()
+    return websocket_bytes("4" + encoded, from_client)
+
+
+def binary_message_bytes(event, data):
+    # Header with a placeholder, then the bytes in a frame of their own
+    header, attachment = packet.Packet(packet.EVENT, data=[event, data]).encode()
+    return websocket_bytes("4" + header) + websocket_bytes(attachment)
+
+
+def delays(changes, send_times):
+    # changes are the times the value a protocol would send changed. For
+    # each message, ms since the first change it's the first to carry.
+    waits = []
+    index = 0
+    previous = -math.inf
+    for now in send_times:
+        while index < len(changes) and changes[index] <= previous:
+            index += 1
+        if index < len(changes) and changes[index] <= now:
+            waits.append(now - changes[index])
+        previous = now
+    return waits
+
+
+def changes(values):
+    # Times in [(ms, x, y)] where (x, y) changed
+    times = []
+    last = (0, 0)
+    for now, x, y in values:
+        if (x, y) != last:
+            times.append(now)
+            last = (x, y)
+    return times
+
+
+def check_held_inputs():
+    # One room gets a move every 6 ticks like the old controller, the other
+    # an input only when the joystick changes, and both have to end up in
+    # the same state
+    rng = random.Random(1)
+    old_room = Room("old")
+    new_room = Room("new")
+    players = [f"p{i}" for i in range(10)]
+    for room in (old_room, new_room):
+        for sprite_id in players:
+            room.put("connect", sprite_id, "Green")
+    sticks = {sprite_id: (0, 0) for sprite_id in players}
+    sequence = 0
+    acks = 0
+    for tick in range(CHECK_TICKS):
+        for sprite_id in players:
+            grab = tick % 6 == 0 and rng.random() < 0.05
+            changed = tick % 30 == 0 and rng.random() < 0.5
+            if changed:
+                sticks[sprite_id] = (
+                    rng.randrange(-100, 101, INPUT_STEP),
+                    rng.randrange(-100, 101, INPUT_STEP),
+                )
+            if tick % 6 == 0:
+                old_room.put("move", sprite_id, sticks[sprite_id])
+                if grab:
+                    old_room.put("grab", sprite_id)
+            if changed or grab or tick == 0:
+                sequence += 1
+                new_room.put("input", sprite_id, (sequence, *sticks[sprite_id], grab))
+        old_room.tick()
+        acks += sum(event == "input_ack" for event, _, _ in new_room.tick())
+    if state_hash(old_room.simulation) != state_hash(new_room.simulation):
+        raise AssertionError("held inputs play differently from repeated moves")
+    return sequence, acks
+
+
+if __name__ == "__main__":
+    sent, acked = check_held_inputs()
+    print(
+        f"Held inputs play the same as moves every {OLD_INTERVAL_MS} ms for "
+        f"{CHECK_TICKS} ticks ({sent} inputs sent, {acked} acks)"
+    )
+
+    rng = random.Random(0)
+    traces = [thumb_trace(rng) for _ in range(PLAYERS)]
+    results = {"old": [0, 0, 0, 0, []], "integer": [0, 0, 0, 0, []], "binary": None}
+    binary_bytes = 0
+    for events, grabs in traces:
+        old = old_messages(events, grabs)
+        result = results["old"]
+        result[0] += len(old)
+        result[1] += sum(text_message_bytes(event, data) for _, event, data in old)
+        result[4] += delays(
+            changes(events), [now for now, event, _ in old if event == "move"]
+        )
+
+        new, waits = new_messages(events, grabs)
+        result = results["integer"]
+        result[0] += len(new)
+        result[1] += sum(
+            text_message_bytes("input", encode_input(*message[1:])) for message in new
+        )
+        # The server acks every input the tick it applies it
+        result[2] += len(new)
+        result[3] += sum(
+            text_message_bytes("input_ack", message[1] & 0xFFFF, from_client=False)
+            for message in new
+        )
+        result[4] += waits
+        binary_bytes += sum(
+            binary_message_bytes(
+                "input", encode_input(*message[1:]).to_bytes(INPUT.size, "big")
+            )
+            for message in new
+        )
+
+    player_seconds = PLAYERS * SECONDS
+    touches = sum(len(events) for events, _ in traces) / player_seconds
+    print(
+        f"{PLAYERS} players, {SECONDS} s each, {touches:.0f} joystick changes "
+        "per player per second"
+    )
+    print(
+        f"{'protocol':<34} {'up msg/s':>8} {'up B/s':>7} {'down msg/s':>10} "
+        f"{'down B/s':>8} {'delay p50':>9} {'p99':>6}"
+    )
+    for name, label in (
+        ("old", f"JSON every {OLD_INTERVAL_MS} ms"),
+        ("integer", "inputs on change, integer"),
+    ):
+        messages, up, acks, down, waits = results[name]
+        print(
+            f"{label:<34} {messages / player_seconds:>8.1f} "
+            f"{up / player_seconds:>7.0f} {acks / player_seconds:>10.1f} "
+            f"{down / player_seconds:>8.0f} {percentile(waits, 0.5):>7.1f}ms "
+            f"{percentile(waits, 0.99):>4.0f}ms"
+        )
+    messages = results["integer"][0]
+    print(
+        f"{'inputs on change, binary attachment':<34} "
+        f"{messages * 2 / player_seconds:>8.1f} {binary_bytes / player_seconds:>7.0f}"
+    )
+    print(f"Ticks are {1000 / TICK_RATE:.1f} ms")
@@ -0,0 +1,118 @@
+# Saves a tall generated tower to a map file, then compares loading all of
+# it with streaming chunks in and out while a frog climbs to the top: load
+# time, components in memory and Python memory use. Also checks that a
+# streamed map plays tick for tick the same as a fully loaded one. Run from
+# the repository root:
+#   python -m benchmarks.bench_map_streaming
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_numpy_physics import drive, state
+from benchmarks.bench_spatial_index import build_tower
+from mapfile import MapFile, MapStreamer, load_map, save_map
+from settings import MAP_FILE
+from simulation import Simulation
+
+PLATFORM_COUNTS = [10000, 100000]
+# Pixels the frog climbs per tick, much faster than a real frog
+CLIMB_SPEED = 40
+EQUIVALENCE_TICKS = 2000
+
+
+def check_equivalence(players=30):
+    histories = []
+    for stream in (False, True):
+        random.seed(3)
+        if stream:
+            simulation = Simulation(map_components=[])
+            streamer = MapStreamer(MapFile(MAP_FILE), simulation)
+        else:
+            simulation = Simulation()
+        for i in range(players):
+            player = simulation.add_player(f"p{i}", "Green")
+            player.rect.x += random.randint(-900, 900)
+        history = []
+        for tick in range(EQUIVALENCE_TICKS):
+            if stream:
+                streamer.update()
+            drive(simulation, tick)
+            for dead_player_id in simulation.step():
+                player = simulation.add_player(f"{dead_player_id}/{tick}", "Pink")
+                player.rect.x += random.randint(-900, 900)
+            history.append(state(simulation))
+        histories.append(history)
+
+    for tick, (expected, actual) in enumerate(zip(*histories)):
+        if expected != actual:
+            raise AssertionError(f"streamed map diverged at tick {tick}")
+
+
+def full_load(path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    simulation = Simulation(map_components=load_map(path))
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, len(simulation.map_index), memory
+
+
+def streamed_climb(path, height):
+    tracemalloc.start()
+    start = time.perf_counter()
+    simulation = Simulation(map_components=[])
+    streamer = MapStreamer(MapFile(path), simulation)
+    player = simulation.add_player("climber", "Green")
+    streamer.update()
+    first_load = time.perf_counter() - start
+
+    most_loaded = 0
+    ticks = 0
+    slowest = 0
+    start = time.perf_counter()
+    while player.rect.y > -height:
+        player.rect.y -= CLIMB_SPEED
+        tick_start = time.perf_counter()
+        streamer.update()
+        slowest = max(slowest, time.perf_counter() - tick_start)
+        most_loaded = max(most_loaded, len(simulation.map_index))
+        ticks += 1
+    per_tick = (time.perf_counter() - start) / ticks
+    memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    streamer.map_file.close()
+    return first_load, most_loaded, memory, per_tick, slowest, streamer
+
+
+if __name__ == "__main__":
+    check_equivalence()
+    print("Streamed map plays the same as the fully loaded one")
+
+    with tempfile.TemporaryDirectory() as folder:
+        for platform_count in PLATFORM_COUNTS:
+            path = os.path.join(folder, "tower.frogmap")
+            platforms = build_tower(platform_count)
+            save_map(path, platforms)
+            height = -min(component.rect.top for component in platforms)
+            print(
+                f"{platform_count} platforms, {height / 100:.0f} m tall, "
+                f"{os.path.getsize(path) / 1024:.0f} KiB on disk"
+            )
+
+            elapsed, count, memory = full_load(path)
+            print(
+                f"  full load: {elapsed * 1000:8.1f} ms  {count:>7} components  "
+                f"{memory / 2**20:6.1f} MiB peak"
+            )
+            first, most, memory, per_tick, slowest, streamer = streamed_climb(
+                path, height
+            )
+            print(
+                f"  streamed:  {first * 1000:8.1f} ms  {most:>7} components  "
+                f"{memory / 2**20:6.1f} MiB peak, "
+                f"{per_tick * 1e6:.0f} us/tick (max {slowest * 1000:.1f} ms), "
+                f"{streamer.loads} chunk loads, {streamer.unloads} unloads"
+            )
@@ -0,0 +1,97 @@
+# Checks that the NumPy physics backend matches Player.update() and compares
+# the time per tick of both as the number of players grows. Run from the
+# repository root:
+#   python -m benchmarks.bench_numpy_physics
+import random
+import time
+
+from simulation import Simulation
+
+PLAYER_COUNTS = [10, 100, 500, 1000]
+TICKS = 200
+EQUIVALENCE_TICKS = 3000
+
+
+def drive(simulation, tick, grabs=True):
+    # Controllers send a move every few ticks and grab now and then
+    if tick % 6 == 0:
+        for sprite_id in list(simulation.players):
+            simulation.move(
+                sprite_id, random.randint(-100, 100), random.randint(-100, 100)
+            )
+            if grabs and random.random() < 0.02:
+                simulation.grab(sprite_id)
+
+
+def state(simulation):
+    return [
+        (
+            player.id,
+            tuple(player.rect),
+            tuple(player.velocity),
+            player.frame,
+            player.grabbed,
+            player.state,
+            player.animation_counter,
+        )
+        for player in simulation.players.values()
+    ]
+
+
+def check_equivalence(players=40):
+    histories = []
+    for physics in ("python", "numpy"):
+        random.seed(1)
+        simulation = Simulation(physics=physics)
+        for i in range(players):
+            player = simulation.add_player(f"p{i}", "Green")
+            player.rect.x += random.randint(-900, 900)
+        history = []
+        for tick in range(EQUIVALENCE_TICKS):
+            drive(simulation, tick)
+            for dead_player_id in simulation.step():
+                # Respawn so there are always frogs to compare
+                player = simulation.add_player(f"{dead_player_id}/{tick}", "Pink")
+                player.rect.x += random.randint(-900, 900)
+            history.append(state(simulation))
+        histories.append(history)
+
+    for tick, (expected, actual) in enumerate(zip(*histories)):
+        if expected != actual:
+            raise AssertionError(f"numpy physics diverged at tick {tick}")
+
+
+def time_per_tick(physics, player_count):
+    random.seed(0)
+    simulation = Simulation(physics=physics)
+    for i in range(player_count):
+        player = simulation.add_player(f"p{i}", "Green")
+        player.rect.x = random.randint(0, 1850)
+    players = list(simulation.players.values())
+
+    elapsed = 0
+    for tick in range(TICKS):
+        # Grabbing frogs take the same Player.update() path in both backends
+        drive(simulation, tick, grabs=False)
+        # Only time the physics, the death rules would thin the crowd out
+        start = time.perf_counter()
+        if simulation.physics is not None:
+            simulation.physics.update(players)
+        else:
+            for player in players:
+                player.update(simulation.map_index)
+        elapsed += time.perf_counter() - start
+    return elapsed / TICKS * 1000
+
+
+if __name__ == "__main__":
+    check_equivalence()
+    print(f"numpy physics matches Player.update() for {EQUIVALENCE_TICKS} ticks")
+    print(f"{'players':>8} {'python ms/tick':>15} {'numpy ms/tick':>14} {'speedup':>8}")
+    for player_count in PLAYER_COUNTS:
+        python_ms = time_per_tick("python", player_count)
+        numpy_ms = time_per_tick("numpy", player_count)
+        print(
+            f"{player_count:>8} {python_ms:>15.3f} {numpy_ms:>14.3f} "
+            f"{python_ms / numpy_ms:>7.1f}x"
+        )
@@ -0,0 +1,104 @@
+# Compares loading the frog frames of every PLAYER_COLORS color from the
+# PNGs made by rotate_colors.py with shading them from the original frames
+# at runtime, checks both give the same pixels, then times shading new
+# colors as players join and checks the atlas memory stays bounded with
+# hundreds of colors. Run from the repository root:
+#   python -m benchmarks.bench_palette
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from palette import player_color
+from profiling import percentile
+from settings import FROG_FRAMES, PLAYER_COLORS
+from sprite_atlas import SPRITE_SCALE, SpriteAtlas, load_sources
+
+JOINING_PLAYERS = 500
+
+
+def load_baked(frames, colors, scale=SPRITE_SCALE):
+    # SpriteAtlas before runtime shading, one PNG per frame and color
+    surfaces = {}
+    for frame in frames:
+        filename, file_extension = os.path.splitext(frame)
+        for color in colors:
+            image = pygame.image.load(filename + color + file_extension).convert_alpha()
+            for facing_left in (False, True):
+                surface = image
+                if facing_left:
+                    surface = pygame.transform.flip(surface, True, False)
+                surface = pygame.transform.scale(
+                    surface,
+                    (
+                        int(surface.get_width() * scale),
+                        int(surface.get_height() * scale),
+                    ),
+                )
+                surfaces[(frame, color, facing_left)] = surface
+    return surfaces
+
+
+def pixels(surface):
+    return np.dstack(
+        (pygame.surfarray.array3d(surface), pygame.surfarray.array_alpha(surface))
+    )
+
+
+if __name__ == "__main__":
+    pygame.init()
+    pygame.display.set_mode((100, 100))
+
+    start = time.perf_counter()
+    baked = load_baked(FROG_FRAMES, PLAYER_COLORS)
+    print(
+        f"Baked PNGs, {len(PLAYER_COLORS)} colors: "
+        f"{(time.perf_counter() - start) * 1000:.0f} ms"
+    )
+    start = time.perf_counter()
+    atlas = SpriteAtlas(load_sources(FROG_FRAMES))
+    loaded = time.perf_counter() - start
+    shade_times = []
+    for (frame, color, facing_left), surface in baked.items():
+        start = time.perf_counter()
+        shaded = atlas.get(frame, color, facing_left)
+        shade_times.append(time.perf_counter() - start)
+    print(
+        f"Runtime shading: {loaded * 1000:.0f} ms to load the original frames, "
+        f"{sum(shade_times) * 1000:.0f} ms to shade {len(PLAYER_COLORS)} colors"
+    )
+    different = sum(
+        not np.array_equal(pixels(surface), pixels(atlas.get(*key)))
+        for key, surface in baked.items()
+    )
+    print(f"  {different} of {len(baked)} frames differ from the PNGs")
+
+    # Players join with colors nobody had before, and their frogs are drawn
+    # in every frame and both directions over the next seconds
+    atlas = SpriteAtlas(atlas.sources)
+    surface_times = []
+    color_times = []
+    peak = 0
+    for index in range(JOINING_PLAYERS):
+        color = player_color(index)
+        color_start = time.perf_counter()
+        for frame in FROG_FRAMES:
+            for facing_left in (False, True):
+                start = time.perf_counter()
+                atlas.get(frame, color, facing_left)
+                surface_times.append(time.perf_counter() - start)
+        color_times.append(time.perf_counter() - color_start)
+        peak = max(peak, atlas.memory_usage())
+    print(
+        f"{JOINING_PLAYERS} players with new colors: first draw of a frame p50 "
+        f"{percentile(surface_times, 0.5) * 1000:.2f} ms, max "
+        f"{max(surface_times) * 1000:.2f} ms, every frame of a color "
+        f"{percentile(color_times, 0.5) * 1000:.1f} ms"
+    )
+    print(
+        f"  {len(atlas.colors)} colors kept, peak {peak / 1024 / 1024:.1f} MiB "
+        f"({peak / len(atlas.colors) / 1024:.0f} KiB a color)"
+    )
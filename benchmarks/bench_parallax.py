@@ -0,0 +1,167 @@
+# Compares drawing the background as one copy of the image scaled to the
+# window width, like the renderer used to, with parallax layers that repeat
+# strips of it (see parallax.py): frame time, memory held by the scaled
+# pixels and how much of the screen is left uncovered as the camera climbs
+# the tower. Checks first that both draw the same pixels wherever the old
+# copy covered the screen, then times drawing more layers. Run from the
+# repository root:
+#   python -m benchmarks.bench_parallax
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import time
+
+import pygame
+
+from parallax import ParallaxLayer
+from profiling import percentile
+from settings import BACKGROUND_LAYERS, MAPCOMPONENTS, WINDOW_HEIGHT, WINDOW_WIDTH
+
+# How high up the tower the camera is, in map pixels
+HEIGHTS = [0, 10000, 100000, 1000000]
+FRAMES = 300
+# Map pixels the camera climbs each frame, a frog jumping up as fast as it can
+CLIMB_SPEED = 12
+# The renderer cleared the screen to white, this shows what's uncovered
+UNCOVERED = (255, 0, 255)
+LAYER_COUNTS = [1, 2, 3]
+
+
+class FullBackground:
+    # The old renderer background
+    def __init__(self, image, depth, position):
+        self.image = pygame.transform.scale(
+            image,
+            (WINDOW_WIDTH, WINDOW_WIDTH / image.get_width() * image.get_height()),
+        ).convert_alpha()
+        self.depth = depth
+        self.position = position
+
+    def draw(self, surface, camera_position):
+        surface.fill(UNCOVERED)
+        surface.blit(
+            self.image,
+            (
+                self.position[0] - camera_position.x * self.depth,
+                self.position[1] - camera_position.y * self.depth,
+            ),
+        )
+
+    def memory_usage(self):
+        return self.image.get_pitch() * self.image.get_height()
+
+
+class Layers:
+    def __init__(self, layers):
+        self.layers = layers
+
+    def draw(self, surface, camera_position):
+        if not self.layers[0].opaque:
+            surface.fill(UNCOVERED)
+        for layer in self.layers:
+            layer.draw(surface, camera_position)
+
+    def memory_usage(self):
+        return sum(layer.memory_usage() for layer in self.layers)
+
+
+def make_layers(images, count):
+    # The background, then the map textures as see-through layers in front
+    path, depth, position = BACKGROUND_LAYERS[0]
+    specs = [(images[path], depth, position)]
+    for i, texture in enumerate(MAPCOMPONENTS * count):
+        specs.append((images[texture], 0.3 + 0.2 * i, (i * 150, i * 400)))
+    return Layers(
+        [
+            ParallaxLayer(image, depth, position, WINDOW_WIDTH, WINDOW_HEIGHT)
+            for image, depth, position in specs[:count]
+        ]
+    )
+
+
+def camera_path(height):
+    # Following a frog climbing from height up, wandering left and right.
+    # Whole pixels, like the renderer's camera.
+    for frame in range(FRAMES):
+        x = (frame * 7) % 2000 - 1000
+        yield pygame.Vector2(x, -height - frame * CLIMB_SPEED)
+
+
+def uncovered(surface):
+    return pygame.mask.from_threshold(surface, UNCOVERED, (1, 1, 1, 255)).count()
+
+
+def run(background, surface, height):
+    times = []
+    missing = 0
+    for camera_position in camera_path(height):
+        start = time.perf_counter()
+        background.draw(surface, camera_position)
+        times.append(time.perf_counter() - start)
+        missing += uncovered(surface)
+    return times, missing / (FRAMES * WINDOW_WIDTH * WINDOW_HEIGHT)
+
+
+def check_same_pixels(images, surface):
+    # Camera positions where the old copy covers the screen, ten apart so it
+    # lands on whole pixels too
+    path, depth, position = BACKGROUND_LAYERS[0]
+    old = FullBackground(images[path], depth, position)
+    new = make_layers(images, 1)
+    expected = pygame.Surface(surface.get_size()).convert()
+    checked = 0
+    for y in range(-20000, 30000, 370):
+        for x in (-3000, -10, 0, 10, 2500):
+            camera_position = pygame.Vector2(x, y)
+            old.draw(expected, camera_position)
+            if uncovered(expected):
+                continue
+            new.draw(surface, camera_position)
+            if pygame.image.tobytes(surface, "RGB") != pygame.image.tobytes(
+                expected, "RGB"
+            ):
+                raise AssertionError(f"layers draw differently at {x}, {y}")
+            checked += 1
+    return checked
+
+
+if __name__ == "__main__":
+    pygame.init()
+    surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    paths = dict.fromkeys([path for path, _, _ in BACKGROUND_LAYERS] + MAPCOMPONENTS)
+    images = {path: pygame.image.load(path).convert_alpha() for path in paths}
+
+    checked = check_same_pixels(images, surface)
+    print(f"Layers draw the same pixels as the scaled copy at {checked} cameras")
+
+    path, depth, position = BACKGROUND_LAYERS[0]
+    print(
+        f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}, {FRAMES} frames climbing "
+        f"{CLIMB_SPEED} px a frame from each height"
+    )
+    print(
+        f"{'background':<12} {'height':>8} {'p50 ms':>7} {'p99 ms':>7} "
+        f"{'MiB':>6} {'uncovered':>9}"
+    )
+    for height in HEIGHTS:
+        for label, background in (
+            ("scaled copy", FullBackground(images[path], depth, position)),
+            ("layers", make_layers(images, 1)),
+        ):
+            times, missing = run(background, surface, height)
+            print(
+                f"{label:<12} {height:>8} {percentile(times, 0.5) * 1000:>7.2f} "
+                f"{percentile(times, 0.99) * 1000:>7.2f} "
+                f"{background.memory_usage() / 2**20:>6.1f} {missing:>9.1%}"
+            )
+
+    print("Layers drawn, each see-through one in front of the background")
+    print(f"{'layers':>6} {'p50 ms':>7} {'MiB':>6}")
+    for count in LAYER_COUNTS:
+        background = make_layers(images, count)
+        times, _ = run(background, surface, HEIGHTS[-1])
+        print(
+            f"{count:>6} {percentile(times, 0.5) * 1000:>7.2f} "
+            f"{background.memory_usage() / 2**20:>6.1f}"
+        )
@@ -0,0 +1,182 @@
+# Compares the old game loop, which stepped the simulation and drew on one
+# thread, with the simulation and render threads of main.py, on a display
+# whose flip takes FLIP_MS like a slow projector. Reports the ticks and
+# frames per second each gets and the longest gaps between ticks, the time
+# an input can wait for the next one. Checks first that interpolated
+# snapshots start at the previous tick and end at the current one. Run from
+# the repository root:
+#   python -m benchmarks.bench_pipeline
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import random
+import threading
+import time
+
+import pygame
+
+import main
+from pipeline import SnapshotBuffer, interpolate
+from profiling import FrameProfiler, percentile
+from renderer import Renderer
+from rooms import Room
+from settings import TICK_RATE
+
+PLAYERS = 50
+SECONDS = 5
+# How long the display takes to flip, 0 and a projector that manages 30 FPS
+FLIP_MS = [0, 33]
+# Controllers send the joystick this often
+MOVE_SECONDS = 0.1
+
+
+def slow_flip(seconds):
+    # A flip that waits on the display, letting go of the GIL like SDL does
+    flip = pygame.display.flip
+
+    def wait():
+        flip()
+        time.sleep(seconds)
+
+    return wait
+
+
+def connect(room):
+    for i in range(PLAYERS):
+        room.put("connect", f"bot{i}", "Green")
+
+
+def controllers(room, stop):
+    # Bots pushing their joysticks around, like phones would
+    rng = random.Random(0)
+    while not stop.is_set():
+        for i in range(PLAYERS):
+            room.put("move", f"bot{i}", (rng.randint(-100, 100), rng.randint(0, 100)))
+        time.sleep(MOVE_SECONDS)
+
+
+def serial_loop(renderer, room, ticks, frames):
+    # game_loop() as it was, without the other rooms and the stream
+    tick_seconds = 1 / TICK_RATE
+    previous = time.perf_counter()
+    lag = 0.0
+    end = previous + SECONDS
+    while previous < end:
+        renderer.handle_events()
+        now = time.perf_counter()
+        lag = min(lag + now - previous, tick_seconds * 5)
+        previous = now
+        while lag >= tick_seconds:
+            ticks.append(time.perf_counter())
+            room.tick()
+            lag -= tick_seconds
+        renderer.draw(room.simulation.snapshot())
+        frames.append(time.perf_counter())
+        time.sleep(max(0.0, tick_seconds - lag))
+
+
+def run_serial():
+    renderer = Renderer(fullscreen=False)
+    room = Room("bench")
+    connect(room)
+    stop = threading.Event()
+    feeder = threading.Thread(target=controllers, args=(room, stop))
+    feeder.start()
+    ticks = []
+    frames = []
+    serial_loop(renderer, room, ticks, frames)
+    stop.set()
+    feeder.join()
+    renderer.close()
+    return ticks, frames
+
+
+def run_threads():
+    # main.py's simulation_loop() and render_loop()
+    main.create_rooms()
+    main.running = True
+    main.snapshots = SnapshotBuffer(1 / TICK_RATE)
+    main.tick_profiler = FrameProfiler(window=SECONDS * TICK_RATE * 2)
+    main.profiler = FrameProfiler(window=SECONDS * 1000)
+    connect(main.main_room)
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=controllers, args=(main.main_room, stop)),
+        threading.Thread(target=main.simulation_loop),
+        threading.Thread(target=main.render_loop),
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(SECONDS)
+    main.running = False
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return list(main.tick_profiler.starts), list(main.profiler.starts)
+
+
+def check_interpolation():
+    room = Room("check")
+    connect(room)
+    room.tick()
+    buffer = SnapshotBuffer(1 / TICK_RATE)
+    for _ in range(30):
+        for i in range(PLAYERS):
+            room.put("move", f"bot{i}", (60, 90))
+        room.tick()
+        previous = buffer.snapshots[1]
+        buffer.publish(room.simulation.snapshot())
+        current = buffer.snapshots[1]
+        if previous is None:
+            continue
+        if interpolate(previous, current, 0.0).players != tuple(
+            player._replace(rect=before.rect)
+            for player, before in zip(current.players, previous.players)
+        ):
+            raise AssertionError("interpolation doesn't start at the previous tick")
+        if interpolate(previous, current, 1.0) != current:
+            raise AssertionError("interpolation doesn't end at the current tick")
+    # The published map is the simulation's, in copies that don't change
+    # with it
+    published = list(buffer.snapshots[1].map_index.ordered())
+    components = list(room.simulation.map_index.ordered())
+    if [(view.rect, view.texture) for view in published] != [
+        (component.rect, component.texture) for component in components
+    ]:
+        raise AssertionError("published map isn't the simulation's")
+    components[0].rect.move_ip(0, 100)
+    if published[0].rect == components[0].rect:
+        raise AssertionError("published map changes with the simulation's")
+
+
+def rates(ticks, frames):
+    gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+    return (
+        (len(ticks) - 1) / (ticks[-1] - ticks[0]),
+        (len(frames) - 1) / (frames[-1] - frames[0]),
+        percentile(gaps, 0.99) * 1000,
+        max(gaps) * 1000,
+    )
+
+
+if __name__ == "__main__":
+    check_interpolation()
+    print("Interpolated snapshots go from the previous tick to the current one")
+
+    main.socketio.init_app(main.app, async_mode="threading")
+    flip = pygame.display.flip
+    print(f"{PLAYERS} players, {SECONDS} s each, ticks at {TICK_RATE} Hz")
+    print(
+        f"{'loop':<10} {'flip ms':>7} {'sim Hz':>7} {'render FPS':>10} "
+        f"{'tick gap p99':>12} {'max':>7}"
+    )
+    for flip_ms in FLIP_MS:
+        pygame.display.flip = slow_flip(flip_ms / 1000)
+        for label, run in (("serial", run_serial), ("threads", run_threads)):
+            sim_hz, fps, gap, longest = rates(*run())
+            print(
+                f"{label:<10} {flip_ms:>7} {sim_hz:>7.1f} {fps:>10.1f} "
+                f"{gap:>10.1f}ms {longest:>5.1f}ms"
+            )
+    pygame.display.flip = flip
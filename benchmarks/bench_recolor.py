@@ -0,0 +1,93 @@
+# Compares the old serial rotate_colors.py, converting every frog frame in
+# every color one at a time, with the batched pipeline: a full run, a run
+# with nothing changed and a run after adding a color. Also checks both make
+# the same pixels. Run from the repository root:
+#   python -m benchmarks.bench_recolor
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from rotate_colors import SOURCE_FOLDER, rotate_colors
+from settings import PLAYER_COLORS
+
+NEW_COLOR = {"Purple": (102, 51, 153)}
+
+
+def convert_color_space(input_folder, output_folder, target_color, target_color_name):
+    # rotate_colors.py before the pipeline, with the hue rotation done in
+    # signed ints like the pipeline does
+    for file_name in os.listdir(input_folder):
+        if file_name.endswith(".png") and "Frog" in file_name:
+            img = cv2.imread(
+                os.path.join(input_folder, file_name), cv2.IMREAD_UNCHANGED
+            )
+            if img is not None:
+                alpha_channel = img[:, :, 3]
+                img_rgb = cv2.cvtColor(img, cv2.COLOR_RGBA2RGB)
+                img_hls = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2HLS)
+                h, l, s = cv2.split(img_hls)
+                hls_target = cv2.cvtColor(
+                    np.uint8([[target_color]]), cv2.COLOR_RGB2HLS
+                )[0][0]
+                hue_diff = 44 - int(hls_target[0])
+                h = np.mod(h.astype(np.int16) + hue_diff, 180).astype(np.uint8)
+                l = np.clip(l * (hls_target[1] / 105), 0, 255).astype(np.uint8)
+                s = np.clip(s * (hls_target[2] / 255), 0, 255).astype(np.uint8)
+                img_hls = cv2.merge((h, l, s))
+                converted_img_rgb = cv2.cvtColor(img_hls, cv2.COLOR_HLS2RGB)
+                converted_img_rgba = cv2.cvtColor(converted_img_rgb, cv2.COLOR_RGB2RGBA)
+                converted_img_rgba[:, :, 3] = alpha_channel
+                file_name = file_name.split(".")[0] + f"{target_color_name}.png"
+                cv2.imwrite(os.path.join(output_folder, file_name), converted_img_rgba)
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as serial, tempfile.TemporaryDirectory() as batched:
+        _, seconds = timed(
+            lambda: [
+                convert_color_space(SOURCE_FOLDER, serial, color, name)
+                for name, color in PLAYER_COLORS.items()
+            ]
+        )
+        print(f"Serial, every frame and color: {seconds * 1000:.0f} ms")
+
+        for workers in sorted({1, os.cpu_count()}):
+            (made, _), seconds = timed(
+                rotate_colors, output_folder=batched, workers=workers, force=True
+            )
+            print(
+                f"Batched, {workers} workers: {made} sprites in {seconds * 1000:.0f} ms"
+            )
+        (made, skipped), seconds = timed(rotate_colors, output_folder=batched)
+        print(
+            f"Nothing changed: {made} made, {skipped} skipped in {seconds * 1000:.0f} ms"
+        )
+        (made, skipped), seconds = timed(
+            rotate_colors, output_folder=batched, colors={**PLAYER_COLORS, **NEW_COLOR}
+        )
+        print(
+            f"One color added: {made} made, {skipped} skipped in {seconds * 1000:.0f} ms"
+        )
+
+        different = [
+            name
+            for name in os.listdir(serial)
+            if not np.array_equal(
+                cv2.imread(os.path.join(serial, name), cv2.IMREAD_UNCHANGED),
+                cv2.imread(os.path.join(batched, name), cv2.IMREAD_UNCHANGED),
+            )
+        ]
+        print(
+            f"Outputs differ: {', '.join(different)}"
+            if different
+            else f"All {len(os.listdir(serial))} outputs are the same"
+        )
@@ -0,0 +1,53 @@
+# Renderer frame rate as the map gets taller: drawing every map component,
+# culling to the viewport, and dirty rects with a still camera. Also shows
+# the time spent blitting map components and frogs. Run from the repository
+# root:
+#   python -m benchmarks.bench_rendering
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from benchmarks.bench_spatial_index import build_tower
+from profiling import FrameProfiler
+from renderer import Renderer
+from simulation import Simulation
+
+PLATFORM_COUNTS = [85, 1000, 10000, 50000]
+PLAYERS = 20
+FRAMES = 60
+MODES = {"all": (False, False), "culled": (True, False), "dirty": (True, True)}
+
+
+def measure(renderer, snapshot):
+    profiler = FrameProfiler()
+    renderer.draw(snapshot)
+    for _ in range(FRAMES):
+        profiler.begin_frame()
+        renderer.draw(snapshot, profiler)
+        profiler.end_frame()
+    phases = profiler.summary()["phases_ms"]
+    return 1000 / phases["frame"]["p50"], phases["sprites"]["p50"]
+
+
+if __name__ == "__main__":
+    renderer = Renderer(fullscreen=False)
+    print("fps and ms spent blitting map components and frogs, per frame")
+    print(
+        f"{'platforms':>9} {'height':>9}"
+        + "".join(f"{mode + ' fps':>12}{mode + ' ms':>12}" for mode in MODES)
+    )
+    for platform_count in PLATFORM_COUNTS:
+        platforms = build_tower(platform_count)
+        simulation = Simulation(map_components=platforms)
+        for i in range(PLAYERS):
+            player = simulation.add_player(i, "Green")
+            player.rect.midbottom = (300 + i * 70, platforms[0].rect.top + 10)
+        snapshot = simulation.snapshot()
+
+        row = f"{platform_count:>9} {platform_count * 80:>9}"
+        for cull, dirty_rects in MODES.values():
+            renderer.cull = cull
+            renderer.dirty_rects = dirty_rects
+            fps, sprites_ms = measure(renderer, snapshot)
+            row += f"{fps:>12.0f}{sprites_ms:>12.2f}"
+        print(row)
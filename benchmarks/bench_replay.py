@@ -0,0 +1,125 @@
+# Records a few minutes of bot controllers playing, then replays the
+# recording with each physics backend, checking it plays out the same as it
+# did live and timing it. Bots drop out and come back, and respawn when
+# their frog dies, like players do. Then records more joins than fit in the
+# old 16-bit player numbers, like a long session of bots dying and joining
+# again, and checks that replays too. Run from the repository root:
+#   python -m benchmarks.bench_replay
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_rooms import ack_states, bot_input
+from profiling import percentile
+from recording import Recording, state_hash
+from replay import replay
+from rooms import Room
+from settings import TICK_RATE
+
+MINUTES = 5
+PLAYERS = 20
+# Ticks between a controller's moves, the controller page sends every 100 ms
+MOVE_EVERY = 6
+# Chance a bot disconnects each round of input, it comes back the next round
+LEAVE_CHANCE = 0.002
+# Joins in the churn recording, each one a new player. 16-bit player numbers
+# ran out at 65536.
+CHURN_JOINS = 70000
+
+
+def record(path):
+    # Plays the session through a recording room, returns its final state
+    random.seed(0)
+    room = Room("bench", record=path)
+    sprite_ids = [f"bot{i}" for i in range(PLAYERS)]
+    for sprite_id in sprite_ids:
+        room.put("connect", sprite_id, random.choice(["Green", "Pink", "Blue"]))
+    away = []
+    for tick in range(MINUTES * 60 * TICK_RATE):
+        if tick % MOVE_EVERY == 0:
+            for sprite_id in away:
+                room.put("connect", sprite_id, "Green")
+            away = [
+                sprite_id for sprite_id in sprite_ids if random.random() < LEAVE_CHANCE
+            ]
+            for sprite_id in away:
+                room.put("disconnect", sprite_id)
+            bot_input(
+                room.put,
+                [sprite_id for sprite_id in sprite_ids if sprite_id not in away],
+            )
+        events = room.tick()
+        ack_states(room.put, events)
+        for event, _, sprite_id in events:
+            if event == "frog_dead" and sprite_id not in away:
+                room.put("connect", sprite_id, "Pink")
+    room.close()
+    return state_hash(room.simulation)
+
+
+def record_churn(path):
+    # A new frog joins every tick and the oldest one leaves, with everyone
+    # moving, so there are always PLAYERS frogs but every join is a new one
+    random.seed(1)
+    room = Room("churn", record=path)
+    joined = []
+    for tick in range(CHURN_JOINS):
+        sprite_id = f"churn{tick}"
+        room.put("connect", sprite_id, "Green")
+        joined.append(sprite_id)
+        if len(joined) > PLAYERS:
+            room.put("disconnect", joined.pop(0))
+        if tick % MOVE_EVERY == 0:
+            bot_input(room.put, joined)
+        events = room.tick()
+        ack_states(room.put, events)
+    room.close()
+    return state_hash(room.simulation)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.frogrec")
+        start = time.perf_counter()
+        live = record(path)
+        print(
+            f"Recorded {MINUTES} minutes of {PLAYERS} bots in "
+            f"{time.perf_counter() - start:.1f} s, {os.path.getsize(path) / 1024:.0f} KiB"
+        )
+        recording = Recording(path)
+        print(
+            f"  {len(recording.events)} commands, "
+            f"{len(recording.checkpoints)} checkpoints"
+        )
+
+        for physics in ["python", "numpy"]:
+            start = time.perf_counter()
+            tick_times, final, mismatch = replay(recording, physics)
+            elapsed = time.perf_counter() - start
+            same = (
+                "same as live"
+                if final == live and mismatch is None
+                else f"differs from live at tick {mismatch}"
+            )
+            print(
+                f"{physics:>6} replay: {elapsed:.1f} s, "
+                f"{len(tick_times) / TICK_RATE / elapsed:.0f}x real time, tick p50 "
+                f"{percentile(tick_times, 0.5) * 1000:.3f} ms, p99 "
+                f"{percentile(tick_times, 0.99) * 1000:.3f} ms, {same}"
+            )
+
+        path = os.path.join(directory, "churn.frogrec")
+        start = time.perf_counter()
+        live = record_churn(path)
+        tick_times, final, mismatch = replay(Recording(path))
+        same = (
+            "same as live"
+            if final == live and mismatch is None
+            else f"differs from live at tick {mismatch}"
+        )
+        print(
+            f"{CHURN_JOINS} joins recorded and replayed in "
+            f"{time.perf_counter() - start:.1f} s, "
+            f"{os.path.getsize(path) / 1024:.0f} KiB, {same}"
+        )
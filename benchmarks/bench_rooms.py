@@ -0,0 +1,149 @@
+# How many rooms one core can step at 60 Hz. Times a room on its own for a
+# few player counts, with bot controllers moving, grabbing and acking the
+# state broadcasts like phones do, then runs the estimate for 20 players in
+# a RoomPool with one worker per core to check it keeps up. Run from the
+# repository root:
+#   python -m benchmarks.bench_rooms
+import os
+import random
+import time
+
+from netstate import HEADER
+from profiling import percentile
+from rooms import Room, RoomPool
+from settings import TICK_RATE
+
+PLAYER_COUNTS = [5, 20, 50]
+TICKS = 1200
+POOL_PLAYERS = 20
+POOL_SECONDS = 10
+# Ticks between a controller's moves, the controller page sends every 100 ms
+MOVE_EVERY = 6
+GRAB_CHANCE = 0.05
+
+
+def bot_input(put, sprite_ids):
+    # One round of input from every bot, put is Room.put() or RoomPool.put()
+    # with the room filled in
+    for sprite_id in sprite_ids:
+        put("move", sprite_id, (random.randint(-100, 100), random.randint(-100, 100)))
+        if random.random() < GRAB_CHANCE:
+            put("grab", sprite_id)
+
+
+def ack_states(put, events):
+    # Ack every state broadcast, the bots never drop one
+    for event, args, to in events:
+        if event == "state":
+            tick = HEADER.unpack_from(args[0])[1]
+            for sprite_id in to:
+                put("ack", sprite_id, tick)
+
+
+def time_room(player_count):
+    random.seed(0)
+    room = Room("bench")
+    sprite_ids = [f"p{i}" for i in range(player_count)]
+    for sprite_id in sprite_ids:
+        room.put("connect", sprite_id, "Green")
+    for tick in range(TICKS):
+        if tick % MOVE_EVERY == 0:
+            bot_input(room.put, sprite_ids)
+        events = room.tick()
+        ack_states(room.put, events)
+        # Dead frogs come back, like a player pressing respawn
+        for event, _, sprite_id in events:
+            if event == "frog_dead":
+                room.put("connect", sprite_id, "Pink")
+    return list(room.tick_times)
+
+
+def run_pool(room_count, workers):
+    # Returns the pool and the tick rate each room kept up, in Hz
+    random.seed(0)
+    names = [f"room{i}" for i in range(room_count)]
+    pool = RoomPool(names, workers)
+    sprite_ids = {name: [f"{name}/p{i}" for i in range(POOL_PLAYERS)] for name in names}
+    for name in names:
+        for sprite_id in sprite_ids[name]:
+            pool.put(name, "connect", sprite_id, "Green")
+    pool.flush()
+    # Starting the workers and building the rooms isn't part of the run
+    while len(pool.room_metrics) < room_count:
+        pool.events()
+        time.sleep(0.01)
+    first_ticks = {name: metrics["tick"] for name, metrics in pool.room_metrics.items()}
+    first_times = {
+        worker: metrics["time"] for worker, metrics in pool.worker_metrics.items()
+    }
+
+    start = time.perf_counter()
+    next_input = start
+    while time.perf_counter() - start < POOL_SECONDS:
+        if time.perf_counter() >= next_input:
+            for name in names:
+                bot_input(
+                    lambda kind, sprite_id, args=None: pool.put(
+                        name, kind, sprite_id, args
+                    ),
+                    sprite_ids[name],
+                )
+            next_input += MOVE_EVERY / TICK_RATE
+        pool.flush()
+        for event, args, to in pool.events():
+            if event == "state":
+                tick = HEADER.unpack_from(args[0])[1]
+                for sprite_id in to:
+                    pool.put(sprite_id.split("/")[0], "ack", sprite_id, tick)
+            elif event == "frog_dead":
+                pool.put(to.split("/")[0], "connect", to, "Pink")
+        time.sleep(0.002)
+    # Wait for a report from after the run
+    time.sleep(1.5)
+    pool.events()
+    pool.close()
+    rates = []
+    for name in names:
+        worker = pool.worker_of[name]
+        seconds = pool.worker_metrics[worker]["time"] - first_times[worker]
+        rates.append((pool.room_metrics[name]["tick"] - first_ticks[name]) / seconds)
+    return pool, rates
+
+
+if __name__ == "__main__":
+    tick_seconds = 1 / TICK_RATE
+    print(f"One room on one core, {TICKS} ticks with bot controllers")
+    estimates = {}
+    for player_count in PLAYER_COUNTS:
+        times = time_room(player_count)
+        mean = sum(times) / len(times)
+        p99 = percentile(times, 0.99)
+        estimates[player_count] = int(tick_seconds / mean)
+        print(
+            f"  {player_count:>3} players: tick mean {mean * 1000:.3f} ms, "
+            f"p99 {p99 * 1000:.3f} ms, {p99 * TICK_RATE:.1%} of the budget -> "
+            f"{int(tick_seconds / mean)} rooms per core on average, "
+            f"{int(tick_seconds / p99)} with every tick on time"
+        )
+
+    # The bots stand in for the server here, so on a machine with few cores
+    # they take a good part of the workers' time
+    cores = os.cpu_count()
+    rooms_per_core = estimates[POOL_PLAYERS]
+    print(f"Rooms of {POOL_PLAYERS} players on {cores} worker processes:")
+    while rooms_per_core > 0:
+        pool, rates = run_pool(rooms_per_core * cores, cores)
+        budgets = [metrics["budget_used"] for metrics in pool.room_metrics.values()]
+        dropped = sum(
+            metrics["dropped_ticks"] for metrics in pool.worker_metrics.values()
+        )
+        load = max(metrics["load"] for metrics in pool.worker_metrics.values())
+        print(
+            f"  {rooms_per_core:>3} per core: slowest room {min(rates):.1f} Hz, "
+            f"{dropped} ticks dropped, busiest worker {load:.0%} busy, "
+            f"p99 tick {max(budgets):.1%} of the budget"
+        )
+        if min(rates) >= TICK_RATE * 0.99 and dropped == 0:
+            print(f"Holds {TICK_RATE} Hz with {rooms_per_core} rooms per core")
+            break
+        rooms_per_core = rooms_per_core * 3 // 4
@@ -0,0 +1,41 @@
+# Steps the headless simulation as fast as possible with random inputs and
+# reports ticks per second. Run from the repository root:
+#   python -m benchmarks.bench_simulation
+import random
+import time
+
+from settings import PLAYER_COLORS
+from simulation import Simulation
+
+TICKS = 3000
+PLAYER_COUNTS = [1, 10, 50]
+
+
+def run(player_count):
+    random.seed(0)
+    simulation = Simulation()
+    colors = list(PLAYER_COLORS)
+    for i in range(player_count):
+        player = simulation.add_player(i, colors[i % len(colors)])
+        player.rect.x += random.randint(-800, 800)
+
+    start = time.perf_counter()
+    for tick in range(TICKS):
+        # Controllers send a move every few ticks
+        if tick % 6 == 0:
+            for sprite_id in list(simulation.players):
+                simulation.move(
+                    sprite_id, random.randint(-100, 100), random.randint(-100, 100)
+                )
+        simulation.step()
+    elapsed = time.perf_counter() - start
+    return TICKS / elapsed, len(simulation.players)
+
+
+if __name__ == "__main__":
+    for player_count in PLAYER_COUNTS:
+        ticks_per_second, alive = run(player_count)
+        print(
+            f"{player_count:>4} players: {ticks_per_second:9.0f} ticks/s "
+            f"({ticks_per_second / 60:.0f}x real time, {alive} alive at the end)"
+        )
@@ -0,0 +1,79 @@
+# Collision lookup cost per tick as the number of platforms grows, scanning
+# every platform versus querying the grid index. Run from the repository root:
+#   python -m benchmarks.bench_spatial_index
+import random
+import time
+
+import pygame
+
+from simulation import MapComponent, Simulation
+from spatial import GridIndex, query_rect
+
+PLATFORM_COUNTS = [100, 1000, 10000, 100000]
+PLAYERS = 20
+TICKS = 20
+
+
+def build_tower(platform_count):
+    # Roughly the density of the built-in level: one platform every 80 pixels
+    random.seed(0)
+    return [
+        MapComponent(
+            random.randint(4, 20) * 10,
+            random.randint(2, 12) * 10,
+            (255, 0, 0),
+            random.randint(-1000, 2600),
+            -i * 80,
+        )
+        for i in range(platform_count)
+    ]
+
+
+def place_players(platforms):
+    players = []
+    for component in random.sample(platforms, PLAYERS):
+        rect = pygame.Rect(0, 0, 66, 66)
+        rect.midbottom = (component.rect.centerx, component.rect.top + 10)
+        players.append(rect)
+    return players
+
+
+def time_per_tick(function):
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        function()
+    return (time.perf_counter() - start) / TICKS * 1000
+
+
+if __name__ == "__main__":
+    velocity = pygame.Vector2(3, 5)
+    print(
+        f"{'platforms':>10} {'build ms':>9} {'scan ms/tick':>13} "
+        f"{'grid ms/tick':>13} {'step ms':>8}"
+    )
+    for platform_count in PLATFORM_COUNTS:
+        platforms = build_tower(platform_count)
+        players = place_players(platforms)
+
+        start = time.perf_counter()
+        index = GridIndex()
+        for component in platforms:
+            index.insert(component)
+        build = (time.perf_counter() - start) * 1000
+
+        def scan():
+            for rect in players:
+                [c for c in platforms if rect.colliderect(c.rect)]
+
+        def grid():
+            for rect in players:
+                index.query(query_rect(rect, velocity))
+
+        simulation = Simulation(map_components=platforms)
+        for i, rect in enumerate(players):
+            simulation.add_player(i, "Green").rect = rect.copy()
+
+        print(
+            f"{platform_count:>10} {build:>9.1f} {time_per_tick(scan):>13.3f} "
+            f"{time_per_tick(grid):>13.3f} {time_per_tick(simulation.step):>8.3f}"
+        )
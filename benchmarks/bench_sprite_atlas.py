@@ -0,0 +1,67 @@
+# Compares the old per-frame PNG load/flip/scale in Player.animate with the
+# preloaded sprite atlas. Run from the repository root:
+#   python -m benchmarks.bench_sprite_atlas
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from settings import FROG_FRAMES, FROG_STATIC, PLAYER_COLORS
+from simulation import Player
+from sprite_atlas import SpriteAtlas, load_sources
+
+PLAYERS = 20
+FRAMES = 300
+
+
+def animate_from_disk(player):
+    # Player.animate before the atlas: decode, flip and scale every frame
+    frames = FROG_STATIC
+    idx = int((player.animation_counter + 1) / 5) % len(frames)
+    filename, file_extension = os.path.splitext(frames[idx])
+    image = pygame.image.load(filename + player.color + file_extension).convert_alpha()
+    if player.facing_left:
+        image = pygame.transform.flip(image, True, False)
+    image = pygame.transform.scale(
+        image,
+        (int(image.get_width() * 2 / 3), int(image.get_height() * 2 / 3)),
+    )
+    player.animation_counter += 1
+    return image
+
+
+def animate_from_atlas(player):
+    player.animate()
+    return sprite_atlas.get(player.frame, player.color, player.facing_left)
+
+
+def run(animate, players):
+    frame_times = []
+    for _ in range(FRAMES):
+        start = time.perf_counter()
+        for player in players:
+            animate(player)
+        frame_times.append(time.perf_counter() - start)
+    frame_times.sort()
+    return (
+        sum(frame_times) / len(frame_times) * 1000,
+        frame_times[int(len(frame_times) * 0.99)] * 1000,
+    )
+
+
+if __name__ == "__main__":
+    pygame.init()
+    pygame.display.set_mode((100, 100))
+    sprite_atlas = SpriteAtlas(load_sources(FROG_FRAMES))
+    colors = list(PLAYER_COLORS)
+    players = [Player(i, colors[i % len(colors)]) for i in range(PLAYERS)]
+    for i, player in enumerate(players):
+        player.facing_left = i % 2 == 1
+
+    print(f"{PLAYERS} players, {FRAMES} frames")
+    for name, animate in (("before", animate_from_disk), ("after", animate_from_atlas)):
+        mean, p99 = run(animate, players)
+        print(f"{name:>6}: mean {mean:.3f} ms/frame, p99 {p99:.3f} ms/frame")
+    print(sprite_atlas.report())
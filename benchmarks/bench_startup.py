@@ -0,0 +1,100 @@
+# Time from launching main.py to the server answering its first request for
+# the controller page, and to the first frame drawn, headless and with the
+# renderer, with and without the asset bundle built. Also times importing
+# main.py on its own. Run from the repository root, with nothing else on
+# port 5000:
+#   python -m benchmarks.bench_startup
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from assets import BUNDLE_FILE
+
+RUNS = 5
+URL = "http://127.0.0.1:5000/"
+TIMEOUT = 30
+
+
+def launch(args):
+    # Returns seconds to the first answered request and to the first frame
+    # drawn, or None for the frame when headless
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", PYTHONUNBUFFERED="1")
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "main.py",
+            "--async-mode",
+            "threading",
+            "--log-level",
+            "info",
+            *args,
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        env=env,
+    )
+    first_frame = []
+
+    def read_output():
+        for line in process.stdout:
+            # Logged by render_loop() at the info level
+            if "First frame drawn" in line and not first_frame:
+                first_frame.append(time.perf_counter() - start)
+
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+    served = None
+    try:
+        while time.perf_counter() - start < TIMEOUT:
+            try:
+                urllib.request.urlopen(URL, timeout=1).read()
+                served = time.perf_counter() - start
+                break
+            except OSError:
+                time.sleep(0.005)
+        while "--headless" not in args and not first_frame:
+            if time.perf_counter() - start > TIMEOUT:
+                break
+            time.sleep(0.005)
+    finally:
+        # pygame turns SIGTERM into a quit event, which the headless game
+        # never reads
+        process.kill()
+        process.wait()
+    return served, first_frame[0] if first_frame else None
+
+
+def median(times):
+    times = [seconds for seconds in times if seconds is not None]
+    return f"{statistics.median(times) * 1000:.0f} ms" if times else "-"
+
+
+if __name__ == "__main__":
+    imports = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], check=True)
+        imports.append(time.perf_counter() - start)
+    print(f"python -c 'import main': {median(imports)}")
+
+    scenarios = [
+        ("headless", ["--headless"], False),
+        ("renderer, no bundle", [], True),
+        ("renderer, bundle", [], False),
+    ]
+    for name, args, remove_bundle in scenarios:
+        results = []
+        for _ in range(RUNS):
+            if remove_bundle and os.path.exists(BUNDLE_FILE):
+                os.remove(BUNDLE_FILE)
+            results.append(launch(args))
+        print(
+            f"{name}: first request served {median([r[0] for r in results])}, "
+            f"first frame {median([r[1] for r in results])}"
+        )
@@ -0,0 +1,155 @@
+# Compares the size and encode time of the binary state broadcasts in
+# netstate.py against emitting the players dict as JSON, and checks that
+# decoding every delta gives back the state that was encoded. Run from the
+# repository root:
+#   python -m benchmarks.bench_state_broadcast
+import json
+import random
+import time
+
+from netstate import (
+    BROADCAST_EVERY,
+    DELTA_RECORD,
+    FRAME,
+    FRAME_CHANGED,
+    FULL_RECORD,
+    HEADER,
+    KEYFRAME,
+    MOVE,
+    MOVED,
+    MOVED_SMALL,
+    REMOVED,
+    SMALL_MOVE,
+    StateBroadcaster,
+    player_state,
+)
+from settings import PLAYER_COLORS, TICK_RATE
+from simulation import Simulation
+
+PLAYER_COUNTS = [10, 100, 500]
+BROADCASTS = 150
+
+
+def naive_json(snapshot):
+    # What emitting the players dict as it is would send
+    return json.dumps(
+        {
+            player.id: {
+                "x": player.rect[0],
+                "y": player.rect[1],
+                "frame": player.frame,
+                "color": player.color,
+                "facing_left": player.facing_left,
+            }
+            for player in snapshot.players
+        }
+    ).encode()
+
+
+def decode(payload, states):
+    # The same decoding as the controller page
+    kind, tick, base_tick, full, deltas, removed = HEADER.unpack_from(payload)
+    offset = HEADER.size
+    state = {} if kind == KEYFRAME else dict(states[base_tick])
+    for _ in range(full):
+        net_id, *values = FULL_RECORD.unpack_from(payload, offset)
+        state[net_id] = tuple(values)
+        offset += FULL_RECORD.size
+    for _ in range(deltas):
+        net_id, fields = DELTA_RECORD.unpack_from(payload, offset)
+        offset += DELTA_RECORD.size
+        x, y, frame = state[net_id]
+        if fields & MOVED_SMALL:
+            dx, dy = SMALL_MOVE.unpack_from(payload, offset)
+            x, y = x + dx, y + dy
+            offset += SMALL_MOVE.size
+        if fields & MOVED:
+            x, y = MOVE.unpack_from(payload, offset)
+            offset += MOVE.size
+        if fields & FRAME_CHANGED:
+            (frame,) = FRAME.unpack_from(payload, offset)
+            offset += FRAME.size
+        state[net_id] = (x, y, frame)
+    for _ in range(removed):
+        (net_id,) = REMOVED.unpack_from(payload, offset)
+        del state[net_id]
+        offset += REMOVED.size
+    assert offset == len(payload)
+    states[tick] = state
+    return state
+
+
+def add_frog(simulation, colors):
+    # Socket.IO ids are 20 characters
+    sprite_id = "".join(random.choices("abcdefghijklmnopqrstuvwxyz0123456789", k=20))
+    player = simulation.add_player(sprite_id, random.choice(colors))
+    player.rect.x = random.randint(0, 1850)
+
+
+def run(player_count):
+    random.seed(0)
+    simulation = Simulation()
+    colors = list(PLAYER_COLORS)
+    for _ in range(player_count):
+        add_frog(simulation, colors)
+
+    # One broadcaster where every controller acks at once, one that never
+    # gets acks and so always sends keyframes
+    delta = StateBroadcaster()
+    keyframe = StateBroadcaster()
+    totals = {"json": [0, 0.0], "keyframe": [0, 0.0], "delta": [0, 0.0]}
+    decoded = {}
+
+    for _ in range(BROADCASTS):
+        for _ in range(BROADCAST_EVERY):
+            if simulation.tick % 6 == 0:
+                for sprite_id in list(simulation.players):
+                    simulation.move(
+                        sprite_id, random.randint(-100, 100), random.randint(-100, 100)
+                    )
+            # Keep the crowd the same size, new frogs get new net ids
+            for _ in simulation.step():
+                add_frog(simulation, colors)
+        snapshot = simulation.snapshot()
+
+        start = time.perf_counter()
+        payload = naive_json(snapshot)
+        totals["json"][1] += time.perf_counter() - start
+        totals["json"][0] += len(payload)
+
+        for name, broadcaster in (("keyframe", keyframe), ("delta", delta)):
+            start = time.perf_counter()
+            broadcaster.assign_net_ids(snapshot)
+            messages = broadcaster.broadcast(snapshot)
+            totals[name][1] += time.perf_counter() - start
+            # Frogs that just joined haven't acked anything and get a keyframe
+            sent = sum(len(payload) * len(ids) for payload, ids in messages)
+            totals[name][0] += sent / len(snapshot.players)
+
+        # Check every message decodes to the real state, then ack it
+        expected = {
+            delta.net_ids[player.id]: player_state(player)
+            for player in snapshot.players
+        }
+        for payload, _ in messages:
+            if decode(payload, decoded) != expected:
+                raise AssertionError(f"delta decoded wrong at tick {snapshot.tick}")
+        for sprite_id in simulation.players:
+            delta.ack(sprite_id, snapshot.tick)
+
+    return {
+        name: (size / BROADCASTS, seconds / BROADCASTS)
+        for name, (size, seconds) in totals.items()
+    }
+
+
+if __name__ == "__main__":
+    rate = TICK_RATE / BROADCAST_EVERY
+    print(f"{BROADCASTS} broadcasts at {rate:.0f} Hz, per controller")
+    for player_count in PLAYER_COUNTS:
+        results = run(player_count)
+        for name, (size, seconds) in results.items():
+            print(
+                f"{player_count:>4} players {name:<9}: {size:8.0f} bytes "
+                f"{size * rate / 1024:8.1f} KiB/s  encode {seconds * 1e6:7.0f} us"
+            )
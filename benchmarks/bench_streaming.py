@@ -0,0 +1,103 @@
+# Runs the game with the renderer at 60 Hz for a few seconds at a time,
+# without streaming and then streaming to fast and slow viewers, and
+# compares game frame times and the frame rate each viewer gets. Slow
+# viewers take a quarter of a second to receive each frame. The frogs stand
+# still and the renderer uses dirty rects, so drawing fits in the frame
+# budget and what's left is the cost of streaming. Run from the repository
+# root:
+#   python -m benchmarks.bench_streaming
+import os
+import random
+import threading
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from profiling import percentile
+from renderer import Renderer
+from settings import TICK_RATE
+from simulation import Simulation
+from streaming import FrameStream
+
+SECONDS = 5
+PLAYERS = 20
+SLOW_VIEWER_DELAY = 0.25
+# (fast viewers, slow viewers, encoder threads)
+SCENARIOS = [(0, 0, 2), (1, 0, 2), (1, 3, 2), (4, 4, 1)]
+
+
+class Viewer(threading.Thread):
+    # Reads the MJPEG stream like a browser would, taking delay seconds to
+    # get each frame
+    def __init__(self, frame_stream, delay):
+        super().__init__(daemon=True)
+        self.frame_stream = frame_stream
+        self.delay = delay
+        self.frames = 0
+
+    def run(self):
+        for _ in self.frame_stream.mjpeg(time.sleep):
+            self.frames += 1
+            time.sleep(self.delay)
+
+
+def run(renderer, fast, slow, workers):
+    random.seed(0)
+    simulation = Simulation()
+    for i in range(PLAYERS):
+        player = simulation.add_player(f"p{i}", "Green")
+        player.rect.x += random.randint(-600, 600)
+    # Let them land, so the camera stands still
+    for _ in range(120):
+        simulation.step()
+    renderer.draw(simulation.snapshot())
+    frame_stream = FrameStream(workers=workers) if fast or slow else None
+    viewers = [Viewer(frame_stream, 0) for _ in range(fast)] + [
+        Viewer(frame_stream, SLOW_VIEWER_DELAY) for _ in range(slow)
+    ]
+    for viewer in viewers:
+        viewer.start()
+
+    tick_seconds = 1 / TICK_RATE
+    frame_times = []
+    start = time.perf_counter()
+    next_frame = start
+    while time.perf_counter() - start < SECONDS:
+        frame_start = time.perf_counter()
+        simulation.step()
+        renderer.draw(simulation.snapshot())
+        if frame_stream is not None:
+            frame_stream.capture(renderer.screen)
+        frame_times.append(time.perf_counter() - frame_start)
+        next_frame += tick_seconds
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+
+    metrics = None
+    if frame_stream is not None:
+        frame_stream.close()
+        metrics = frame_stream.metrics()
+    for viewer in viewers:
+        viewer.join()
+    return frame_times, len(frame_times) / elapsed, viewers, elapsed, metrics
+
+
+if __name__ == "__main__":
+    renderer = Renderer(fullscreen=False, dirty_rects=True)
+    for fast, slow, workers in SCENARIOS:
+        frame_times, fps, viewers, elapsed, metrics = run(renderer, fast, slow, workers)
+        late = sum(seconds > 1 / TICK_RATE for seconds in frame_times)
+        print(
+            f"{fast} fast and {slow} slow viewers, {workers} encoders: game "
+            f"{fps:.1f} fps, frame p50 {percentile(frame_times, 0.5) * 1000:.2f} ms, "
+            f"p99 {percentile(frame_times, 0.99) * 1000:.2f} ms, {late} over budget"
+        )
+        if metrics is None:
+            continue
+        print(
+            f"  captured {metrics['captured']}, skipped {metrics['skipped']}, "
+            f"encode p50 {metrics['encode_ms']['p50']:.1f} ms, "
+            f"{metrics['bytes_encoded'] / metrics['encoded'] / 1024:.0f} KiB a frame"
+        )
+        rates = [f"{viewer.frames / elapsed:.1f}" for viewer in viewers]
+        print(f"  viewer fps: {', '.join(rates)}")
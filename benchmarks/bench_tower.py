@@ -0,0 +1,157 @@
+# Checks that generated towers can be climbed, then times the generator and
+# measures its memory while a frog goes up 100k rows. Run from the
+# repository root:
+#   python -m benchmarks.bench_tower
+import random
+import time
+import tracemalloc
+from array import array
+
+from profiling import percentile
+from simulation import LANDING_DEPTH, Simulation
+from tower import (
+    MAX_GAP,
+    MAX_RISE,
+    PERIODS,
+    POOL_SIZE,
+    ROW_SPACING,
+    TowerGenerator,
+    row_platforms,
+)
+
+SEEDS = range(5)
+LAYOUT_ROWS = 5000
+CLIMB_ROWS = 60
+HEIGHT_ROWS = 100000
+# Rows the frog goes up per tick in the height test
+CLIMB_SPEED = 2
+
+
+def check_layout(seed):
+    # Every path platform is within a jump of the one before it, never
+    # above it, and no platforms overlap
+    period = random.Random(seed).randint(*PERIODS)
+    previous = row_platforms(0, seed, period)
+    for row in range(1, LAYOUT_ROWS):
+        platforms = row_platforms(row, seed, period)
+        x, y, width, height, _ = platforms[0]
+        last_x, last_y, last_width, _, _ = previous[0]
+        if last_y - y > MAX_RISE:
+            raise AssertionError(f"seed {seed} row {row} is out of reach")
+        if row > 1:
+            gap = max(x - (last_x + last_width), last_x - (x + width))
+            if not 0 < gap <= MAX_GAP:
+                raise AssertionError(f"seed {seed} row {row} is {gap} pixels out")
+        for x, y, width, height, _ in platforms:
+            for other in previous + platforms:
+                if other[:4] != (x, y, width, height) and (
+                    x < other[0] + other[2]
+                    and other[0] < x + width
+                    and y < other[1] + other[3]
+                    and other[1] < y + height
+                ):
+                    raise AssertionError(f"seed {seed} row {row} overlaps")
+        previous = platforms
+
+
+def climb(seed, rows=CLIMB_ROWS):
+    # A frog that walks to the edge of its platform nearest the next one,
+    # jumps and steers onto it. Returns the ticks it took to climb the rows.
+    simulation = Simulation(map_components=[])
+    tower = TowerGenerator(simulation, seed)
+    frog = simulation.add_player("climber", "Green")
+    target_row = 1
+    standing_on = None
+    for tick in range(rows * 300):
+        tower.update()
+        if standing_on is None:
+            standing_on = tower.rows[0][0].rect
+        target = tower.rows[target_row][0].rect
+        right = target.centerx > frog.rect.centerx
+        joyx = 0
+        joyy = 0
+        if frog.velocity.y == 0 and frog.rect.bottom > target.top:
+            # Take off from the edge, not from under the target
+            if right and frog.rect.right < min(standing_on.right, target.left) - 10:
+                joyx = 25
+            elif (
+                not right and frog.rect.left > max(standing_on.left, target.right) + 10
+            ):
+                joyx = -25
+            else:
+                joyy = 100
+        if frog.velocity.y != 0 or joyy:
+            if not target.left + 30 < frog.rect.centerx < target.right - 30:
+                joyx = 100 if right else -100
+        simulation.move(frog.id, joyx, joyy)
+        simulation.step()
+
+        if frog.id not in simulation.players:
+            raise AssertionError(f"seed {seed}: the climber fell at row {target_row}")
+        if (
+            frog.velocity.y == 0
+            and frog.rect.bottom == target.top + LANDING_DEPTH
+            and target.left < frog.rect.centerx < target.right
+        ):
+            standing_on = target
+            target_row += 1
+            if target_row > rows:
+                return tick
+    raise AssertionError(f"seed {seed}: the climber got stuck at row {target_row}")
+
+
+def height_test(trace=False):
+    # Timed without tracemalloc, which slows everything down
+    simulation = Simulation(map_components=[])
+    tower = TowerGenerator(simulation, 0)
+    frog = simulation.add_player("climber", "Green")
+    tower.update(rows_per_update=100)
+
+    ticks = HEIGHT_ROWS // CLIMB_SPEED
+    # Allocated up front so the memory numbers only show the tower
+    times = array("d", bytes(8 * ticks))
+    most = 0
+    memory = {}
+    if trace:
+        tracemalloc.start()
+    for tick in range(ticks):
+        frog.rect.y -= CLIMB_SPEED * ROW_SPACING
+        start = time.perf_counter()
+        tower.update()
+        times[tick] = time.perf_counter() - start
+        most = max(most, len(simulation.map_index))
+        if trace and (tick + 1) % (ticks // 10) == 0:
+            memory[(tick + 1) * CLIMB_SPEED] = tracemalloc.get_traced_memory()[0]
+    if trace:
+        tracemalloc.stop()
+    return times, most, memory, tower
+
+
+if __name__ == "__main__":
+    for seed in SEEDS:
+        check_layout(seed)
+    print(f"{len(SEEDS)} seeds x {LAYOUT_ROWS} rows: every platform within reach")
+
+    for seed in SEEDS:
+        ticks = climb(seed)
+        print(
+            f"seed {seed}: scripted frog climbed {CLIMB_ROWS} rows "
+            f"({CLIMB_ROWS * ROW_SPACING / 100:.0f} m) in {ticks / 60:.0f} s"
+        )
+
+    times, most, _, tower = height_test()
+    print(
+        f"Up {HEIGHT_ROWS} rows ({HEIGHT_ROWS * ROW_SPACING / 100000:.0f} km), "
+        f"{CLIMB_SPEED} new rows a tick: update p50 {percentile(times, 0.5) * 1e6:.0f} us, "
+        f"p99 {percentile(times, 0.99) * 1e6:.0f} us, max {max(times) * 1e6:.0f} us"
+    )
+    print(
+        f"  at most {most} platforms live out of a pool of {POOL_SIZE}, "
+        f"{tower.builds} rows built, {tower.retires} retired"
+    )
+    _, _, memory, _ = height_test(trace=True)
+    print(
+        "  traced memory every 10k rows: "
+        + ", ".join(f"{size / 1024:.0f}" for size in memory.values())
+        + " KiB"
+    )
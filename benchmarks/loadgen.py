@@ -0,0 +1,94 @@
+# Opens N simulated phone controllers against a running server and reports
+# event throughput and input-to-tick latency. Start the server first, e.g.
+#   python main.py --headless --async-mode eventlet
+# then from the repository root:
+#   python -m benchmarks.loadgen --clients 200 --seconds 30
+# Needs: pip install "python-socketio[asyncio_client]" aiohttp
+import argparse
+import asyncio
+import random
+import time
+
+import aiohttp
+import socketio
+
+
+class Controller:
+    # One simulated phone: connects, then sends a joystick position every
+    # interval like the setInterval in templates/index.html
+    def __init__(self, url, interval):
+        self.url = url
+        self.interval = interval
+        self.client = socketio.AsyncClient(reconnection=False)
+        self.created = asyncio.Event()
+        self.sent = 0
+        self.dead = False
+        self.client.on("sprite_created", self.on_sprite_created)
+        self.client.on("frog_dead", self.on_frog_dead)
+
+    async def on_sprite_created(self, data):
+        self.created.set()
+
+    async def on_frog_dead(self, *args):
+        self.dead = True
+
+    async def run(self, until):
+        await self.client.connect(self.url, transports=["websocket"])
+        await self.created.wait()
+        # Spread the controllers out over the interval
+        await asyncio.sleep(random.random() * self.interval)
+        while time.perf_counter() < until:
+            await self.client.emit(
+                "move", {"x": random.randint(-100, 100), "y": random.randint(-100, 100)}
+            )
+            self.sent += 1
+            await asyncio.sleep(self.interval)
+        await self.client.disconnect()
+
+
+async def fetch_metrics(url, room):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url + "/metrics") as response:
+            return (await response.json())["rooms"][room]["input_queue"]
+
+
+async def main(args):
+    before = await fetch_metrics(args.url, args.room)
+    start = time.perf_counter()
+    until = start + args.seconds
+    url = f"{args.url}?room={args.room}"
+    controllers = [Controller(url, args.interval) for _ in range(args.clients)]
+    results = await asyncio.gather(
+        *(controller.run(until) for controller in controllers),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - start
+    after = await fetch_metrics(args.url, args.room)
+
+    failed = sum(1 for result in results if isinstance(result, Exception))
+    sent = sum(controller.sent for controller in controllers)
+    enqueued = after["enqueued"] - before["enqueued"]
+    coalesced = after["coalesced"] - before["coalesced"]
+    latency = after["latency_ms"]
+    print(f"controllers:      {args.clients} ({failed} failed to connect)")
+    print(f"frogs died:       {sum(controller.dead for controller in controllers)}")
+    print(f"events sent:      {sent} ({sent / elapsed:.0f}/s)")
+    print(f"events received:  {enqueued} ({enqueued / elapsed:.0f}/s)")
+    print(f"moves coalesced:  {coalesced}")
+    print(f"max queue depth:  {after['max_depth']}")
+    print(
+        f"input-to-tick:    p50 {latency['p50']:.2f} ms, p99 {latency['p99']:.2f} ms, "
+        f"max {latency['max']:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--room", default="main", help="room the controllers join")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument(
+        "--interval", type=float, default=0.05, help="seconds between moves"
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,195 @@
+# Load test with the bots from bots.py: plays N bots in a room, ticking as
+# fast as it goes, for each N in --bots, and reports tick time, frame time
+# with --render, peak memory, and how often frogs die and join again. Each N
+# runs in a fresh process so the peak memory is its own. Checks first that a
+# recording of bots replays the same, so they really go through the same
+# commands as phones. Prints a table, and with --output appends a JSON line
+# per N, tagged with the commit, to compare versions with. Run from the
+# repository root:
+#   python -m benchmarks.loadtest --bots 10 50 100 200 --output loadtest.jsonl
+# resource is Unix only.
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+# Every process would print it
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from bots import BEHAVIORS, BotController
+from profiling import percentile
+from recording import Recording, state_hash
+from replay import replay
+from rooms import Room
+from settings import TICK_RATE
+
+CHECK_BOTS = 20
+CHECK_TICKS = 20 * TICK_RATE
+
+
+def commit():
+    # The version under test, with -dirty on the end if it has changes
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def times_ms(times):
+    return {
+        "p50": percentile(times, 0.5) * 1000,
+        "p95": percentile(times, 0.95) * 1000,
+        "p99": percentile(times, 0.99) * 1000,
+        "max": max(times) * 1000,
+    }
+
+
+def run(count, behaviors, seconds, physics, tower, render):
+    # One N, in its own process. Frogs that die and join again print to
+    # stdout, which is kept for the table.
+    with contextlib.redirect_stdout(sys.stderr):
+        room = Room("loadtest", physics=physics, tower_seed=tower)
+        simulation = room.simulation
+        bots = BotController(room.put, count, behaviors)
+        renderer = None
+        if render:
+            from renderer import Renderer
+
+            renderer = Renderer(fullscreen=False)
+        tick_times = []
+        frame_times = []
+        alive = 0
+        for _ in range(seconds * TICK_RATE):
+            start = time.perf_counter()
+            events = room.tick()
+            tick_times.append(time.perf_counter() - start)
+            bots.update(simulation, events)
+            alive += len(simulation.players)
+            if renderer is not None:
+                start = time.perf_counter()
+                renderer.draw(simulation.snapshot())
+                frame_times.append(time.perf_counter() - start)
+        if renderer is not None:
+            renderer.close()
+        room.close()
+    metrics = bots.metrics()
+    return {
+        "bots": count,
+        "behaviors": list(behaviors),
+        "physics": physics,
+        "tower": tower,
+        "render": render,
+        "ticks": len(tick_times),
+        "tick_ms": times_ms(tick_times),
+        # Share of the 1 / TICK_RATE seconds a tick can take, like /metrics
+        "budget_used": percentile(tick_times, 0.99) * TICK_RATE,
+        "frame_ms": times_ms(frame_times) if frame_times else None,
+        # Peak resident memory of the process, ru_maxrss is in KiB on Linux
+        "rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "frogs_alive": alive / len(tick_times),
+        "joins": metrics["joins"],
+        "deaths": metrics["deaths"],
+        "deaths_per_minute": metrics["deaths"] / (seconds / 60),
+        "mean_life_seconds": metrics["mean_life_seconds"],
+    }
+
+
+def check_replay(behaviors):
+    # Bots send their commands through Room.put() like main.py's Socket.IO
+    # handlers, so a recording of them has to replay the same
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(
+        sys.stderr
+    ):
+        path = os.path.join(directory, "bots.frogrec")
+        room = Room("check", record=path)
+        bots = BotController(room.put, CHECK_BOTS, behaviors)
+        for _ in range(CHECK_TICKS):
+            bots.update(room.simulation, room.tick())
+        room.close()
+        _, final, mismatch = replay(Recording(path))
+    if mismatch is not None or final != state_hash(room.simulation):
+        raise AssertionError(f"bots replay differently from tick {mismatch}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--bots",
+        type=int,
+        nargs="+",
+        default=[10, 50, 100, 200, 500],
+        metavar="N",
+        help="bot counts to test",
+    )
+    parser.add_argument(
+        "--behavior",
+        action="append",
+        choices=sorted(BEHAVIORS),
+        help="what the bots do, repeat it to mix them (default: all of them)",
+    )
+    parser.add_argument("--seconds", type=int, default=30, help="game time per N")
+    parser.add_argument("--physics", choices=["python", "numpy"], default="python")
+    parser.add_argument("--tower", type=int, metavar="SEED")
+    parser.add_argument(
+        "--render",
+        action="store_true",
+        help="also draw every tick with the renderer and time the frames",
+    )
+    parser.add_argument(
+        "--output", metavar="JSONL", help="file to append a JSON line per N to"
+    )
+    args = parser.parse_args()
+    behaviors = args.behavior or sorted(BEHAVIORS)
+
+    check_replay(behaviors)
+    print(f"A recording of {CHECK_BOTS} bots replays the same")
+
+    version = {"commit": commit(), "python": platform.python_version()}
+    print(
+        f"{args.seconds} s of {'/'.join(behaviors)} bots, {args.physics} physics, "
+        f"{'tower ' + str(args.tower) if args.tower is not None else 'map'}"
+    )
+    print(
+        f"{'bots':>5} {'alive':>6} {'tick p50':>9} {'p99':>7} {'budget':>7} "
+        f"{'frame p50':>10} {'RSS MiB':>8} {'deaths/min':>10} {'life s':>7}"
+    )
+    context = multiprocessing.get_context("spawn")
+    for count in args.bots:
+        with context.Pool(1) as pool:
+            result = pool.apply(
+                run,
+                (
+                    count,
+                    behaviors,
+                    args.seconds,
+                    args.physics,
+                    args.tower,
+                    args.render,
+                ),
+            )
+        frame = f"{result['frame_ms']['p50']:>8.2f}ms" if result["frame_ms"] else "-"
+        life = result["mean_life_seconds"]
+        print(
+            f"{count:>5} {result['frogs_alive']:>6.1f} "
+            f"{result['tick_ms']['p50']:>7.2f}ms {result['tick_ms']['p99']:>5.2f}ms "
+            f"{result['budget_used']:>7.0%} {frame:>10} {result['rss_mib']:>8.1f} "
+            f"{result['deaths_per_minute']:>10.0f} "
+            f"{'-' if life is None else f'{life:.1f}':>7}"
+        )
+        if args.output:
+            with open(args.output, "a") as output:
+                output.write(json.dumps({**version, **result}) + "\n")
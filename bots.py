@@ -0,0 +1,250 @@
+import random
+
+import pygame
+
+from netstate import HEADER
+from palette import player_color
+from settings import TICK_RATE
+from simulation import GRAB_REACH, GRAVITY, JUMP_SPEED, LANDING_DEPTH
+from spatial import PointIndex
+
+# Computer controlled frogs, for load tests and for filling a room without
+# phones. Bots send the same commands a phone's Socket.IO events turn into
+# (connect, move, grab, disconnect) to the room's put(), like
+# main.send_input() does, so they go through the command queue and are
+# recorded and replayed like everyone else's. They ack the state broadcasts
+# sent to them, and join again a while after their frog dies.
+
+# Ticks between a bot's moves, like the controllers that sent one every
+# 100 ms. Bots are spread over the ticks so they don't all move at once.
+MOVE_EVERY = 6
+# Ticks a bot waits after its frog dies before joining again, like a player
+# reloading the controller page
+RESPAWN_TICKS = 3 * TICK_RATE
+# How high a frog gets with one jump, in pixels
+JUMP_HEIGHT = int(JUMP_SPEED**2 / (2 * GRAVITY))
+# How far to each side bots look for platforms and frogs, in pixels
+SIGHT = 600
+# How far over a platform a climber has to get to land on it
+CLEARANCE = 20
+# Pixels out from an edge a climber jumps from, more than it walks between
+# two moves
+TAKEOFF = 40
+# Moves a climber can go without moving before it tries something else
+STUCK_MOVES = 5
+
+
+def random_input(bot, player, simulation):
+    # Mashes the joystick and the grab button
+    rng = bot.rng
+    return rng.randint(-100, 100), rng.randint(-100, 100), rng.random() < 0.05
+
+
+def climb(bot, player, simulation):
+    # Like the scripted frog in benchmarks/bench_tower.py: walks to the edge
+    # of its platform nearest a platform it can jump onto, jumps and steers
+    # onto it. Picks the next platform while standing.
+    rect = player.rect
+    # Wedged somewhere, jump off in a random direction
+    if rect.topleft == bot.last_position:
+        bot.stuck += 1
+        if bot.stuck >= STUCK_MOVES:
+            bot.stuck = 0
+            return bot.rng.choice((-100, 100)), 100, False
+    else:
+        bot.stuck = 0
+    bot.last_position = rect.topleft
+    standing_on = platform_under(rect, simulation)
+    if standing_on is not None:
+        bot.target = reachable_platform(rect, standing_on, simulation)
+    target = bot.target
+    if target is None:
+        # Nothing in reach, wander and hope
+        return bot.rng.choice((-100, 100)), 100, False
+    right = target.centerx > rect.centerx
+    toward = 100 if right else -100
+    # Close enough sideways to hit its head on the target going up
+    near = rect.right > target.left - TAKEOFF and rect.left < target.right + TAKEOFF
+    if standing_on is not None and rect.bottom > target.top:
+        # Take off from the edge, not from under the target
+        if rect.right > target.left - 10 and rect.left < target.right + 10:
+            return -25 if right else 25, 0, False
+        if right and rect.right < min(standing_on.right, target.left) - TAKEOFF:
+            return 25, 0, False
+        if not right and rect.left > max(standing_on.left, target.right) + TAKEOFF:
+            return -25, 0, False
+        return 0 if near else toward, 100, False
+    if target.left + 30 < rect.centerx < target.right - 30:
+        # Over it, drop onto it
+        return 0, 0, False
+    if near and rect.bottom > target.top:
+        # Wait until it's above the target's top
+        return 0, 0, False
+    return toward, 0, False
+
+
+def platform_under(rect, simulation):
+    # Rect of the platform rect is standing on, or None
+    feet = pygame.Rect(rect.left, rect.bottom - LANDING_DEPTH, rect.width, 1)
+    for component in simulation.map_index.query(feet):
+        if component.rect.top == rect.bottom - LANDING_DEPTH:
+            return component.rect
+    return None
+
+
+def reachable_platform(rect, standing_on, simulation):
+    # Rect of a platform above standing_on low enough to jump onto, the one
+    # with the shortest gap sideways from standing_on's edges
+    lowest = rect.bottom - JUMP_HEIGHT + CLEARANCE
+    sight = pygame.Rect(rect.centerx - SIGHT, lowest, SIGHT * 2, JUMP_HEIGHT)
+    platform = None
+    for component in simulation.map_index.query(sight):
+        other = component.rect
+        if lowest <= other.top < standing_on.top:
+            gap = max(other.left - standing_on.right, standing_on.left - other.right)
+            if platform is None or gap < platform[0]:
+                platform = (gap, other)
+    return None if platform is None else platform[1]
+
+
+def grief(bot, player, simulation):
+    # Chases the nearest frog, grabs it and throws it
+    if player.grabbing:
+        # Carry it a while, grabbing again throws it
+        return 0, 0, bot.rng.random() < 0.2
+    rect = player.rect
+    target = None
+    for other in bot.controller.frog_index.query(rect.inflate(SIGHT * 2, SIGHT)):
+        if other is not player:
+            dx = other.rect.centerx - rect.centerx
+            dy = other.rect.centery - rect.centery
+            if target is None or abs(dx) + abs(dy) < abs(target[0]) + abs(target[1]):
+                target = (dx, dy)
+    if target is None:
+        return bot.rng.randint(-100, 100), 0, False
+    dx, dy = target
+    # Facing it, level with it and close enough
+    grab = (dx < 0) == player.facing_left and abs(dx) < GRAB_REACH and abs(dy) < 10
+    return steer(dx), 100 if dy < -JUMP_HEIGHT // 2 else 0, grab
+
+
+def steer(dx):
+    # Joystick x to head dx pixels sideways. Between 0 and 5 would turn the
+    # frog left, so it's pushed to 10.
+    joyx = max(-100, min(100, dx))
+    return 10 if 0 <= joyx <= 5 else joyx
+
+
+BEHAVIORS = {"random": random_input, "climber": climb, "griefer": grief}
+
+
+class Bot:
+    def __init__(self, controller, name, behavior, rng, offset):
+        self.controller = controller
+        self.name = name
+        self.behavior = behavior
+        self.rng = rng
+        # The tick it moves on, out of every MOVE_EVERY
+        self.offset = offset
+        # Like a phone's Socket.IO id, a new one each time it joins, None
+        # while dead
+        self.sprite_id = None
+        self.lives = 0
+        self.joined_tick = 0
+        self.respawn_tick = None
+        # Platform rect a climber is heading for, and where its frog was at
+        # its last move and for how many moves
+        self.target = None
+        self.last_position = None
+        self.stuck = 0
+
+
+class BotController:
+    # Plays count bots in one room. behaviors are BEHAVIORS names, handed out
+    # to the bots in turn. Call update() on the game thread after every tick
+    # of the room, with the events the tick returned.
+    def __init__(self, put, count, behaviors=("random",), seed=0):
+        self.put = put
+        self.bots = [
+            Bot(
+                self,
+                f"bot{i}",
+                BEHAVIORS[behaviors[i % len(behaviors)]],
+                random.Random(f"{seed}/{i}"),
+                i % MOVE_EVERY,
+            )
+            for i in range(count)
+        ]
+        # sprite id -> bot, of the bots whose frog is alive
+        self.playing = {}
+        # Frog centers, for the griefers. Rebuilt once a tick when one moves.
+        self.frog_index = PointIndex()
+        self.frog_index_tick = None
+        self.joins = 0
+        self.deaths = 0
+        # Ticks each frog that died was alive for
+        self.lifetimes = []
+        for bot in self.bots:
+            self.join(bot, 0)
+
+    def join(self, bot, tick):
+        bot.lives += 1
+        bot.sprite_id = f"{bot.name}.{bot.lives}"
+        bot.joined_tick = tick
+        bot.respawn_tick = None
+        bot.target = None
+        self.playing[bot.sprite_id] = bot
+        self.put("connect", bot.sprite_id, player_color(self.joins))
+        self.joins += 1
+
+    def update(self, simulation, events):
+        tick = simulation.tick
+        playing = self.playing
+        for event, args, to in events:
+            if event == "state":
+                state_tick = HEADER.unpack_from(args[0])[1]
+                for sprite_id in to:
+                    if sprite_id in playing:
+                        self.put("ack", sprite_id, state_tick)
+            elif event == "frog_dead" and to in playing:
+                # The page shows the dead overlay and the player reloads it,
+                # which disconnects and joins with a new id
+                bot = playing.pop(to)
+                self.put("disconnect", to)
+                self.deaths += 1
+                self.lifetimes.append(tick - bot.joined_tick)
+                bot.sprite_id = None
+                bot.respawn_tick = tick + RESPAWN_TICKS
+
+        players = simulation.players
+        for bot in self.bots:
+            if bot.sprite_id is None:
+                if tick >= bot.respawn_tick:
+                    self.join(bot, tick)
+                continue
+            if tick % MOVE_EVERY != bot.offset:
+                continue
+            player = players.get(bot.sprite_id)
+            # Not in the simulation yet, or being carried
+            if player is None or player.grabbed is not False:
+                continue
+            if bot.behavior is grief and self.frog_index_tick != tick:
+                self.frog_index.rebuild(players.values())
+                self.frog_index_tick = tick
+            joyx, joyy, grab = bot.behavior(bot, player, simulation)
+            self.put("move", bot.sprite_id, (joyx, joyy))
+            if grab:
+                self.put("grab", bot.sprite_id)
+
+    def metrics(self):
+        return {
+            "bots": len(self.bots),
+            "playing": len(self.playing),
+            "joins": self.joins,
+            "deaths": self.deaths,
+            "mean_life_seconds": (
+                sum(self.lifetimes) / len(self.lifetimes) / TICK_RATE
+                if self.lifetimes
+                else None
+            ),
+        }
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import deque
+
+from profiling import percentile
+
+# How many recent queue latencies to keep for the percentiles
+LATENCY_SAMPLES = 1000
+
+
+class CommandQueue:
+    # Hands controller input from the Socket.IO handlers to the game thread.
+    # Handlers only ever enqueue; the game thread drains the queue once per
+    # tick and is the only thread that touches the simulation.
+    #
+    # A command is [kind, sprite_id, args, enqueued_at]. Controllers on the
+    # JSON protocol send a move every 100 ms, so a move replaces the sender's
+    # pending move instead of queueing up behind it, unless another command
+    # from the same sender came in between (a grab has to see the facing of
+    # the move before it). Inputs only come when something changed, so they
+    # all go through.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.commands = deque()
+        self.pending_moves = {}
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.drained = 0
+        self.max_depth = 0
+        self.last_depth = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def put(self, kind, sprite_id, args=None):
+        with self.lock:
+            self.enqueued += 1
+            if kind == "move":
+                pending = self.pending_moves.get(sprite_id)
+                if pending is not None:
+                    pending[2] = args
+                    self.coalesced += 1
+                    return
+                command = [kind, sprite_id, args, time.perf_counter()]
+                self.pending_moves[sprite_id] = command
+            else:
+                self.pending_moves.pop(sprite_id, None)
+                command = [kind, sprite_id, args, time.perf_counter()]
+            self.commands.append(command)
+            self.max_depth = max(self.max_depth, len(self.commands))
+
+    def drain(self):
+        with self.lock:
+            commands = self.commands
+            self.commands = deque()
+            self.pending_moves.clear()
+
+        now = time.perf_counter()
+        self.last_depth = len(commands)
+        self.drained += len(commands)
+        for command in commands:
+            self.latencies.append(now - command[3])
+        return commands
+
+    def metrics(self):
+        latencies = list(self.latencies)
+        return {
+            "depth": len(self.commands),
+            "last_drained": self.last_depth,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "drained": self.drained,
+            "latency_ms": {
+                "p50": percentile(latencies, 0.5) * 1000,
+                "p99": percentile(latencies, 0.99) * 1000,
+                "max": max(latencies, default=0.0) * 1000,
+            },
+        }
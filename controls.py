@@ -0,0 +1,81 @@
+import struct
+
+from settings import TICK_RATE
+
+# The phone controllers send their joystick and grab button only when they
+# change, as a few packed bytes with a sequence number. The bytes travel as
+# one integer rather than as a Socket.IO binary attachment, which would cost
+# a second message with a 40 byte header of its own.
+#
+# sequence number, joystick x, joystick y, buttons
+INPUT = struct.Struct(">HbbB")
+GRAB = 1
+# The game turns joystick x into a speed of x / 5 pixels per tick, so
+# controllers send the joystick in steps of 5, once it's moved a whole step
+# from the last position they sent
+INPUT_STEP = 5
+# Least milliseconds between two inputs from a controller, while the thumb
+# is moving. Grabs go out straight away.
+INPUT_INTERVAL_MS = 2 * 1000 / TICK_RATE
+# A move sets a frog's speed, which friction then slows down, so the last
+# input of a controller is applied again this often while it's held, like
+# the 100 ms interval controllers used to send moves at
+REPEAT_TICKS = 6
+
+
+def encode_input(sequence, joyx, joyy, grab=False):
+    # What a controller sends, see templates/index.html
+    data = INPUT.pack(sequence & 0xFFFF, joyx, joyy, GRAB if grab else 0)
+    return int.from_bytes(data, "big")
+
+
+def decode_input(value):
+    # (sequence, joyx, joyy, grab), or None if value isn't an input
+    if type(value) is not int or not 0 <= value < 1 << (INPUT.size * 8):
+        return None
+    sequence, joyx, joyy, buttons = INPUT.unpack(value.to_bytes(INPUT.size, "big"))
+    # The joystick goes from -100 to 100 each way
+    joyx = max(-100, min(100, joyx))
+    joyy = max(-100, min(100, joyy))
+    return sequence, joyx, joyy, bool(buttons & GRAB)
+
+
+class HeldInputs:
+    # The last input of each controller, applied the tick it comes in and
+    # again every REPEAT_TICKS until the next one, and the sequence
+    # numbers of the inputs received this tick, to acknowledge. Game thread
+    # only.
+    def __init__(self):
+        # sprite id -> [joyx, joyy, grab, tick it's applied next], in the
+        # order the controllers sent their first input
+        self.held = {}
+        # sprite id -> sequence number of the last input received
+        self.acks = {}
+
+    def received(self, sprite_id, sequence, joyx, joyy, grab, tick):
+        held = self.held.get(sprite_id)
+        # Two inputs in one tick still grab once
+        grab = grab or (held is not None and held[2])
+        self.held[sprite_id] = [joyx, joyy, grab, tick]
+        self.acks[sprite_id] = sequence
+
+    def due(self, tick, players):
+        # Yields (sprite_id, (joyx, joyy), grab) of the inputs to apply.
+        # Inputs of frogs that aren't in players any more are dropped.
+        gone = [sprite_id for sprite_id in self.held if sprite_id not in players]
+        for sprite_id in gone:
+            self.forget(sprite_id)
+        for sprite_id, held in self.held.items():
+            if held[3] <= tick:
+                yield sprite_id, (held[0], held[1]), held[2]
+                held[2] = False
+                held[3] = tick + REPEAT_TICKS
+
+    def take_acks(self):
+        acks = self.acks
+        self.acks = {}
+        return acks.items()
+
+    def forget(self, sprite_id):
+        self.held.pop(sprite_id, None)
+        self.acks.pop(sprite_id, None)
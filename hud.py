@@ -0,0 +1,105 @@
+from collections import OrderedDict
+
+import pygame
+
+from settings import WINDOW_HEIGHT, WINDOW_WIDTH
+
+# Rendered text surfaces to keep around, the least recently used go first
+TEXT_CACHE_SIZE = 256
+# The top of the ground, heights are measured from here
+GROUND_TOP = WINDOW_HEIGHT - 50
+PIXELS_PER_METER = 100
+
+
+class TextCache:
+    # Loads each font once and keeps rendered text surfaces keyed by
+    # (text, font, size, color), so unchanged text is never rendered again.
+    def __init__(self, max_size=TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, name, size):
+        font = self.fonts.get((name, size))
+        if font is None:
+            if name is None:
+                font = pygame.font.Font(None, size)
+            else:
+                font = pygame.font.SysFont(name, size)
+            self.fonts[(name, size)] = font
+        return font
+
+    def render(self, text, size=24, color=(0, 0, 0), name=None, background=None):
+        key = (text, name, size, color, background)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self.font(name, size).render(text, True, color, background)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+class HudText:
+    # A piece of text on screen that is only looked up again when its value
+    # changes. format is called with the value to get the text.
+    def __init__(self, cache, format, anchor, position, size=24, color=(0, 0, 0)):
+        self.cache = cache
+        self.format = format
+        self.anchor = anchor
+        self.position = position
+        self.size = size
+        self.color = color
+        self.value = None
+        self.surface = None
+        self.rect = None
+
+    def update(self, value):
+        if value != self.value or self.surface is None:
+            self.value = value
+            self.surface = self.cache.render(self.format(value), self.size, self.color)
+            self.rect = self.surface.get_rect(**{self.anchor: self.position})
+
+    def draw(self, surface):
+        return surface.blit(self.surface, self.rect)
+
+
+class Hud:
+    def __init__(self, port_string):
+        self.cache = TextCache()
+        self.port = HudText(
+            self.cache,
+            str,
+            "bottomright",
+            (WINDOW_WIDTH - 10, WINDOW_HEIGHT - 67),
+        )
+        self.port.update(port_string)
+        self.player_count = HudText(
+            self.cache,
+            lambda count: f"Frogs: {count}",
+            "topright",
+            (WINDOW_WIDTH - 10, 10),
+        )
+        self.highest = HudText(
+            self.cache,
+            lambda meters: f"Highest frog: {meters} m",
+            "topright",
+            (WINDOW_WIDTH - 10, 34),
+        )
+        self.elements = [self.port, self.player_count, self.highest]
+
+    def update(self, snapshot):
+        self.player_count.update(len(snapshot.players))
+        top = min((player.rect[1] for player in snapshot.players), default=GROUND_TOP)
+        self.highest.update(max(0, (GROUND_TOP - top) // PIXELS_PER_METER))
+
+    def draw(self, surface):
+        # Returns the rects drawn to, for dirty rect updates
+        return [element.draw(surface) for element in self.elements]
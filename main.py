@@ -1,226 +1,74 @@
-import pygame
+import argparse
+import logging
 import os
-from flask import Flask, render_template, send_from_directory, request
-from flask_socketio import SocketIO, emit
-import threading
-import random
-from PIL import Image
-
-# Constants
-FULLSCREEN = True
-WINDOW_WIDTH = 1920
-WINDOW_HEIGHT = 1080
-GROUND_HEIGHT = 900
-IMAGES_FOLDER = "color_rotated_imgs"
-FROG_STATIC = [
-    f"{IMAGES_FOLDER}/Frog_Static1.png",
-    f"{IMAGES_FOLDER}/Frog_Static2.png",
-    f"{IMAGES_FOLDER}/Frog_Static3.png",
-    f"{IMAGES_FOLDER}/Frog_Static4.png",
-]
-FROG_JUMPING = [
-    f"{IMAGES_FOLDER}/Frog_Jumping1.png",
-    f"{IMAGES_FOLDER}/Frog_Jumping2.png",
-]
-FROG_FALLING = [
-    f"{IMAGES_FOLDER}/Frog_Falling1.png",
-]
-FROG_LEAPING = [
-    f"{IMAGES_FOLDER}/Frog_Leaping1.png",
-    f"{IMAGES_FOLDER}/Frog_Leaping2.png",
-]
-FROG_GRABBING = [
-    f"{IMAGES_FOLDER}/Frog_Grabbing1.png",
-    f"{IMAGES_FOLDER}/Frog_Grabbing2.png",
-]
-MAPCOMPONENTS = [
-    f"imgs/MapElement1.png",
-    f"imgs/MapElement2.png",
-    # f"imgs/MapElement3.png",
-]
-
-PLAYER_COLORS = {
-    "Green": (0, 255, 0),
-    "DarkTeal": (48, 102, 89),
-    "BurntOrange": (187, 127, 0),
-    "Pink": (223, 167, 232),
-    "Yellow": (255, 255, 0),
-    "YellowGreen": (107, 154, 0),
-    "Magenta": (201, 0, 133),
-}
-
-# Initialize Pygame
-pygame.init()
-
-# Set up some variables
-if FULLSCREEN:
-    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.FULLSCREEN)
-else:
-    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-
-clock = pygame.time.Clock()
-players = {}
-sprite_id_counter = 0
+import time
+from flask import (
+    Flask,
+    Response,
+    jsonify,
+    render_template,
+    send_from_directory,
+    request,
+)
+from flask_socketio import SocketIO, emit, join_room, rooms
+from bots import BEHAVIORS, BotController
+from controls import GRAB, INPUT_INTERVAL_MS, INPUT_STEP, decode_input
+from hud import GROUND_TOP, PIXELS_PER_METER
+from netstate import BROADCAST_EVERY, FRAME_STATES, HISTORY
+from palette import color_rgb, player_color
+from pipeline import SnapshotBuffer
+from profiling import FRAME_PHASES, TICK_PHASES, FrameProfiler
+from rooms import DEFAULT_ROOM, Room, RoomPool
+from settings import MAP_FILE, MAX_FPS, TICK_RATE, WINDOW_HEIGHT
+
+# The room on the display, made by create_rooms(). Socket.IO handlers queue
+# its commands, only the game thread touches its simulation.
+main_room = None
+# Rooms stepped by the game thread, by name
+game_rooms = {}
+# Headless rooms running in worker processes, see rooms.py
+room_pool = None
+# Simulation ticks and drawn frames, timed on their own threads
+tick_profiler = FrameProfiler(phases=TICK_PHASES)
+profiler = FrameProfiler(phases=FRAME_PHASES)
+renderer = None
+# Snapshots of the main room on their way to the renderer, see pipeline.py
+snapshots = None
+# Cleared when the window is closed, which stops the game
+running = True
+# Computer controlled frogs in the main room with --bots, see bots.py
+bot_controller = None
+# Streams the game window to browsers with --stream, see streaming.py
+frame_stream = None
 color_idx = 0
 port_string = "Connect with: http://192.168.0.48:5000"
-
-
-class MapComponent(pygame.sprite.Sprite):
-    def __init__(self, width, height, color, x, y):
-        super().__init__()
-        self.image = pygame.image.load(random.choice(MAPCOMPONENTS)).convert_alpha()
-        self.image = pygame.transform.scale(self.image, (width, height))
-        self.rect = self.image.get_rect(topleft=(x, y))
-
-    def reset_image(self, width, height, color, x, y):
-        self.image = pygame.Surface((width, height))
-        self.image.fill(color)
-        self.rect = self.image.get_rect(topleft=(x, y))
-
-
-class Player(pygame.sprite.Sprite):
-    def __init__(self, sprite_id, color):
-        super().__init__()
-        self.color = color
-        filename, file_extension = os.path.splitext(FROG_STATIC[0])
-        self.image = pygame.image.load(
-            filename + self.color + file_extension
-        ).convert_alpha()
-        self.image = pygame.transform.scale(
-            self.image,
-            (int(self.image.get_width() * 2 / 3), int(self.image.get_height() * 2 / 3)),
-        )
-        self.rect = self.image.get_rect(center=(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2))
-        self.velocity = pygame.Vector2(0, 0)
-        self.gravity = 1.8
-        self.friction = 0.1  # Add friction attribute
-        self.id = sprite_id
-        self.grabbing = False
-        self.grabbed = False
-
-        self.animation_counter = 0
-        # animation flags
-        self.facing_left = False
-        self.leaping = False
-        self.jumping = False
-        self.falling = False
-        self.grabbing_animation = False
-
-    def update(self, map_components=[]):
-        self.velocity.x *= 1 - self.friction
-        self.rect.move_ip(self.velocity.x, self.velocity.y)
-        if self.velocity.x < 5 and self.velocity.x > -5:
-            self.leaping = False
-
-        # Vertical collision detection
-        falling = True
-        for component in map_components:
-            if pygame.sprite.collide_rect(self, component):
-                # Use linear interpolation to estimate the position of the sprite at the time of collision (before, since we're being lazy, and not using penetration depth)
-                # This will allow us to detect the direction of the collision
-                old_rect = self.rect.move(-self.velocity.x, -self.velocity.y)
-
-                # If we're above the object, we're probably landing on it.
-                if old_rect.bottom <= component.rect.top and self.velocity.y > 0:
-                    self.rect.bottom = component.rect.top + 10
-                    self.velocity.y = 0
-                    falling = False
-
-                # Check if we're resting on the object vertically
-                if self.rect.bottom == component.rect.top + 10:
-                    falling = False
-                    self.falling = False
-                    self.jumping = False
-
-                # If we're below the object, we're probably hitting our head.
-                if old_rect.top >= component.rect.bottom:
-                    self.rect.top = component.rect.bottom
-                    self.velocity.y = 0
-
-                # If we're to the left of the object, we probably hit it from the right.
-                if old_rect.right <= component.rect.left:
-                    self.rect.right = component.rect.left
-                    self.velocity.x = 0
-
-                # If we're to the right of the object, we probably hit it from the left.
-                if old_rect.left >= component.rect.right:
-                    self.rect.left = component.rect.right
-                    self.velocity.x = 0
-
-        if falling and not self.grabbed:
-            self.velocity.y += self.gravity
-            self.falling = True
-
-        if self.grabbing:
-            # Check if the sprite is able to grab another player sprite, are they in range?
-            for sprite in all_sprites:
-                if isinstance(sprite, Player) and sprite.id != self.id:
-                    if hasattr(sprite, "grabbed") and sprite.grabbed == self.id:
-                        # If the player is grabbing another player, move the grabbed player with the grabbing player
-                        sprite.rect.x = self.rect.x
-                        sprite.rect.y = self.rect.y - 63
-
-        self.animate()
-
-    def animate(self):
-        if self.grabbing_animation:
-            idx = min(int((self.animation_counter) / 6), len(FROG_GRABBING) - 1)
-            filename, file_extension = os.path.splitext(FROG_GRABBING[idx])
-            self.image = pygame.image.load(
-                filename + self.color + file_extension
-            ).convert_alpha()
-            if self.animation_counter > 12:
-                self.grabbing_animation = False
-        elif self.jumping:
-            if self.velocity.y > 0:
-                self.jumping = False
-                self.falling = True  # True
-                self.animation_counter = 0
-            idx = min(int((self.animation_counter + 1) / 3), len(FROG_JUMPING) - 1)
-            filename, file_extension = os.path.splitext(FROG_JUMPING[idx])
-            self.image = pygame.image.load(
-                filename + self.color + file_extension
-            ).convert_alpha()
-        elif self.falling:
-            idx = 0
-            filename, file_extension = os.path.splitext(FROG_FALLING[idx])
-            self.image = pygame.image.load(
-                filename + self.color + file_extension
-            ).convert_alpha()
-        elif self.leaping:
-            idx = min(int((self.animation_counter) / 4), len(FROG_LEAPING) - 1)
-            filename, file_extension = os.path.splitext(FROG_LEAPING[idx])
-            self.image = pygame.image.load(
-                filename + self.color + file_extension
-            ).convert_alpha()
-            if self.animation_counter > 6:
-                self.leaping = False
-        else:
-            idx = int((self.animation_counter + 1) / 5) % len(FROG_STATIC)
-            filename, file_extension = os.path.splitext(FROG_STATIC[idx])
-            self.image = pygame.image.load(
-                filename + self.color + file_extension
-            ).convert_alpha()
-
-        if self.facing_left:  # flip the image
-            self.image = pygame.transform.flip(self.image, True, False)
-
-        self.image = pygame.transform.scale(
-            self.image,
-            (int(self.image.get_width() * 2 / 3), int(self.image.get_height() * 2 / 3)),
-        )
-
-        self.animation_counter += 1
+# Startup milestones, shown with --log-level info
+logger = logging.getLogger("frog")
 
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = "secret!"
-socketio = SocketIO(app)
+# Attached to the app by run_server() once the async mode is known
+socketio = SocketIO()
 
 
 @app.route("/")
 def index():
-    return render_template("index.html")
+    # The controller decodes the state broadcasts with these
+    return render_template(
+        "index.html",
+        room=request.args.get("room", DEFAULT_ROOM),
+        # Passed on to handle_connect() when the page connects
+        color=request.args.get("color", ""),
+        frame_states=FRAME_STATES,
+        history_ticks=HISTORY * BROADCAST_EVERY,
+        ground_top=GROUND_TOP,
+        pixels_per_meter=PIXELS_PER_METER,
+        nearby_distance=WINDOW_HEIGHT // 2,
+        input_step=INPUT_STEP,
+        input_interval=INPUT_INTERVAL_MS,
+        grab_button=GRAB,
+    )
 
 
 @app.route("/joy.js")
@@ -228,369 +76,353 @@ def serve_joy_js():
     return send_from_directory(".", "joy.js")
 
 
+@app.route("/stream.mjpg")
+def stream():
+    if frame_stream is None:
+        return "Streaming is off, start the server with --stream\n", 404
+    return Response(frame_stream.mjpeg(socketio.sleep), mimetype=MIMETYPE)
+
+
+@app.route("/metrics")
+def metrics():
+    # The top level input_queue and state_broadcast are the main room's
+    room_metrics = {name: room.metrics() for name, room in game_rooms.items()}
+    workers = {}
+    if room_pool is not None:
+        room_metrics.update(room_pool.room_metrics)
+        workers = room_pool.worker_metrics
+    return jsonify(
+        {
+            "input_queue": room_metrics[DEFAULT_ROOM]["input_queue"],
+            "tick": tick_profiler.summary(),
+            "frame": profiler.summary(),
+            "state_broadcast": room_metrics[DEFAULT_ROOM]["state_broadcast"],
+            "rooms": room_metrics,
+            "workers": workers,
+            "bots": bot_controller.metrics() if bot_controller is not None else None,
+            "stream": frame_stream.metrics() if frame_stream is not None else None,
+            # Frog frames shaded so far, None without a renderer
+            "sprite_atlas": (
+                renderer.sprite_atlas.metrics() if renderer is not None else None
+            ),
+        }
+    )
+
+
+def send_input(kind, args=None):
+    # Pass input from the controller that sent the current event on to the
+    # room it joined
+    sprite_id = request.sid
+    name = next((name for name in rooms() if name != sprite_id), DEFAULT_ROOM)
+    if name in game_rooms:
+        game_rooms[name].put(kind, sprite_id, args)
+    elif room_pool is not None and name in room_pool:
+        room_pool.put(name, kind, sprite_id, args)
+
+
 @socketio.on("connect")
 def handle_connect():
     global color_idx
     sprite_id = request.sid
-    color_name, color_rgb = list(PLAYER_COLORS.items())[color_idx]
-    color_idx = (color_idx + 1) % len(PLAYER_COLORS)
-
-    new_sprite = Player(sprite_id, color=color_name)
+    # Controllers can pick a color with /?color=rrggbb, the rest get the
+    # next one from palette.py
+    color = "#" + request.args.get("color", "").lower()
+    if color_rgb(color) is None:
+        color = player_color(color_idx)
+        color_idx += 1
+
+    # Controllers pick a room with /?room=NAME, unknown rooms get the main one
+    name = request.args.get("room", DEFAULT_ROOM)
+    if name not in game_rooms and (room_pool is None or name not in room_pool):
+        name = DEFAULT_ROOM
+    join_room(name)
+    send_input("connect", color)
+    emit(
+        "sprite_created",
+        {"id": sprite_id, "color": f"rgb{color_rgb(color)}", "room": name},
+    )
 
-    # Center the sprite at the camera center
-    # new_sprite.rect.center = (
-    #     camera_position.x + WINDOW_WIDTH / 2,
-    #     camera_position.y + WINDOW_HEIGHT / 2,
-    # )
 
-    players[sprite_id] = new_sprite
-    all_sprites.add(new_sprite)  # Add the sprite to the all_sprites group
-    emit("sprite_created", {"id": sprite_id, "color": f"rgb{color_rgb}"})
+@socketio.on("input")
+def handle_input(value):
+    # Joystick and grab button packed into an integer, see controls.py
+    command = decode_input(value)
+    if command is not None:
+        send_input("input", command)
 
 
 @socketio.on("move")
 def handle_move(data):
-    joyx = int(data["x"])
-    joyy = int(data["y"])
-    sprite_id = request.sid
-    sprite = players.get(sprite_id)
-
-    if sprite:
-        if joyy >= 50:
-            # Check if the sprite is on the ground or standing on a map component
-            collided_with = pygame.sprite.spritecollideany(sprite, collision_sprites)
-            if collided_with and (isinstance(collided_with, MapComponent)):
-                sprite.velocity.y = -30
-                sprite.jumping = True
-                sprite.animation_counter = 0
-
-        if joyx < 5:
-            sprite.velocity.x = joyx / 5
-            sprite.facing_left = True
-            if not sprite.leaping:
-                sprite.leaping = True
-                animation_counter = 0
-        elif joyx > 5:
-            sprite.facing_left = False
-            sprite.velocity.x = joyx / 5
-            if not sprite.leaping:
-                sprite.leaping = True
-                animation_counter = 0
+    # Older controllers and benchmarks.loadgen send the joystick as JSON
+    # every 100 ms instead of inputs.
+    # The joystick goes from -100 to 100 each way
+    joyx = max(-100, min(100, int(data["x"])))
+    joyy = max(-100, min(100, int(data["y"])))
+    send_input("move", (joyx, joyy))
 
 
 @socketio.on("grab")
 def handle_grab(data):
-    sprite_id = request.sid
-    sprite = players.get(sprite_id)
-
-    if sprite.grabbing:
-        sprite.grabbing = False
-        for object_sprite in list(players.values()):
-            if object_sprite.grabbed == sprite.id:
-                object_sprite.grabbed = False
-
-                # Add velocity to the grabbed sprite like a throw based on direction of sprite
-                object_sprite.velocity.x = -20 if sprite.facing_left else 20
-
-    # Check if any sprites are in range, and if so, grab them and mark.
-    if not sprite.grabbing:
-        sprite.grabbing_animation = True
-        sprite.animation_counter = 0
-        for object_sprite in list(players.values()):
-            if object_sprite.id != sprite.id:
-                if sprite.facing_left and (
-                    sprite.rect.centerx - 180
-                    < object_sprite.rect.centerx
-                    < sprite.rect.centerx
-                    and sprite.rect.centery - 10
-                    < object_sprite.rect.centery
-                    < sprite.rect.centery + 10
-                ):
-                    object_sprite.grabbed = sprite.id
-                    sprite.grabbing = True
-
-                elif (
-                    sprite.rect.centerx
-                    < object_sprite.rect.centerx
-                    < sprite.rect.centerx + 180
-                    and sprite.rect.centery - 10
-                    < object_sprite.rect.centery
-                    < sprite.rect.centery + 10
-                ):
-                    object_sprite.grabbed = sprite.id
-                    sprite.grabbing = True
+    send_input("grab")
+
+
+@socketio.on("state_ack")
+def handle_state_ack(tick):
+    send_input("ack", int(tick))
 
 
 @socketio.on("disconnect")
 def handle_disconnect():
     print("Client disconnected")
     # Assuming each client has a unique sprite_id
-    sprite_id = request.sid
-    sprite = players.get(sprite_id)
+    send_input("disconnect")
 
-    if sprite:
-        all_sprites.remove(sprite)  # Remove the sprite from the all_sprites group
-        del players[sprite_id]  # Delete the sprite from the sprites dictionary
-        print(f"Sprite {sprite_id} removed")
-    else:
-        print(f"No sprite found for id {sprite_id}")
-
-
-# Inside the game loop function:
-def game_loop():
-    global all_sprites
-    global collision_sprites
-    global port_string
-    global map_components  # Global declaration used for map builder
-    global camera_position  # Global declaration used for map builder
-    all_sprites = pygame.sprite.Group()
-    collision_sprites = pygame.sprite.Group()
-
-    # Tracks our "camera position" to move everything around.
-    camera_position = pygame.Vector2(0, 0)
-
-    # Create MapComponents for your level
-    map_components = [
-        MapComponent(WINDOW_WIDTH, GROUND_HEIGHT, (0, 255, 0), 0, WINDOW_HEIGHT - 50),
-        MapComponent(330, 120, (255, 0, 0), 210.0, 907.0),
-        MapComponent(200, 110, (255, 0, 0), 152.0, 767.0),
-        MapComponent(240, 130, (255, 0, 0), 1532.0, 897.0),
-        MapComponent(340, 160, (255, 0, 0), 1718.0, 657.0),
-        MapComponent(180, 90, (255, 0, 0), 498.0, 644.0),
-        MapComponent(200, 140, (255, 0, 0), 701.0, 551.0),
-        MapComponent(200, 150, (255, 0, 0), 1011.0, 441.0),
-        MapComponent(280, 180, (255, 0, 0), 1.0, 301.0),
-        MapComponent(200, 120, (255, 0, 0), 1138.0, 268.0),
-        MapComponent(200, 120, (255, 0, 0), 788.0, 138.0),
-        MapComponent(200, 60, (255, 0, 0), 1390.0, -28.0),
-        MapComponent(200, 100, (255, 0, 0), 1045.0, -85.0),
-        MapComponent(200, 160, (255, 0, 0), 1448.0, 505.0),
-        MapComponent(120, 90, (255, 0, 0), 1368.0, 355.0),
-        MapComponent(160, 20, (255, 0, 0), 1533.0, -173.0),
-        MapComponent(160, 30, (255, 0, 0), 1163.0, -186.0),
-        MapComponent(170, 30, (255, 0, 0), 1733.0, -316.0),
-        MapComponent(170, 30, (255, 0, 0), 1323.0, -436.0),
-        MapComponent(170, 60, (255, 0, 0), 993.0, -386.0),
-        MapComponent(170, 40, (255, 0, 0), 1064.0, -569.0),
-        MapComponent(150, 60, (255, 0, 0), 1966.0, -519.0),
-        MapComponent(150, 40, (255, 0, 0), 593.0, -502.0),
-        MapComponent(170, 60, (255, 0, 0), 265.0, -595.0),
-        MapComponent(200, 20, (255, 0, 0), 215.0, -325.0),
-        MapComponent(140, 40, (255, 0, 0), 655.0, -755.0),
-        MapComponent(170, 20, (255, 0, 0), 6.0, -718.0),
-        MapComponent(170, 50, (255, 0, 0), -284.0, -768.0),
-        MapComponent(160, 70, (255, 0, 0), -524.0, -938.0),
-        MapComponent(200, 70, (255, 0, 0), -250.0, -1161.0),
-        MapComponent(200, 70, (255, 0, 0), 89.0, -1234.0),
-        MapComponent(200, 70, (255, 0, 0), 479.0, -1334.0),
-        MapComponent(140, 70, (255, 0, 0), -31.0, -1474.0),
-        MapComponent(170, 80, (255, 0, 0), 174.0, -1657.0),
-        MapComponent(120, 50, (255, 0, 0), 604.0, -1527.0),
-        MapComponent(180, 90, (255, 0, 0), 724.0, -1727.0),
-        MapComponent(150, 70, (255, 0, 0), 1076.0, -1670.0),
-        MapComponent(210, 90, (255, 0, 0), 1272.0, -1903.0),
-        MapComponent(150, 70, (255, 0, 0), 1750.0, -1906.0),
-        MapComponent(150, 50, (255, 0, 0), 2000.0, -2069.0),
-        MapComponent(180, 70, (255, 0, 0), 2116.0, -2292.0),
-        MapComponent(160, 80, (255, 0, 0), 2048.0, -2505.0),
-        MapComponent(160, 70, (255, 0, 0), 1773.0, -2638.0),
-        MapComponent(140, 70, (255, 0, 0), 1423.0, -2558.0),
-        MapComponent(180, 90, (255, 0, 0), 2083.0, -2828.0),
-        MapComponent(200, 70, (255, 0, 0), 2403.0, -2528.0),
-        MapComponent(140, 80, (255, 0, 0), 2543.0, -2778.0),
-        MapComponent(200, 70, (255, 0, 0), 1543.0, -2918.0),
-        MapComponent(180, 60, (255, 0, 0), 1129.0, -2761.0),
-        MapComponent(160, 60, (255, 0, 0), 831.0, -2954.0),
-        MapComponent(190, 80, (255, 0, 0), 350.0, -2957.0),
-        MapComponent(200, 70, (255, 0, 0), 110.0, -2817.0),
-        MapComponent(200, 70, (255, 0, 0), -360.0, -2940.0),
-        MapComponent(200, 70, (255, 0, 0), -747.0, -3073.0),
-        MapComponent(180, 90, (255, 0, 0), -927.0, -3263.0),
-        MapComponent(200, 80, (255, 0, 0), -626.0, -3476.0),
-        MapComponent(200, 70, (255, 0, 0), -394.0, -3699.0),
-        MapComponent(200, 50, (255, 0, 0), 183.0, -3722.0),
-        MapComponent(200, 80, (255, 0, 0), 748.0, -3605.0),
-        MapComponent(200, 80, (255, 0, 0), 1244.0, -3668.0),
-        MapComponent(200, 100, (255, 0, 0), 1796.0, -3651.0),
-        MapComponent(200, 90, (255, 0, 0), 2100.0, -3784.0),
-        MapComponent(200, 90, (255, 0, 0), 1886.0, -3997.0),
-        MapComponent(200, 90, (255, 0, 0), 2226.0, -4020.0),
-        MapComponent(200, 70, (255, 0, 0), 1476.0, -4110.0),
-        MapComponent(200, 120, (255, 0, 0), 868.0, -4203.0),
-        MapComponent(200, 70, (255, 0, 0), 434.0, -4226.0),
-        MapComponent(200, 70, (255, 0, 0), 214.0, -4386.0),
-        MapComponent(200, 80, (255, 0, 0), 604.0, -4526.0),
-        MapComponent(200, 80, (255, 0, 0), 904.0, -4706.0),
-        MapComponent(200, 120, (255, 0, 0), 645.0, -4959.0),
-        MapComponent(200, 60, (255, 0, 0), 1155.0, -4849.0),
-        MapComponent(200, 80, (255, 0, 0), 235.0, -4739.0),
-        MapComponent(200, 70, (255, 0, 0), 155.0, -5009.0),
-        MapComponent(60, 50, (255, 0, 0), 978.0, -5049.0),
-        MapComponent(140, 60, (255, 0, 0), 68.0, -5192.0),
-        MapComponent(80, 50, (255, 0, 0), 408.0, -5272.0),
-        MapComponent(60, 60, (255, 0, 0), 732.0, -5232.0),
-        MapComponent(200, 80, (255, 0, 0), 938.0, -5475.0),
-        MapComponent(150, 100, (255, 0, 0), 1345.0, -5598.0),
-        MapComponent(130, 70, (255, 0, 0), 1725.0, -5698.0),
-        MapComponent(110, 140, (255, 0, 0), 2084.0, -5821.0),
-        MapComponent(150, 70, (255, 0, 0), 2454.0, -5721.0),
-        MapComponent(40, 40, (255, 0, 0), 2624.0, -5921.0),
-        # Add more MapComponents as needed
-    ]
-
-    all_sprites.add(map_components)
-    collision_sprites.add(map_components)
-
-    # background_image = pygame.image.load("imgs/Border.png")
-    backbackground_image = pygame.image.load("imgs/Background.png")
-    infoObject = pygame.display.Info()
-    # background_image = pygame.transform.scale(
-    #     background_image, (infoObject.current_w, infoObject.current_h)
-    # )
-    # Scale the backbackground image by the width of the window size such that it covers the entire window
-    backbackground_image = pygame.transform.scale(
-        backbackground_image,
-        (
-            infoObject.current_w,
-            infoObject.current_w
-            / backbackground_image.get_width()
-            * backbackground_image.get_height(),
-        ),
-    )
 
-    # backbackground_image = pygame.transform.scale(
-    #     backbackground_image, (infoObject.current_w *, infoObject.current_h * 2)
-    # )
+def send_events(events):
+    # Events from Room.tick(), the controllers' ids are their Socket.IO rooms
+    for event, args, to in events:
+        socketio.emit(event, *args, to=to)
+
+
+def simulation_loop():
+    # Steps every room at a fixed rate, never waiting on the renderer. With a
+    # renderer, hands it a snapshot of the room on the display every tick.
+    tick_seconds = 1 / TICK_RATE
+    previous = time.perf_counter()
+    lag = 0.0
 
-    running = True
     while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-
-        # Get all sprite instances for collision detection
-        sprites_list = [
-            sprite for sprite in all_sprites.sprites() if isinstance(sprite, Player)
-        ]
-
-        # Update each sprite individually with the list of map components for collision detection
-        for sprite in sprites_list:
-            sprite.update(map_components)
-
-        # Kill lowest players if needed
-        # We have to find if they all fit vertically, so find the max distance between the highest and lowest player
-        current_lowest_player = None
-        current_highest_player = None
-        for player in players.values():
-            if (
-                current_lowest_player is None
-                or player.rect.bottom > current_lowest_player.rect.bottom
-            ):
-                current_lowest_player = player
-            if (
-                current_highest_player is None
-                or player.rect.top < current_highest_player.rect.top
-            ):
-                current_highest_player = player
-
-        if current_lowest_player is not None and current_highest_player is not None:
-            if (
-                current_lowest_player.rect.bottom - current_highest_player.rect.top
-                > WINDOW_HEIGHT
-            ):
-                # Kill the lowest player
-                dead_player_id = None
-                for player_id, player_sprite in players.items():
-                    if player_sprite == current_lowest_player:
-                        dead_player_id = player_id
-                        break
-
-                if dead_player_id:
-                    # Emit message to the specific player indicating frog death
-                    socketio.emit("frog_dead", room=dead_player_id)
-
-                # Perform any other actions for frog death, such as removing the sprite from the game
-                all_sprites.remove(current_lowest_player)
-                del players[dead_player_id]
-
-        # Get average player coordinates
-        player_positions = [sprite.rect.center for sprite in sprites_list]
-        if player_positions:
-            avg_x = sum([pos[0] for pos in player_positions]) / len(player_positions)
-            avg_y = sum([pos[1] for pos in player_positions]) / len(player_positions)
-            camera_position = pygame.Vector2(
-                avg_x - WINDOW_WIDTH / 2, avg_y - WINDOW_HEIGHT / 2
-            )
+        now = time.perf_counter()
+        # Don't try to catch up on more than a few ticks after a stall
+        lag = min(lag + now - previous, tick_seconds * 5)
+        previous = now
+        while lag >= tick_seconds:
+            tick_profiler.begin_frame()
+            events = main_room.tick(tick_profiler)
+            if bot_controller is not None:
+                bot_controller.update(main_room.simulation, events)
+            send_events(events)
+            for room in game_rooms.values():
+                if room is not main_room:
+                    send_events(room.tick())
+            if room_pool is not None:
+                room_pool.flush()
+                send_events(room_pool.events())
+            tick_profiler.lap("rooms")
+            if snapshots is not None:
+                snapshots.publish(main_room.simulation.snapshot())
+                tick_profiler.lap("publish")
+            tick_profiler.end_frame()
+            lag -= tick_seconds
+
+        # Yields to the other green threads in eventlet/gevent mode
+        socketio.sleep(max(0.0, tick_seconds - lag))
+
+    tick_profiler.close()
+    main_room.close()
+    if room_pool is not None:
+        room_pool.close()
+    if frame_stream is not None:
+        frame_stream.close()
+
+
+def render_loop(dirty_rects=False):
+    # Draws the snapshots simulation_loop() publishes, at up to MAX_FPS, on
+    # a thread of its own so a slow flip to the projector doesn't hold up
+    # the ticks. Closing the window stops both loops.
+    global renderer, running
+    # Imported here so headless servers never load it or its assets
+    from renderer import Renderer
+
+    renderer = Renderer(port_string, dirty_rects=dirty_rects)
+    renderer.tick_profiler = tick_profiler
+    frame_seconds = 1 / MAX_FPS
+    first_frame = True
 
-        # Fill the screen with a white background
-        screen.fill((255, 255, 255))
+    while running:
+        profiler.begin_frame()
+        if not renderer.handle_events():
+            running = False
+        profiler.lap("event_pump")
+
+        snapshot = snapshots.latest()
+        profiler.lap("interpolate")
+        # None until the first tick
+        if snapshot is not None:
+            renderer.draw(snapshot, profiler)
+            if first_frame:
+                logger.info("First frame drawn")
+                first_frame = False
+            if frame_stream is not None:
+                frame_stream.capture(renderer.screen)
+                profiler.lap("stream")
+        profiler.end_frame()
+
+        elapsed = time.perf_counter() - profiler.frame_start
+        socketio.sleep(max(0.0, frame_seconds - elapsed))
+
+    profiler.close()
+    renderer.close()
+
+
+def create_rooms(extra_rooms=(), workers=0, record=None, **options):
+    # Makes the room on the display and any extra ones, options are Room()
+    # keyword arguments. Importing this module doesn't, so it loads no maps
+    # and starts no processes.
+    global main_room, game_rooms, room_pool
+    main_room = Room(DEFAULT_ROOM, record=record, **options)
+    game_rooms = {DEFAULT_ROOM: main_room}
+    extra_rooms = [name for name in dict.fromkeys(extra_rooms) if name != DEFAULT_ROOM]
+    if extra_rooms and workers > 0:
+        room_pool = RoomPool(extra_rooms, workers, **options)
+    else:
+        for name in extra_rooms:
+            game_rooms[name] = Room(name, **options)
 
-        screen.blit(
-            backbackground_image,
-            (camera_position.x * -0.1, camera_position.y * -0.1 - 3000),
-        )
-        # screen.blit(background_image, camera_position * -0.3)
-
-        for sprite in sprites_list:
-            if (
-                sprite.rect.top > WINDOW_HEIGHT
-            ):  # Assuming falling off the screen means death
-                # Find the player associated with this sprite
-                dead_player_id = None
-                for player_id, player_sprite in players.items():
-                    if player_sprite == sprite:
-                        dead_player_id = player_id
-                        break
-
-                for grabbed_sprite in all_sprites:
-                    if (
-                        isinstance(grabbed_sprite, Player)
-                        and grabbed_sprite.id != player_id
-                    ):
-                        if (
-                            hasattr(grabbed_sprite, "grabbed")
-                            and grabbed_sprite.grabbed == player_id
-                        ):
-                            grabbed_sprite.grabbed = False
-
-                if dead_player_id:
-                    # Emit message to the specific player indicating frog death
-                    socketio.emit("frog_dead", room=dead_player_id)
-
-                # Perform any other actions for frog death, such as removing the sprite from the game
-                all_sprites.remove(sprite)
-                del players[dead_player_id]
-
-        for sprite in all_sprites:
-            screen.blit(
-                sprite.image,
-                pygame.rect.Rect(
-                    sprite.rect.topleft - camera_position, sprite.rect.size
-                ),
-            )
 
-        font = pygame.font.Font(None, 24)
-        text_surface = font.render(port_string, True, (0, 0, 0))
-        text_rect = text_surface.get_rect()
-        text_rect.bottomright = (
-            WINDOW_WIDTH - 10,
-            WINDOW_HEIGHT - text_rect.height - 50,
-        )
-        screen.blit(text_surface, text_rect)
+def run_server(host, port, headless=False, async_mode=None, dirty_rects=False):
+    # async_mode is "threading", "eventlet" or "gevent", None picks the best
+    # one installed. With eventlet or gevent the server handles many more
+    # open controller connections, and the game loops run as cooperative
+    # green threads instead of OS threads.
+    global snapshots
+    socketio.init_app(app, async_mode=async_mode)
+    print(f"Socket.IO async mode: {socketio.async_mode}")
 
-        pygame.display.flip()
-        clock.tick(60)
+    # The renderer runs in parallel with the simulation in the threading
+    # mode, as pygame lets go of the GIL while it blits and flips. Green
+    # threads take turns.
+    if not headless:
+        snapshots = SnapshotBuffer(1 / TICK_RATE)
+        socketio.start_background_task(render_loop, dirty_rects)
+    socketio.start_background_task(simulation_loop)
 
-    pygame.quit()
+    # Start the Flask-SocketIO server. The threading mode runs on Werkzeug's
+    # development server, which is fine for a game on the local network.
+    socketio.run(app, host=host, port=port, allow_unsafe_werkzeug=True)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="run the simulation without opening a window",
+    )
+    parser.add_argument(
+        "--physics",
+        choices=["python", "numpy"],
+        default="python",
+        help="physics backend, numpy is faster with hundreds of players",
+    )
+    parser.add_argument(
+        "--async-mode",
+        choices=["threading", "eventlet", "gevent"],
+        help="Socket.IO server mode, eventlet or gevent scale to more controllers",
+    )
+    parser.add_argument(
+        "--dirty-rects",
+        action="store_true",
+        help="only update the parts of the screen that changed while the camera is still",
+    )
+    parser.add_argument(
+        "--map",
+        default=MAP_FILE,
+        help="map file to play, only the part around the frogs is loaded",
+    )
+    parser.add_argument(
+        "--tower",
+        type=int,
+        metavar="SEED",
+        help="play an endless generated tower instead of a map file",
+    )
+    parser.add_argument(
+        "--room",
+        action="append",
+        default=[],
+        metavar="NAME",
+        help="add a headless room, controllers join it with /?room=NAME",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="processes to run the headless rooms in, 0 runs them on the game thread",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="stream the game window to browsers at /stream.mjpg",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="record the controller input of the room on the display, for replay.py",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="CSV",
+        help="write the time of every frame phase to a CSV file, and of every "
+        "tick phase to one named like it with -ticks on the end",
+    )
+    parser.add_argument(
+        "--bots",
+        type=int,
+        default=0,
+        metavar="N",
+        help="add N computer controlled frogs to the room on the display",
+    )
+    parser.add_argument(
+        "--bot-behavior",
+        action="append",
+        choices=sorted(BEHAVIORS),
+        metavar="BEHAVIOR",
+        help="what the bots do, one of %(choices)s, repeat it to mix them "
+        "(default: all of them)",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["debug", "info", "warning", "error"],
+        default="warning",
+        help="info logs startup milestones like the first frame drawn",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper())
+    if args.stream:
+        if args.headless:
+            parser.error(
+                "--stream needs the renderer, on a machine without a display "
+                "set SDL_VIDEODRIVER=dummy instead of using --headless"
+            )
+        # Optional, only needed to stream
+        from streaming import MIMETYPE, FrameStream
+
+        frame_stream = FrameStream()
+    # Every room plays the same map
+    create_rooms(
+        args.room,
+        args.workers,
+        args.record,
+        physics=args.physics,
+        map_path=args.map,
+        tower_seed=args.tower,
+    )
+    if args.bots:
+        bot_controller = BotController(
+            main_room.put, args.bots, args.bot_behavior or sorted(BEHAVIORS)
+        )
+    if args.trace:
+        profiler.start_trace(args.trace)
+        stem, extension = os.path.splitext(args.trace)
+        tick_profiler.start_trace(f"{stem}-ticks{extension}")
+
     host = "0.0.0.0"
     port = 5000  # You can use any port you like, but make sure it's not already in use
 
-    # Start the game loop in a separate thread
-    game_thread = threading.Thread(target=game_loop)
-    game_thread.start()
-
-    # Start the Flask-SocketIO server
-    socketio.run(app, host=host, port=port)
+    run_server(
+        host,
+        port,
+        headless=args.headless,
+        async_mode=args.async_mode,
+        dirty_rects=args.dirty_rects,
+    )
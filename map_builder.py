@@ -1,8 +1,12 @@
-import threading
 import main
+from mapfile import load_map, save_map
+from settings import MAP_FILE, WINDOW_HEIGHT, WINDOW_WIDTH
+from simulation import MapComponent
 
 from pynput import keyboard
 
+# Everything saved to MAP_FILE, new components are added as they're placed
+map_components = load_map(MAP_FILE)
 current_mapcomponent = None
 current_mapcomponent_x = None
 current_mapcomponent_y = None
@@ -20,9 +24,6 @@ def on_press(key):
     global current_mapcomponent_height
 
     if str(key) == "'n'":
-        print(
-            f"MapComponent({current_mapcomponent_width}, {current_mapcomponent_height}, {current_mapcomponent_color}, {current_mapcomponent_x}, {current_mapcomponent_y}),"
-        )
         if current_mapcomponent is not None:
             current_mapcomponent.reset_image(
                 current_mapcomponent_width,
@@ -31,14 +32,18 @@ def on_press(key):
                 current_mapcomponent_x,
                 current_mapcomponent_y,
             )
+            # The finished component keeps its texture in the map file
+            map_components.append(current_mapcomponent)
+            save_map(MAP_FILE, map_components)
+            print(f"Saved {len(map_components)} map components to {MAP_FILE}")
 
-        current_mapcomponent_x = main.camera_position.x + main.WINDOW_WIDTH / 2
-        current_mapcomponent_y = main.camera_position.y + main.WINDOW_HEIGHT / 2
+        current_mapcomponent_x = main.renderer.camera_position.x + WINDOW_WIDTH / 2
+        current_mapcomponent_y = main.renderer.camera_position.y + WINDOW_HEIGHT / 2
         current_mapcomponent_color = (255, 0, 0)
         current_mapcomponent_width = 200
         current_mapcomponent_height = 20
 
-        current_mapcomponent = main.MapComponent(
+        current_mapcomponent = MapComponent(
             current_mapcomponent_width,
             current_mapcomponent_height,
             current_mapcomponent_color,
@@ -46,9 +51,8 @@ def on_press(key):
             current_mapcomponent_y,
         )
 
-        main.map_components.append(current_mapcomponent)
-        main.all_sprites.add(current_mapcomponent)
-        main.collision_sprites.add(current_mapcomponent)
+        # The game thread applies the change between ticks
+        main.main_room.put("add_component", None, current_mapcomponent)
 
     if str(key) == "Key.left":
         current_mapcomponent_x -= 10
@@ -74,18 +78,16 @@ def on_press(key):
         current_mapcomponent_x,
         current_mapcomponent_y,
     )
+    main.main_room.put("update_component", None, current_mapcomponent)
 
 
 if __name__ == "__main__":
     host = "0.0.0.0"
     port = 5000  # You can use any port you like, but make sure it's not already in use
 
-    # Start the game loop in a separate thread
-    game_thread = threading.Thread(target=main.game_loop)
-    game_thread.start()
-
+    main.create_rooms()
     keyboard_listener = keyboard.Listener(on_press=on_press)
     keyboard_listener.start()
 
-    # Start the Flask-SocketIO server
-    main.socketio.run(main.app, host=host, port=port)
+    # Start the game loops and the Flask-SocketIO server
+    main.run_server(host, port)
@@ -0,0 +1,172 @@
+import os
+import struct
+
+from settings import WINDOW_HEIGHT
+from simulation import MapComponent
+
+# A map file is a header, the texture paths, a table of chunks and then the
+# map components, grouped by chunk. A component belongs to the chunk its top
+# edge is in, so a loader can read just the chunks around the camera.
+MAGIC = b"FROGMAP1"
+# Height of a chunk in pixels, a bit more than a screen
+CHUNK_HEIGHT = 1024
+
+# magic, chunk height, tallest component, texture count, chunk count
+HEADER = struct.Struct("<8sIIHI")
+# length of the texture path that follows
+TEXTURE = struct.Struct("<H")
+# chunk row, index of its first component, component count
+CHUNK = struct.Struct("<iII")
+# x, y, width, height, texture index
+COMPONENT = struct.Struct("<iiHHH")
+
+
+def save_map(path, components, chunk_height=CHUNK_HEIGHT):
+    # Components keep their order within a chunk
+    textures = {}
+    rows = {}
+    for component in components:
+        textures.setdefault(component.texture, len(textures))
+        rows.setdefault(component.rect.top // chunk_height, []).append(component)
+    tallest = max((component.rect.height for component in components), default=0)
+
+    chunks = []
+    records = []
+    for row in sorted(rows):
+        chunks.append(CHUNK.pack(row, len(records), len(rows[row])))
+        for component in rows[row]:
+            rect = component.rect
+            records.append(
+                COMPONENT.pack(
+                    rect.x, rect.y, rect.width, rect.height, textures[component.texture]
+                )
+            )
+
+    # Written next to it and swapped in, so nothing ever reads a half
+    # written map
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, chunk_height, tallest, len(textures), len(rows)))
+        for texture in textures:
+            name = texture.encode()
+            file.write(TEXTURE.pack(len(name)) + name)
+        file.write(b"".join(chunks))
+        file.write(b"".join(records))
+    os.replace(temporary, path)
+
+
+class MapFile:
+    # Reads the header and chunk table up front, and makes components only
+    # when a chunk is asked for. Every component with the same texture shares
+    # one path string, which the renderer's texture cache is keyed by.
+    #
+    # The whole file is read in at once, 14 bytes a component, so the map
+    # builder saving over it while a game streams it doesn't change the map
+    # under the game. The game picks up the new map when it's restarted.
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.data = file.read()
+        magic, self.chunk_height, self.tallest, texture_count, chunk_count = (
+            HEADER.unpack_from(self.data)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a map file")
+        offset = HEADER.size
+
+        self.textures = []
+        for _ in range(texture_count):
+            (length,) = TEXTURE.unpack_from(self.data, offset)
+            offset += TEXTURE.size
+            self.textures.append(self.data[offset : offset + length].decode())
+            offset += length
+
+        # row -> (index of the first component, component count)
+        self.chunks = {}
+        end = offset + CHUNK.size * chunk_count
+        for row, first, count in CHUNK.iter_unpack(self.data[offset:end]):
+            self.chunks[row] = (first, count)
+        self.components_start = end
+
+    def __len__(self):
+        return sum(count for _, count in self.chunks.values())
+
+    def read_chunk(self, row):
+        # Returns [(index in the map, component)] for one chunk
+        if row not in self.chunks:
+            return []
+        first, count = self.chunks[row]
+        start = self.components_start + first * COMPONENT.size
+        data = self.data[start : start + count * COMPONENT.size]
+        textures = self.textures
+        return [
+            (first + i, MapComponent(width, height, None, x, y, textures[texture]))
+            for i, (x, y, width, height, texture) in enumerate(
+                COMPONENT.iter_unpack(data)
+            )
+        ]
+
+    def read_all(self):
+        components = []
+        for row in sorted(self.chunks):
+            components += [component for _, component in self.read_chunk(row)]
+        return components
+
+    def close(self):
+        self.data = None
+
+
+def load_map(path):
+    map_file = MapFile(path)
+    try:
+        return map_file.read_all()
+    finally:
+        map_file.close()
+
+
+class MapStreamer:
+    # Keeps only the chunks near the frogs in the simulation. The camera
+    # follows the frogs, and the kill rule keeps them within a screen of each
+    # other, so this is the part of the map on screen plus a margin.
+    # Components stay at their index in the file, so collisions happen in the
+    # same order as with the whole map loaded.
+    def __init__(self, map_file, simulation, margin=WINDOW_HEIGHT):
+        self.map_file = map_file
+        self.simulation = simulation
+        self.margin = margin
+        # row -> [components]
+        self.loaded = {}
+        self.loads = 0
+        self.unloads = 0
+
+    def wanted_rows(self):
+        players = self.simulation.players.values()
+        if players:
+            top = min(player.rect.top for player in players)
+            bottom = max(player.rect.bottom for player in players)
+        else:
+            # Where new frogs spawn
+            top = bottom = WINDOW_HEIGHT // 2
+        height = self.map_file.chunk_height
+        # A component is filed under the chunk of its top edge, so a tall
+        # one can reach down from a chunk above the margin
+        first = (top - self.margin - self.map_file.tallest) // height
+        last = (bottom + self.margin) // height
+        return first, last
+
+    def update(self):
+        first, last = self.wanted_rows()
+        for row in range(first, last + 1):
+            if row not in self.loaded:
+                self.loaded[row] = []
+                for order, component in self.map_file.read_chunk(row):
+                    self.simulation.add_map_component(component, order)
+                    self.loaded[row].append(component)
+                self.loads += 1
+
+        # One chunk of slack, so a frog bouncing on a chunk edge doesn't
+        # load and unload it over and over
+        for row in list(self.loaded):
+            if row < first - 1 or row > last + 1:
+                for component in self.loaded.pop(row):
+                    self.simulation.remove_map_component(component)
+                self.unloads += 1
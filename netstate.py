@@ -0,0 +1,165 @@
+import struct
+
+from settings import (
+    FROG_FALLING,
+    FROG_FRAMES,
+    FROG_GRABBING,
+    FROG_JUMPING,
+    FROG_LEAPING,
+    FROG_STATIC,
+)
+
+# Broadcast every 4th tick, 15 Hz at 60 ticks per second
+BROADCAST_EVERY = 4
+# Broadcasts kept to diff against, a client whose last ack is older gets a
+# keyframe. 2 seconds at 15 Hz.
+HISTORY = 30
+
+KEYFRAME = 1
+DELTA = 2
+
+# kind, tick, base tick, full records, delta records, removed ids
+HEADER = struct.Struct("<BIIHHH")
+# net id, x, y, frame (bit 7 is facing left). The controller gets its own
+# frog's color when it joins and doesn't draw the others, so colors aren't
+# sent.
+FULL_RECORD = struct.Struct("<HiiB")
+# net id, which fields follow
+DELTA_RECORD = struct.Struct("<HB")
+SMALL_MOVE = struct.Struct("<hh")
+MOVE = struct.Struct("<ii")
+FRAME = struct.Struct("<B")
+REMOVED = struct.Struct("<H")
+
+# Delta record field bits
+MOVED_SMALL = 1
+MOVED = 2
+FRAME_CHANGED = 4
+
+FACING_LEFT = 0x80
+FRAME_INDEX = {frame: i for i, frame in enumerate(FROG_FRAMES)}
+# What the frog is doing, for each frame index
+FRAME_STATES = (
+    ["static"] * len(FROG_STATIC)
+    + ["jumping"] * len(FROG_JUMPING)
+    + ["falling"] * len(FROG_FALLING)
+    + ["leaping"] * len(FROG_LEAPING)
+    + ["grabbing"] * len(FROG_GRABBING)
+)
+
+
+def player_state(player):
+    frame = FRAME_INDEX[player.frame] | (FACING_LEFT if player.facing_left else 0)
+    return (player.rect[0], player.rect[1], frame)
+
+
+class StateBroadcaster:
+    # Encodes the game state for the phone controllers as packed binary,
+    # delta-encoded against the last state each controller acknowledged, so
+    # frogs that didn't move cost nothing. Frogs get small numeric net ids
+    # instead of their 20 character Socket.IO ids.
+    #
+    # Runs on the game thread; ack() is called from the Socket.IO handlers
+    # and only replaces a dict entry.
+    def __init__(self):
+        # Net ids aren't reused until they wrap around, so a controller's
+        # old state can't mix up two frogs, and after that only ones no
+        # frog has
+        self.net_ids = {}
+        self.used_ids = set()
+        self.next_net_id = 0
+        # tick -> {net id: state}
+        self.history = {}
+        self.acks = {}
+        self.bytes_sent = 0
+        self.messages_sent = 0
+
+    def ack(self, sprite_id, tick):
+        self.acks[sprite_id] = tick
+
+    def forget(self, sprite_id):
+        self.acks.pop(sprite_id, None)
+
+    def assign_net_ids(self, snapshot):
+        # Returns [(sprite id, net id)] for the frogs that are new
+        alive = {player.id for player in snapshot.players}
+        for sprite_id in list(self.net_ids):
+            if sprite_id not in alive:
+                self.used_ids.discard(self.net_ids.pop(sprite_id))
+
+        assigned = []
+        for player in snapshot.players:
+            if player.id not in self.net_ids:
+                net_id = self.next_net_id
+                while net_id in self.used_ids:
+                    net_id = (net_id + 1) % 65536
+                self.next_net_id = (net_id + 1) % 65536
+                self.net_ids[player.id] = net_id
+                self.used_ids.add(net_id)
+                assigned.append((player.id, net_id))
+        return assigned
+
+    def encode(self, tick, state, base_tick=None):
+        base = self.history.get(base_tick) if base_tick is not None else None
+        if base is None:
+            records = [
+                FULL_RECORD.pack(net_id, *values) for net_id, values in state.items()
+            ]
+            header = HEADER.pack(KEYFRAME, tick, 0, len(records), 0, 0)
+            return header + b"".join(records)
+
+        full = []
+        deltas = []
+        for net_id, values in state.items():
+            old = base.get(net_id)
+            if old is None:
+                full.append(FULL_RECORD.pack(net_id, *values))
+                continue
+            if old == values:
+                continue
+            fields = 0
+            data = b""
+            dx = values[0] - old[0]
+            dy = values[1] - old[1]
+            if dx or dy:
+                if -32768 <= dx <= 32767 and -32768 <= dy <= 32767:
+                    fields |= MOVED_SMALL
+                    data += SMALL_MOVE.pack(dx, dy)
+                else:
+                    fields |= MOVED
+                    data += MOVE.pack(values[0], values[1])
+            if values[2] != old[2]:
+                fields |= FRAME_CHANGED
+                data += FRAME.pack(values[2])
+            deltas.append(DELTA_RECORD.pack(net_id, fields) + data)
+        removed = [REMOVED.pack(net_id) for net_id in base if net_id not in state]
+
+        return (
+            HEADER.pack(DELTA, tick, base_tick, len(full), len(deltas), len(removed))
+            + b"".join(full)
+            + b"".join(deltas)
+            + b"".join(removed)
+        )
+
+    def broadcast(self, snapshot):
+        # Returns [(payload, [sprite ids])] to send. Controllers that acked
+        # the same tick, usually all of them, share one encoded payload.
+        state = {
+            self.net_ids[player.id]: player_state(player) for player in snapshot.players
+        }
+        self.history[snapshot.tick] = state
+        oldest = snapshot.tick - HISTORY * BROADCAST_EVERY
+        for tick in [tick for tick in self.history if tick <= oldest]:
+            del self.history[tick]
+
+        groups = {}
+        for player in snapshot.players:
+            groups.setdefault(self.acks.get(player.id), []).append(player.id)
+
+        messages = []
+        for base_tick, sprite_ids in groups.items():
+            payload = self.encode(snapshot.tick, state, base_tick)
+            messages.append((payload, sprite_ids))
+            self.bytes_sent += len(payload) * len(sprite_ids)
+            self.messages_sent += len(sprite_ids)
+        return messages
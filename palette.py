@@ -0,0 +1,41 @@
+import colorsys
+import string
+
+from settings import PLAYER_COLORS
+
+# Frog colors are names from PLAYER_COLORS or "#rrggbb". Players get the
+# named ones first, then colors with hues spread around the color wheel, so
+# colors don't repeat however many players join.
+GOLDEN_RATIO = 0.618033988749895
+# Lightness and saturation of the generated colors, about the original frog's
+GENERATED_LIGHTNESS = 0.4
+GENERATED_SATURATION = 0.8
+
+
+def color_rgb(color):
+    # (r, g, b) of a frog color, or None if it isn't one
+    if color in PLAYER_COLORS:
+        return tuple(PLAYER_COLORS[color])
+    if (
+        isinstance(color, str)
+        and len(color) == 7
+        and color[0] == "#"
+        and all(digit in string.hexdigits for digit in color[1:])
+    ):
+        value = int(color[1:], 16)
+        return (value >> 16, (value >> 8) & 0xFF, value & 0xFF)
+    return None
+
+
+def hex_color(rgb):
+    return "#{:02x}{:02x}{:02x}".format(*rgb)
+
+
+def player_color(index):
+    # Color of the index'th player to join
+    names = list(PLAYER_COLORS)
+    if index < len(names):
+        return names[index]
+    hue = (index - len(names)) * GOLDEN_RATIO % 1
+    rgb = colorsys.hls_to_rgb(hue, GENERATED_LIGHTNESS, GENERATED_SATURATION)
+    return hex_color(round(channel * 255) for channel in rgb)
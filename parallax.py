@@ -0,0 +1,89 @@
+import math
+from bisect import bisect_right
+from collections import OrderedDict
+
+import pygame
+
+# Height of the strips layers are cut into, in screen pixels
+CHUNK_HEIGHT = 256
+
+
+class ParallaxLayer:
+    # A background image scaled to width pixels wide and repeated in both
+    # directions, that moves depth pixels for each pixel the camera does (0
+    # stays put, 1 moves with the map). position is where the top left
+    # corner of one of its copies is with the camera at (0, 0).
+    #
+    # The whole scaled image is never made. It's cut into strips about
+    # CHUNK_HEIGHT high, each scaled and converted the first time it's on
+    # screen, and only as many strips are kept as fit on the screen, so the
+    # memory used doesn't depend on how tall the image or the tower is.
+    def __init__(self, image, depth, position, width, screen_height):
+        self.image = image
+        self.depth = depth
+        self.position = position
+        self.width = width
+        self.scale = width / image.get_width()
+        # Source rows in a strip, and where each strip starts once scaled
+        self.rows = max(1, round(CHUNK_HEIGHT / self.scale))
+        source_height = image.get_height()
+        self.tops = [
+            int(row * self.scale) for row in range(0, source_height, self.rows)
+        ]
+        self.height = int(source_height * self.scale)
+        self.tops.append(self.height)
+        # Layers with no see-through pixels are blitted without blending,
+        # and the screen doesn't need clearing behind them
+        self.opaque = pygame.mask.from_surface(image, 254).count() == (
+            image.get_width() * source_height
+        )
+        # strip index -> surface, least recently drawn first
+        self.chunks = OrderedDict()
+        # The most strips on screen at once, with a part of one at the top
+        # and the bottom
+        shortest = min(b - a for a, b in zip(self.tops, self.tops[1:]))
+        self.max_chunks = min(len(self.tops) - 1, screen_height // max(1, shortest) + 2)
+
+    def chunk(self, index):
+        chunk = self.chunks.get(index)
+        if chunk is not None:
+            self.chunks.move_to_end(index)
+            return chunk
+        top = index * self.rows
+        rows = min(self.rows, self.image.get_height() - top)
+        area = self.image.subsurface((0, top, self.image.get_width(), rows))
+        chunk = pygame.transform.scale(
+            area, (self.width, self.tops[index + 1] - self.tops[index])
+        )
+        chunk = chunk.convert() if self.opaque else chunk.convert_alpha()
+        self.chunks[index] = chunk
+        if len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return chunk
+
+    def draw(self, surface, camera_position):
+        screen_width, screen_height = surface.get_size()
+        # Whole pixels, rounded the same way on both sides of the origin
+        left = math.floor(self.position[0] - camera_position.x * self.depth)
+        top = math.floor(self.position[1] - camera_position.y * self.depth)
+        # The copies of the image on screen, starting with the one over 0
+        columns = range(-(-left % self.width), screen_width, self.width)
+        rows = range(-(-top % self.height), screen_height, self.height)
+        for copy_top in rows:
+            # Strips of this copy that are on screen, blits are clipped to
+            # the screen so only their visible rows are copied
+            start = max(0, -copy_top)
+            end = min(self.height, screen_height - copy_top)
+            index = bisect_right(self.tops, start) - 1
+            while index < len(self.tops) - 1 and self.tops[index] < end:
+                chunk = self.chunk(index)
+                y = copy_top + self.tops[index]
+                for x in columns:
+                    surface.blit(chunk, (x, y))
+                index += 1
+
+    def memory_usage(self):
+        # Bytes of pixel data held by the scaled strips
+        return sum(
+            chunk.get_pitch() * chunk.get_height() for chunk in self.chunks.values()
+        )
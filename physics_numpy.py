@@ -0,0 +1,283 @@
+import numpy as np
+
+from settings import (
+    FROG_FALLING,
+    FROG_GRABBING,
+    FROG_JUMPING,
+    FROG_LEAPING,
+    FROG_STATIC,
+)
+from simulation import FALLING, GRABBING_ANIMATION, JUMPING, LANDING_DEPTH, LEAPING
+
+# Animation kinds, in the priority order Player.animate() checks them
+SHOW_GRABBING, SHOW_JUMPING, SHOW_FALLING, SHOW_LEAPING, SHOW_STATIC = range(5)
+FRAME_LISTS = [FROG_GRABBING, FROG_JUMPING, FROG_FALLING, FROG_LEAPING, FROG_STATIC]
+
+
+class NumpyPhysics:
+    # Structure-of-arrays version of Player.update() for large player counts.
+    # Each tick the frogs' positions, velocities and flags are copied into
+    # NumPy arrays, friction, gravity, platform collisions and animation are
+    # integrated for all of them at once, and the results are written back.
+    #
+    # Frogs that are grabbing or being carried depend on each other through
+    # the carry logic and on the update order, so they are rare enough to go
+    # through the regular Player.update() after the batch.
+    def __init__(self, simulation):
+        self.simulation = simulation
+        self.map_version = None
+
+    def load_map(self):
+        # Platform bounds in insertion order, plus their order sorted by top
+        # edge for the broad phase
+        rects = [component.rect for component in self.simulation.map_index.ordered()]
+        bounds = np.array(
+            [(rect.left, rect.top, rect.right, rect.bottom) for rect in rects],
+            dtype=np.int64,
+        ).reshape(-1, 4)
+        self.left, self.top, self.right, self.bottom = bounds.T
+        self.by_top = np.argsort(self.top, kind="stable")
+        self.sorted_top = self.top[self.by_top]
+        self.max_height = int((self.bottom - self.top).max()) if len(bounds) else 0
+        self.map_version = self.simulation.map_version
+
+    def update(self, players):
+        if self.map_version != self.simulation.map_version:
+            self.load_map()
+
+        grabbing_ids = {player.id for player in players if player.grabbing}
+        free = []
+        carried = []
+        for player in players:
+            if player.grabbing or player.grabbed in grabbing_ids:
+                carried.append(player)
+            else:
+                free.append(player)
+
+        if free:
+            self.update_batch(free)
+        carrying = self.simulation.carried
+        for player in carried:
+            player.update(
+                self.simulation.map_index,
+                carrying.get(player.id),
+                self.simulation.scratch,
+            )
+
+    def update_batch(self, players):
+        state = np.array(
+            [
+                (
+                    player.rect.x,
+                    player.rect.y,
+                    player.rect.width,
+                    player.rect.height,
+                    player.velocity.x,
+                    player.velocity.y,
+                    player.friction,
+                    player.gravity,
+                    player.animation_counter,
+                    not player.grabbed,
+                    player.state,
+                )
+                for player in players
+            ],
+            dtype=np.float64,
+        )
+        x, y, w, h = state[:, :4].astype(np.int64).T
+        vx, vy, friction, gravity = state[:, 4:8].T.copy()
+        counter = state[:, 8].astype(np.int64)
+        can_fall = state[:, 9].astype(bool)
+        flags = state[:, 10].astype(np.int64)
+        leaping = (flags & LEAPING) != 0
+        jumping = (flags & JUMPING) != 0
+        falling = (flags & FALLING) != 0
+        grabbing_animation = (flags & GRABBING_ANIMATION) != 0
+
+        vx *= 1 - friction
+        # Rect.move_ip() truncates float offsets towards zero
+        x += np.trunc(vx).astype(np.int64)
+        y += np.trunc(vy).astype(np.int64)
+        leaping &= ~((vx < 5) & (vx > -5))
+
+        resting = self.collide(x, y, w, h, vx, vy, jumping, falling)
+
+        fall = ~resting & can_fall
+        vy[fall] += gravity[fall]
+        falling |= fall
+
+        kind, frame_idx, counter = self.animate(
+            counter, vy, leaping, jumping, falling, grabbing_animation
+        )
+
+        flags = (
+            leaping * LEAPING
+            | jumping * JUMPING
+            | falling * FALLING
+            | grabbing_animation * GRABBING_ANIMATION
+        )
+        frames = [FRAME_LISTS[k][i] for k, i in zip(kind.tolist(), frame_idx.tolist())]
+        for player, px, py, pvx, pvy, pcounter, pstate, frame in zip(
+            players,
+            x.tolist(),
+            y.tolist(),
+            vx.tolist(),
+            vy.tolist(),
+            counter.tolist(),
+            flags.tolist(),
+            frames,
+        ):
+            player.rect.topleft = (px, py)
+            player.velocity.update(pvx, pvy)
+            player.animation_counter = pcounter
+            player.state = pstate
+            player.frame = frame
+
+    def candidates(self, x, y, w, h, vx, vy):
+        # Broad phase: (player, platform) pairs whose rects can touch this
+        # tick, sorted by player and then by platform insertion order
+        n = len(x)
+        empty = np.empty(0, dtype=np.int64)
+        if not len(self.top):
+            return empty, empty, empty
+
+        # Same area as spatial.query_rect(), before and after the move plus
+        # the landing depth
+        old_x = x - np.trunc(vx).astype(np.int64)
+        old_y = y - np.trunc(vy).astype(np.int64)
+        margin = LANDING_DEPTH
+        region_left = np.minimum(x, old_x) - margin
+        region_right = np.maximum(x, old_x) + w + margin
+        region_top = np.minimum(y, old_y) - margin
+        region_bottom = np.maximum(y, old_y) + h + margin
+
+        # Only platforms whose top is within max_height above the region can
+        # reach into it
+        lo = np.searchsorted(self.sorted_top, region_top - self.max_height, "right")
+        hi = np.searchsorted(self.sorted_top, region_bottom, "left")
+        counts = np.maximum(hi - lo, 0)
+        total = int(counts.sum())
+        if not total:
+            return empty, empty, empty
+
+        pair_player = np.repeat(np.arange(n), counts)
+        starts = np.cumsum(counts) - counts
+        offsets = np.arange(total) - np.repeat(starts, counts) + np.repeat(lo, counts)
+        pair_platform = self.by_top[offsets]
+
+        overlap = (
+            (self.left[pair_platform] < region_right[pair_player])
+            & (self.right[pair_platform] > region_left[pair_player])
+            & (self.top[pair_platform] < region_bottom[pair_player])
+            & (self.bottom[pair_platform] > region_top[pair_player])
+        )
+        pair_player = pair_player[overlap]
+        pair_platform = pair_platform[overlap]
+        if not len(pair_player):
+            return empty, empty, empty
+
+        order = np.lexsort((pair_platform, pair_player))
+        pair_player = pair_player[order]
+        pair_platform = pair_platform[order]
+        group_start = np.searchsorted(pair_player, pair_player, "left")
+        rank = np.arange(len(pair_player)) - group_start
+        return pair_player, pair_platform, rank
+
+    def collide(self, x, y, w, h, vx, vy, jumping, falling):
+        # Narrow phase, same rules as Player.update(). A frog's collisions
+        # have to be resolved one platform at a time in order, so round k
+        # handles the k-th candidate platform of every frog at once.
+        resting = np.zeros(len(x), dtype=bool)
+        pair_player, pair_platform, rank = self.candidates(x, y, w, h, vx, vy)
+        if not len(rank):
+            return resting
+
+        for k in range(int(rank.max()) + 1):
+            in_round = rank == k
+            p = pair_player[in_round]
+            c = pair_platform[in_round]
+            left, top, right, bottom = (
+                self.left[c],
+                self.top[c],
+                self.right[c],
+                self.bottom[c],
+            )
+
+            # pygame.Rect.colliderect()
+            hit = (
+                (x[p] < right)
+                & (x[p] + w[p] > left)
+                & (y[p] < bottom)
+                & (y[p] + h[p] > top)
+            )
+            p, left, top, right, bottom = (
+                p[hit],
+                left[hit],
+                top[hit],
+                right[hit],
+                bottom[hit],
+            )
+            if not len(p):
+                continue
+
+            old_x = x[p] - np.trunc(vx[p]).astype(np.int64)
+            old_y = y[p] - np.trunc(vy[p]).astype(np.int64)
+
+            # Landing on the platform from above
+            land = (old_y + h[p] <= top) & (vy[p] > 0)
+            y[p[land]] = top[land] + LANDING_DEPTH - h[p[land]]
+            vy[p[land]] = 0
+            resting[p[land]] = True
+
+            # Resting on the platform
+            rest = y[p] + h[p] == top + LANDING_DEPTH
+            resting[p[rest]] = True
+            falling[p[rest]] = False
+            jumping[p[rest]] = False
+
+            # Hitting our head
+            head = old_y >= bottom
+            y[p[head]] = bottom[head]
+            vy[p[head]] = 0
+
+            # Hitting it from the left or the right
+            from_left = old_x + w[p] <= left
+            x[p[from_left]] = left[from_left] - w[p[from_left]]
+            vx[p[from_left]] = 0
+            from_right = old_x >= right
+            x[p[from_right]] = right[from_right]
+            vx[p[from_right]] = 0
+
+        return resting
+
+    def animate(self, counter, vy, leaping, jumping, falling, grabbing_animation):
+        # Player.animate() for every frog at once
+        kind = np.select(
+            [grabbing_animation, jumping, falling, leaping],
+            [SHOW_GRABBING, SHOW_JUMPING, SHOW_FALLING, SHOW_LEAPING],
+            SHOW_STATIC,
+        )
+
+        is_grabbing = kind == SHOW_GRABBING
+        grabbing_animation &= ~(is_grabbing & (counter > 12))
+
+        # Jumping turns into falling at the top of the jump
+        peaked = (kind == SHOW_JUMPING) & (vy > 0)
+        jumping &= ~peaked
+        falling |= peaked
+        counter[peaked] = 0
+
+        is_leaping = kind == SHOW_LEAPING
+        leaping &= ~(is_leaping & (counter > 6))
+
+        frame_idx = np.select(
+            [is_grabbing, kind == SHOW_JUMPING, kind == SHOW_FALLING, is_leaping],
+            [
+                np.minimum(counter // 6, len(FROG_GRABBING) - 1),
+                np.minimum((counter + 1) // 3, len(FROG_JUMPING) - 1),
+                0,
+                np.minimum(counter // 4, len(FROG_LEAPING) - 1),
+            ],
+            ((counter + 1) // 5) % len(FROG_STATIC),
+        )
+        return kind, frame_idx, counter + 1
@@ -0,0 +1,95 @@
+import threading
+import time
+
+from simulation import PlayerState
+from spatial import GridIndex
+
+# Hands snapshots from the simulation thread to the render thread. The
+# simulation publishes one after every tick of the room on the display, and
+# the renderer draws the frogs partway between the last two, by how far the
+# render clock is into the tick after the newest one. Drawing is a tick
+# behind the simulation, in exchange for frogs moving smoothly at any frame
+# rate, and a slow frame never holds up a tick.
+
+
+class SnapshotBuffer:
+    def __init__(self, tick_seconds):
+        self.tick_seconds = tick_seconds
+        self.lock = threading.Lock()
+        # (previous, current, perf_counter() when current was published)
+        self.snapshots = (None, None, 0.0)
+        self.published = 0
+        # The map the renderer draws. Snapshots share the simulation's map
+        # index and components, which the map streamer adds, removes and
+        # recycles as frogs climb, so the renderer gets an index of copies of
+        # them, made again whenever the map's version changes.
+        self.map_index = None
+        self.map_version = None
+
+    def publish(self, snapshot):
+        # Simulation thread
+        if snapshot.map_version != self.map_version:
+            self.map_index = copy_map(snapshot.map_index)
+            self.map_version = snapshot.map_version
+        snapshot = snapshot._replace(map_index=self.map_index)
+        with self.lock:
+            self.snapshots = (self.snapshots[1], snapshot, time.perf_counter())
+            self.published += 1
+
+    def latest(self):
+        # Render thread. The snapshot to draw now, or None before the first
+        # tick.
+        with self.lock:
+            previous, current, published_at = self.snapshots
+        if previous is None:
+            return current
+        fraction = (time.perf_counter() - published_at) / self.tick_seconds
+        return interpolate(previous, current, min(1.0, fraction))
+
+
+class ComponentView:
+    # What the renderer draws of a MapComponent, copied on the simulation
+    # thread so moving or recycling the component doesn't change it
+    __slots__ = ("texture", "color", "rect")
+
+    def __init__(self, component):
+        self.texture = component.texture
+        self.color = component.color
+        self.rect = component.rect.copy()
+
+
+def copy_map(map_index):
+    # A GridIndex of views of map_index's components, in the same order
+    index = GridIndex(map_index.cell_size)
+    items = map_index.items
+    for component in map_index.ordered():
+        index.insert(ComponentView(component), items[component][0])
+    return index
+
+
+def interpolate(previous, current, fraction):
+    # current with the frogs that are in both moved back towards where they
+    # were in previous, fraction 0 is previous and 1 is current. Everything
+    # but their position comes from current.
+    if fraction >= 1.0:
+        return current
+    before = {player.id: player.rect for player in previous.players}
+    players = []
+    for player in current.players:
+        rect = before.get(player.id)
+        if rect is not None:
+            x, y, width, height = player.rect
+            player = PlayerState(
+                player.id,
+                player.color,
+                (
+                    round(rect[0] + (x - rect[0]) * fraction),
+                    round(rect[1] + (y - rect[1]) * fraction),
+                    width,
+                    height,
+                ),
+                player.frame,
+                player.facing_left,
+            )
+        players.append(player)
+    return current._replace(players=tuple(players))
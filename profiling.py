@@ -0,0 +1,128 @@
+import csv
+import threading
+import time
+from collections import deque
+
+# Rolling window for the percentiles, 10 seconds at 60 FPS
+FRAME_WINDOW = 600
+# Where a simulation tick goes, in the order simulation_loop() runs them
+TICK_PHASES = [
+    "input",
+    "physics",
+    "death_checks",
+    # State broadcasts, the other rooms on the game thread and the events from
+    # the worker processes' rooms
+    "rooms",
+    # Handing the snapshot to the render thread
+    "publish",
+]
+# Where a drawn frame goes, in the order render_loop() runs them
+FRAME_PHASES = [
+    "event_pump",
+    # Picking the snapshot to draw and moving the frogs between ticks
+    "interpolate",
+    "camera",
+    "background",
+    "sprites",
+    "text",
+    "overlay",
+    "flip",
+    # Capturing the frame for --stream, encoding happens on other threads
+    "stream",
+]
+PHASES = TICK_PHASES + FRAME_PHASES
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class FrameProfiler:
+    # Times each phase of every frame. Code calls lap(phase) when it finishes
+    # a phase, which charges the time since the previous lap to that phase.
+    # A phase can run more than once per frame (several simulation ticks in
+    # one frame), its laps add up. The game has one for the simulation
+    # ticks and one for the drawn frames, which run on different threads.
+    def __init__(self, window=FRAME_WINDOW, phases=PHASES):
+        self.phases = phases
+        self.lock = threading.Lock()
+        self.history = {phase: deque(maxlen=window) for phase in phases + ["frame"]}
+        # When the frames in history started, for the frame rate
+        self.starts = deque(maxlen=window)
+        self.frame = dict.fromkeys(phases, 0.0)
+        self.frame_start = self.last = time.perf_counter()
+        self.frames = 0
+        self.trace_file = None
+        self.trace = None
+
+    def start_trace(self, path):
+        # One CSV row per frame with every phase in milliseconds
+        self.trace_file = open(path, "w", newline="")
+        self.trace = csv.writer(self.trace_file)
+        self.trace.writerow(["frame", "time"] + self.phases + ["frame_ms"])
+
+    def begin_frame(self):
+        self.frame = dict.fromkeys(self.phases, 0.0)
+        self.frame_start = self.last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.frame[phase] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        total = time.perf_counter() - self.frame_start
+        with self.lock:
+            for phase, seconds in self.frame.items():
+                self.history[phase].append(seconds)
+            self.history["frame"].append(total)
+            self.starts.append(self.frame_start)
+        if self.trace is not None:
+            self.trace.writerow(
+                [self.frames, f"{self.frame_start:.6f}"]
+                + [f"{self.frame[phase] * 1000:.4f}" for phase in self.phases]
+                + [f"{total * 1000:.4f}"]
+            )
+        self.frames += 1
+
+    def rate(self):
+        # Frames a second over the window
+        with self.lock:
+            if len(self.starts) < 2:
+                return 0.0
+            return (len(self.starts) - 1) / (self.starts[-1] - self.starts[0])
+
+    def summary(self):
+        # Rolling percentiles per phase in milliseconds
+        with self.lock:
+            history = {phase: list(samples) for phase, samples in self.history.items()}
+        return {
+            "frames": self.frames,
+            "per_second": self.rate(),
+            "phases_ms": {
+                phase: {
+                    "p50": percentile(samples, 0.5) * 1000,
+                    "p95": percentile(samples, 0.95) * 1000,
+                    "p99": percentile(samples, 0.99) * 1000,
+                }
+                for phase, samples in history.items()
+            },
+        }
+
+    def overlay_lines(self, name="frame"):
+        summary = self.summary()
+        title = f"{name}s {summary['per_second']:.0f}/s"
+        lines = [f"{title:<13}{'p50':>8}{'p95':>8}{'p99':>8}  ms"]
+        for phase, stats in summary["phases_ms"].items():
+            lines.append(
+                f"{phase:<13}{stats['p50']:>8.2f}{stats['p95']:>8.2f}{stats['p99']:>8.2f}"
+            )
+        return lines
+
+    def close(self):
+        if self.trace_file is not None:
+            self.trace_file.close()
+            self.trace_file = self.trace = None
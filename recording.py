@@ -0,0 +1,164 @@
+import hashlib
+import struct
+
+from settings import TICK_RATE
+from simulation import FALLING, GRABBING_ANIMATION, JUMPING, LEAPING
+
+# A recording is a header saying which map was played, then one record per
+# command the game applied, in the order it applied them, with the tick it
+# was applied on. Every few seconds there's a checkpoint record with a hash
+# of the frogs' state, so a replay can check it plays out the same and find
+# where it stops doing so. Records are only ever appended, a recording cut
+# off by a crash or a freeze replays up to its last whole record, one that
+# was closed ends with a checkpoint of the final state.
+MAGIC = b"FROGREC2"
+# Recordings from before player numbers were widened to 32 bits, they ran
+# out after 65536 joins
+OLD_MAGIC = b"FROGREC1"
+
+# magic, tick rate, whether a tower seed follows, tower seed, map path length
+HEADER = struct.Struct("<8sHBiH")
+# tick, kind, player
+EVENT = struct.Struct("<IBI")
+OLD_EVENT = struct.Struct("<IBH")
+# joystick x, y
+MOVE = struct.Struct("<hh")
+# length of the color name that follows
+COLOR = struct.Struct("<B")
+# sha256 of the state at the start of the tick
+CHECKPOINT = struct.Struct("<32s")
+
+# Controller commands, by their code in the file
+KINDS = ["connect", "move", "grab", "disconnect"]
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+CHECKPOINT_CODE = 255
+# Ticks between checkpoints, the file is also flushed to disk then, so a
+# crash loses at most this much
+CHECKPOINT_EVERY = 10 * TICK_RATE
+
+
+def state_hash(simulation):
+    # Everything about the frogs that affects what happens next. Frogs are
+    # told apart by the order they joined in rather than their ids, which a
+    # replay doesn't have. The animation bits are hashed as the separate
+    # flags they used to be, so older recordings still check out.
+    order = {sprite_id: i for i, sprite_id in enumerate(simulation.players)}
+    digest = hashlib.sha256(str(simulation.tick).encode())
+    for player in simulation.players.values():
+        digest.update(
+            repr(
+                (
+                    player.color,
+                    tuple(player.rect),
+                    tuple(player.velocity),
+                    order.get(player.grabbed, False),
+                    player.grabbing,
+                    bool(player.state & JUMPING),
+                    bool(player.state & LEAPING),
+                    bool(player.state & FALLING),
+                    player.facing_left,
+                    bool(player.state & GRABBING_ANIMATION),
+                    player.animation_counter,
+                    player.frame,
+                )
+            ).encode()
+        )
+    return digest.digest()
+
+
+class Recorder:
+    # Writes the commands a room applies. Players are numbered in the order
+    # they first connect, so recordings don't contain the Socket.IO ids.
+    def __init__(self, path, map_path, tower_seed=None):
+        self.file = open(path, "wb")
+        name = map_path.encode()
+        self.file.write(
+            HEADER.pack(
+                MAGIC, TICK_RATE, tower_seed is not None, tower_seed or 0, len(name)
+            )
+            + name
+        )
+        self.players = {}
+        self.events = 0
+
+    def checkpoint(self, simulation, force=False):
+        # Called at the start of every tick
+        if force or simulation.tick % CHECKPOINT_EVERY == 0:
+            self.file.write(
+                EVENT.pack(simulation.tick, CHECKPOINT_CODE, 0)
+                + CHECKPOINT.pack(state_hash(simulation))
+            )
+            self.file.flush()
+
+    def record(self, tick, kind, sprite_id, args):
+        code = KIND_CODES.get(kind)
+        if code is None:
+            # Map editing commands from map_builder.py aren't recorded
+            return
+        player = self.players.setdefault(sprite_id, len(self.players))
+        record = EVENT.pack(tick, code, player)
+        if kind == "move":
+            record += MOVE.pack(*args)
+        elif kind == "connect":
+            color = args.encode()
+            record += COLOR.pack(len(color)) + color
+        self.file.write(record)
+        self.events += 1
+
+    def close(self, simulation):
+        # A last checkpoint, so replays run to where the game stopped
+        self.checkpoint(simulation, force=True)
+        self.file.close()
+
+
+class Recording:
+    # Reads a recording. events is [(tick, kind, player, args)] and
+    # checkpoints is {tick: state hash}.
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, self.tick_rate, has_seed, seed, length = HEADER.unpack_from(data)
+        if magic == MAGIC:
+            event = EVENT
+        elif magic == OLD_MAGIC:
+            event = OLD_EVENT
+        else:
+            raise ValueError(f"{path} is not a recording")
+        offset = HEADER.size
+        self.map_path = data[offset : offset + length].decode()
+        self.tower_seed = seed if has_seed else None
+        offset += length
+
+        self.events = []
+        self.checkpoints = {}
+        self.ticks = 0
+        # Stops at the end, or at a record cut off part way
+        while offset + event.size <= len(data):
+            tick, code, player = event.unpack_from(data, offset)
+            offset += event.size
+            if code == CHECKPOINT_CODE:
+                if offset + CHECKPOINT.size > len(data):
+                    break
+                (self.checkpoints[tick],) = CHECKPOINT.unpack_from(data, offset)
+                offset += CHECKPOINT.size
+                self.ticks = tick
+                continue
+
+            kind = KINDS[code]
+            args = None
+            if kind == "move":
+                if offset + MOVE.size > len(data):
+                    break
+                args = MOVE.unpack_from(data, offset)
+                offset += MOVE.size
+            elif kind == "connect":
+                if offset + COLOR.size > len(data):
+                    break
+                (length,) = COLOR.unpack_from(data, offset)
+                if offset + COLOR.size + length > len(data):
+                    break
+                args = data[offset + COLOR.size : offset + COLOR.size + length].decode()
+                offset += COLOR.size + length
+            self.events.append((tick, kind, player, args))
+            # Replays run through the tick of the last command
+            self.ticks = max(self.ticks, tick + 1)
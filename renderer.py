@@ -0,0 +1,234 @@
+import pygame
+
+from assets import load_assets
+from hud import Hud
+from parallax import ParallaxLayer
+from settings import BACKGROUND_LAYERS, FULLSCREEN, WINDOW_HEIGHT, WINDOW_WIDTH
+from sprite_atlas import SpriteAtlas
+
+
+class Renderer:
+    # Draws simulation snapshots to the pygame window. The simulation never
+    # calls into the renderer, so it can run without one.
+    def __init__(self, port_string="", fullscreen=FULLSCREEN, dirty_rects=False):
+        pygame.init()
+        if fullscreen:
+            self.screen = pygame.display.set_mode(
+                (WINDOW_WIDTH, WINDOW_HEIGHT), pygame.FULLSCREEN
+            )
+        else:
+            self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+
+        # Decoded images, from the asset bundle when it's up to date
+        self.assets = load_assets()
+        # Back to front
+        self.background_layers = [
+            ParallaxLayer(
+                self.assets.textures[path],
+                depth,
+                position,
+                self.screen.get_width(),
+                self.screen.get_height(),
+            )
+            for path, depth, position in BACKGROUND_LAYERS
+        ]
+        # Frog frames, shaded to each player's color when first drawn
+        # Nothing is shaded until frogs are drawn, see /metrics or F3 for
+        # how much it holds
+        self.sprite_atlas = SpriteAtlas(self.assets.frog_sources)
+
+        # Map component textures, scaled once per (texture, size)
+        self.textures = {}
+        self.hud = Hud(port_string)
+
+        # Only draw map components inside the viewport
+        self.cull = True
+
+        # In dirty rect mode the background and map are drawn to
+        # self.scene when the camera moves. While it stands still, only the
+        # areas under the frogs are restored from it and sent to the display.
+        self.dirty_rects = dirty_rects
+        self.scene = None
+        self.scene_key = None
+        self.previous_rects = []
+
+        # Frame profiler overlay, toggled with F3, and the simulation tick
+        # profiler shown under it when the simulation has its own thread
+        self.show_overlay = False
+        self.overlay_surfaces = []
+        self.tick_profiler = None
+
+        # Tracks our "camera position" to move everything around.
+        self.camera_position = pygame.Vector2(0, 0)
+
+    def handle_events(self):
+        # Returns False once the window has been closed
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.show_overlay = not self.show_overlay
+        return True
+
+    def component_image(self, component):
+        if component.color is not None:
+            image = pygame.Surface(component.rect.size)
+            image.fill(component.color)
+            return image
+
+        key = (component.texture, component.rect.size)
+        image = self.textures.get(key)
+        if image is None:
+            image = self.assets.textures.get(component.texture)
+            if image is None:
+                # A texture that isn't in settings.MAPCOMPONENTS
+                image = pygame.image.load(component.texture).convert_alpha()
+            image = pygame.transform.scale(image, component.rect.size)
+            self.textures[key] = image
+        return image
+
+    def update_camera(self, snapshot):
+        # Get average player coordinates
+        if snapshot.players:
+            avg_x = sum(
+                [player.rect[0] + player.rect[2] // 2 for player in snapshot.players]
+            ) / len(snapshot.players)
+            avg_y = sum(
+                [player.rect[1] + player.rect[3] // 2 for player in snapshot.players]
+            ) / len(snapshot.players)
+            self.camera_position = pygame.Vector2(
+                avg_x - WINDOW_WIDTH / 2, avg_y - WINDOW_HEIGHT / 2
+            )
+
+    def draw_overlay(self, profiler):
+        # Update the numbers twice a second, rendering text every frame would
+        # show up in the numbers
+        if profiler.frames % 30 == 0 or not self.overlay_surfaces:
+            lines = profiler.overlay_lines()
+            if self.tick_profiler is not None:
+                lines += self.tick_profiler.overlay_lines("tick")
+            lines.append(self.sprite_atlas.report())
+            self.overlay_surfaces = [
+                self.hud.cache.render(line, 16, (255, 255, 255), "monospace", (0, 0, 0))
+                for line in lines
+            ]
+        rects = []
+        y = 10
+        for surface in self.overlay_surfaces:
+            rects.append(self.screen.blit(surface, (10, y)))
+            y += surface.get_height()
+        return rects
+
+    def draw_scene(self, surface, snapshot, camera_position, profiler=None):
+        # Everything that only changes when the camera moves
+        # Fill the screen with a white background, unless the back layer
+        # covers all of it
+        if not self.background_layers or not self.background_layers[0].opaque:
+            surface.fill((255, 255, 255))
+        for layer in self.background_layers:
+            layer.draw(surface, camera_position)
+        if profiler is not None:
+            profiler.lap("background")
+
+        if self.cull:
+            viewport = pygame.Rect(camera_position, (WINDOW_WIDTH, WINDOW_HEIGHT))
+            components = snapshot.map_index.query(viewport)
+        else:
+            components = snapshot.map_index
+        for component in components:
+            surface.blit(
+                self.component_image(component),
+                component.rect.topleft - camera_position,
+            )
+
+    def draw_players(self, snapshot, camera_position):
+        # Returns the screen rects the frogs were drawn to
+        screen_width, screen_height = self.screen.get_size()
+        drawn = []
+        self.sprite_atlas.pin({player.color for player in snapshot.players})
+        for player in snapshot.players:
+            image = self.sprite_atlas.get(
+                player.frame, player.color, player.facing_left
+            )
+            # Whole pixels like a Rect, without making one for every frog
+            x = int(player.rect[0] - camera_position.x)
+            y = int(player.rect[1] - camera_position.y)
+            if (
+                x < screen_width
+                and y < screen_height
+                and x + image.get_width() > 0
+                and y + image.get_height() > 0
+            ):
+                drawn.append(self.screen.blit(image, (x, y)))
+        return drawn
+
+    def draw(self, snapshot, profiler=None):
+        self.update_camera(snapshot)
+        # Whole pixels, so a camera that stands still draws the map at
+        # exactly the same place every frame
+        camera_position = pygame.Vector2(
+            int(self.camera_position.x), int(self.camera_position.y)
+        )
+        if profiler is not None:
+            profiler.lap("camera")
+
+        if self.dirty_rects:
+            self.draw_dirty(snapshot, camera_position, profiler)
+            return
+
+        self.draw_scene(self.screen, snapshot, camera_position, profiler)
+        self.draw_players(snapshot, camera_position)
+        if profiler is not None:
+            profiler.lap("sprites")
+
+        self.hud.update(snapshot)
+        self.hud.draw(self.screen)
+        if profiler is not None:
+            profiler.lap("text")
+            if self.show_overlay:
+                self.draw_overlay(profiler)
+            profiler.lap("overlay")
+
+        pygame.display.flip()
+        if profiler is not None:
+            profiler.lap("flip")
+
+    def draw_dirty(self, snapshot, camera_position, profiler=None):
+        scene_key = (camera_position.x, camera_position.y, snapshot.map_version)
+        if scene_key != self.scene_key:
+            # The camera moved, redraw the scene and the whole display
+            if self.scene is None:
+                self.scene = pygame.Surface(self.screen.get_size()).convert()
+            self.draw_scene(self.scene, snapshot, camera_position, profiler)
+            self.screen.blit(self.scene, (0, 0))
+            self.scene_key = scene_key
+            dirty = None
+        else:
+            # Erase the frogs, HUD and overlay of the last frame
+            for rect in self.previous_rects:
+                self.screen.blit(self.scene, rect, rect)
+            dirty = self.previous_rects
+            if profiler is not None:
+                profiler.lap("background")
+
+        drawn = self.draw_players(snapshot, camera_position)
+        if profiler is not None:
+            profiler.lap("sprites")
+        self.hud.update(snapshot)
+        drawn += self.hud.draw(self.screen)
+        if profiler is not None:
+            profiler.lap("text")
+            if self.show_overlay:
+                drawn += self.draw_overlay(profiler)
+            profiler.lap("overlay")
+
+        if dirty is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty + drawn)
+        self.previous_rects = drawn
+        if profiler is not None:
+            profiler.lap("flip")
+
+    def close(self):
+        pygame.quit()
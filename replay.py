@@ -0,0 +1,117 @@
+import argparse
+import sys
+import time
+from collections import defaultdict
+
+from netstate import HEADER
+from profiling import percentile
+from recording import Recording, state_hash
+from rooms import Room
+from settings import TICK_RATE
+
+# How many of the slowest ticks to list
+SLOWEST = 5
+
+
+def replay(recording, physics="python"):
+    # Plays a recording back headless, as fast as it goes. Returns the time
+    # each tick took, the hash of the state at the end, and the first
+    # checkpoint where the state wasn't the recorded one, or None.
+    room = Room(
+        "replay",
+        physics=physics,
+        map_path=recording.map_path,
+        tower_seed=recording.tower_seed,
+    )
+    simulation = room.simulation
+    events = defaultdict(list)
+    for tick, kind, player, args in recording.events:
+        events[tick].append((kind, f"p{player}", args))
+
+    tick_times = []
+    mismatch = None
+    while simulation.tick < recording.ticks:
+        expected = recording.checkpoints.get(simulation.tick)
+        if expected is not None and mismatch is None:
+            if state_hash(simulation) != expected:
+                mismatch = simulation.tick
+        for kind, sprite_id, args in events.get(simulation.tick, ()):
+            room.put(kind, sprite_id, args)
+
+        start = time.perf_counter()
+        room_events = room.tick()
+        tick_times.append(time.perf_counter() - start)
+
+        # Every controller acks every state broadcast straight away, so the
+        # broadcasts cost what they do for controllers on a good connection
+        for event, args, to in room_events:
+            if event == "state":
+                tick = HEADER.unpack_from(args[0])[1]
+                for sprite_id in to:
+                    room.put("ack", sprite_id, tick)
+    return tick_times, state_hash(simulation), mismatch
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="replay a recording made with main.py --record"
+    )
+    parser.add_argument("recording")
+    parser.add_argument(
+        "--physics",
+        choices=["python", "numpy"],
+        default="python",
+        help="physics backend to replay with",
+    )
+    parser.add_argument(
+        "--expect",
+        metavar="HASH",
+        help="final state hash printed by a replay on another version",
+    )
+    args = parser.parse_args()
+
+    recording = Recording(args.recording)
+    if recording.tick_rate != TICK_RATE:
+        print(
+            f"Recorded at {recording.tick_rate} ticks a second, "
+            f"the game now runs {TICK_RATE}, the replay won't match"
+        )
+    players = len({player for _, _, player, _ in recording.events})
+    print(
+        f"{len(recording.events)} commands from {players} players over "
+        f"{recording.ticks} ticks ({recording.ticks / recording.tick_rate:.0f} s), "
+        f"{len(recording.checkpoints)} checkpoints"
+    )
+
+    start = time.perf_counter()
+    tick_times, final, mismatch = replay(recording, args.physics)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Replayed in {elapsed:.2f} s, {len(tick_times) / elapsed:.0f} ticks a second, "
+        f"{len(tick_times) / TICK_RATE / elapsed:.1f}x real time"
+    )
+    print(
+        "Tick ms: "
+        + ", ".join(
+            f"p{int(p * 100)} {percentile(tick_times, p) * 1000:.3f}"
+            for p in (0.5, 0.9, 0.99)
+        )
+        + f", max {max(tick_times, default=0.0) * 1000:.3f}"
+    )
+    slowest = sorted(range(len(tick_times)), key=tick_times.__getitem__)[-SLOWEST:]
+    print(
+        "Slowest ticks: "
+        + ", ".join(
+            f"{tick} ({tick_times[tick] * 1000:.2f} ms)" for tick in reversed(slowest)
+        )
+    )
+    print(f"Final state: {final.hex()}")
+
+    failed = False
+    if mismatch is not None:
+        print(f"State differs from the recording at the checkpoint on tick {mismatch}")
+        failed = True
+    if args.expect is not None and args.expect != final.hex():
+        print(f"Final state differs from {args.expect}")
+        failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,267 @@
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+
+from commands import CommandQueue
+from controls import HeldInputs
+from mapfile import MapFile, MapStreamer
+from netstate import BROADCAST_EVERY, StateBroadcaster
+from profiling import percentile
+from recording import Recorder
+from settings import MAP_FILE, TICK_RATE
+from simulation import Simulation
+from tower import TowerGenerator
+
+# Room controllers join when they don't ask for one, the one on the display
+DEFAULT_ROOM = "main"
+# How many recent tick times to keep for the percentiles
+TICK_SAMPLES = 600
+# Seconds between metrics reports from the worker processes
+REPORT_EVERY = 1.0
+
+
+class Room:
+    # One independent game: its own simulation, map, controller input and
+    # state broadcasts. Controllers in other rooms never see it.
+    #
+    # tick() returns the Socket.IO events the room wants sent, as
+    # [(event, args, to)], so the same room can run on the game thread or in
+    # a worker process that has no Socket.IO server.
+    def __init__(
+        self, name, physics="python", map_path=MAP_FILE, tower_seed=None, record=None
+    ):
+        self.name = name
+        self.simulation = Simulation(map_components=[], physics=physics)
+        if tower_seed is not None:
+            self.map_streamer = TowerGenerator(self.simulation, seed=tower_seed)
+        else:
+            self.map_streamer = MapStreamer(MapFile(map_path), self.simulation)
+        self.command_queue = CommandQueue()
+        self.inputs = HeldInputs()
+        self.broadcaster = StateBroadcaster()
+        self.tick_times = deque(maxlen=TICK_SAMPLES)
+        # Path to record the room's commands to, for replay.py
+        self.recorder = None
+        if record is not None:
+            self.recorder = Recorder(record, map_path, tower_seed)
+
+    def put(self, kind, sprite_id, args=None):
+        # Input from a controller, from any thread
+        if kind == "ack":
+            self.broadcaster.ack(sprite_id, args)
+            return
+        if kind == "disconnect":
+            self.broadcaster.forget(sprite_id)
+        self.command_queue.put(kind, sprite_id, args)
+
+    def tick(self, profiler=None):
+        start = time.perf_counter()
+        simulation = self.simulation
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.checkpoint(simulation)
+        # Before the commands, jumping checks for ground under the frog
+        self.map_streamer.update()
+        inputs = self.inputs
+        players = simulation.players
+        for kind, sprite_id, args, _ in self.command_queue.drain():
+            if kind == "input":
+                # A dead frog's controller keeps sending until the player
+                # rejoins, which connects before any of its new input
+                if sprite_id in players:
+                    inputs.received(sprite_id, *args, simulation.tick)
+                continue
+            if kind == "disconnect":
+                inputs.forget(sprite_id)
+            self.apply(kind, sprite_id, args)
+        # New inputs and held ones that are due again, in the same order
+        # whichever controller's came in first. Recorded as the moves and
+        # grabs they stand for.
+        for sprite_id, joystick, grab in inputs.due(simulation.tick, players):
+            self.apply("move", sprite_id, joystick)
+            if grab:
+                self.apply("grab", sprite_id, None)
+        if profiler is not None:
+            profiler.lap("input")
+
+        dead = simulation.step(profiler)
+        events = [
+            ("input_ack", (sequence,), sprite_id)
+            for sprite_id, sequence in inputs.take_acks()
+        ]
+        # Tell the players whose frogs died
+        for dead_player_id in dead:
+            inputs.forget(dead_player_id)
+            events.append(("frog_dead", (), dead_player_id))
+        if simulation.tick % BROADCAST_EVERY == 0:
+            snapshot = simulation.snapshot()
+            for sprite_id, net_id in self.broadcaster.assign_net_ids(snapshot):
+                events.append(("net_id", (net_id,), sprite_id))
+            for payload, sprite_ids in self.broadcaster.broadcast(snapshot):
+                events.append(("state", (payload,), sprite_ids))
+        self.tick_times.append(time.perf_counter() - start)
+        return events
+
+    def apply(self, kind, sprite_id, args):
+        if self.recorder is not None:
+            self.recorder.record(self.simulation.tick, kind, sprite_id, args)
+        self.simulation.apply(kind, sprite_id, args)
+
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.close(self.simulation)
+
+    def metrics(self):
+        times = list(self.tick_times)
+        return {
+            "players": len(self.simulation.players),
+            "tick": self.simulation.tick,
+            "tick_ms": {
+                "p50": percentile(times, 0.5) * 1000,
+                "p99": percentile(times, 0.99) * 1000,
+                "max": max(times, default=0.0) * 1000,
+            },
+            # Share of the 1 / TICK_RATE seconds a tick can take that the
+            # slowest ticks use. Rooms sharing a core share one budget.
+            "budget_used": percentile(times, 0.99) * TICK_RATE,
+            "input_queue": self.command_queue.metrics(),
+            "state_broadcast": {
+                "bytes_sent": self.broadcaster.bytes_sent,
+                "messages_sent": self.broadcaster.messages_sent,
+            },
+        }
+
+
+def run_worker(worker, rooms, inbox, outbox):
+    # Main loop of a worker process. Steps its rooms at TICK_RATE, like
+    # simulation_loop() in main.py, and sends their events back to the server.
+    # rooms is [(name, Room() keyword arguments)].
+    rooms = {name: Room(name, **options) for name, options in rooms}
+    tick_seconds = 1 / TICK_RATE
+    previous = time.perf_counter()
+    lag = 0.0
+    busy = 0.0
+    # Ticks dropped because the worker fell more than a few ticks behind
+    dropped = 0
+    next_report = previous + REPORT_EVERY
+    while True:
+        now = time.perf_counter()
+        while True:
+            try:
+                messages = inbox.get_nowait()
+            except queue.Empty:
+                break
+            if messages is None:
+                return
+            for name, kind, sprite_id, args in messages:
+                rooms[name].put(kind, sprite_id, args)
+
+        lag += now - previous
+        previous = now
+        if lag > tick_seconds * 5:
+            dropped += int(lag / tick_seconds) - 5
+            lag = tick_seconds * 5
+        events = []
+        while lag >= tick_seconds:
+            for room in rooms.values():
+                events += room.tick()
+            lag -= tick_seconds
+        if events:
+            outbox.put(("events", worker, events))
+        end = time.perf_counter()
+        busy += end - now
+
+        if end >= next_report:
+            outbox.put(
+                (
+                    "metrics",
+                    worker,
+                    {
+                        "rooms": {name: room.metrics() for name, room in rooms.items()},
+                        # Share of the time spent ticking rather than waiting
+                        "load": busy / (end - next_report + REPORT_EVERY),
+                        "dropped_ticks": dropped,
+                        "time": end,
+                    },
+                )
+            )
+            busy = 0.0
+            next_report = end + REPORT_EVERY
+        time.sleep(max(0.0, tick_seconds - lag))
+
+
+class RoomPool:
+    # Runs headless rooms in worker processes so they can use every core.
+    # Rooms are dealt out to the workers round robin and stay on theirs.
+    #
+    # Controller input is batched and sent to each worker once a frame by
+    # flush(), a queue message per event costs more than the event itself.
+    def __init__(self, names, workers, **options):
+        # Spawned rather than forked, the server may have threads running
+        context = multiprocessing.get_context("spawn")
+        self.outbox = context.Queue()
+        self.inboxes = []
+        self.processes = []
+        # room name -> worker index
+        self.worker_of = {}
+        workers = max(1, min(workers, len(names)))
+        for worker in range(workers):
+            group = names[worker::workers]
+            inbox = context.Queue()
+            process = context.Process(
+                target=run_worker,
+                args=(worker, [(name, options) for name in group], inbox, self.outbox),
+                daemon=True,
+            )
+            process.start()
+            self.inboxes.append(inbox)
+            self.processes.append(process)
+            for name in group:
+                self.worker_of[name] = worker
+        self.lock = threading.Lock()
+        # Input waiting for flush(), per worker
+        self.pending = [[] for _ in self.inboxes]
+        # Latest reports from the workers
+        self.room_metrics = {}
+        self.worker_metrics = {}
+
+    def __contains__(self, name):
+        return name in self.worker_of
+
+    def put(self, name, kind, sprite_id, args=None):
+        # From any thread
+        with self.lock:
+            self.pending[self.worker_of[name]].append((name, kind, sprite_id, args))
+
+    def flush(self):
+        with self.lock:
+            pending = self.pending
+            self.pending = [[] for _ in pending]
+        for inbox, messages in zip(self.inboxes, pending):
+            if messages:
+                inbox.put(messages)
+
+    def events(self):
+        # The events the rooms sent since the last call, as [(event, args,
+        # to)]. Also picks up the latest metrics.
+        events = []
+        while True:
+            try:
+                kind, worker, data = self.outbox.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "events":
+                events += data
+            else:
+                self.room_metrics.update(data.pop("rooms"))
+                self.worker_metrics[worker] = data
+        return events
+
+    def close(self):
+        self.flush()
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
@@ -1,78 +1,180 @@
+import argparse
+import hashlib
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+
 import cv2
 import numpy as np
 
-from main import PLAYER_COLORS
-
+from settings import IMAGES_FOLDER, PLAYER_COLORS, SPRITE_FOLDER
 
-def convert_color_space(input_folder, output_folder, target_color, target_color_name):
-    # Create the output folder if it doesn't exist
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+# Where the original frog sprites are
+SOURCE_FOLDER = SPRITE_FOLDER
+# Kept in the output folder, has the source hash and color each output was
+# made from, so outputs that would come out the same aren't made again
+MANIFEST = "manifest.json"
+# Change when the recoloring changes, so every output is made again
+VERSION = 1
+# Hue and lightness of the original frogs, in OpenCV's HLS ranges
+SOURCE_HUE = 44
+SOURCE_LIGHTNESS = 105
 
-    # List all files in the input folder
-    files = os.listdir(input_folder)
 
-    for file_name in files:
+def load_frames(input_folder):
+    # Returns [(file name, BGRA image, sha256 of the file)] of the frog sprites
+    frames = []
+    for file_name in sorted(os.listdir(input_folder)):
         if file_name.endswith(".png") and "Frog" in file_name:
-            # Read the image with alpha channel
-            img_path = os.path.join(input_folder, file_name)
-            img = cv2.imread(img_path, cv2.IMREAD_UNCHANGED)
-
+            with open(os.path.join(input_folder, file_name), "rb") as file:
+                data = file.read()
+            img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
             if img is not None:
-                # Separate alpha channel
-                alpha_channel = img[:, :, 3]
-
-                # Convert to RGB
-                img_rgb = cv2.cvtColor(img, cv2.COLOR_RGBA2RGB)
-
-                # Convert color space to HLS (Hue, Lightness, Saturation)
-                img_hls = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2HLS)
-
-                # Extract individual channels
-                h, l, s = cv2.split(img_hls)
-
-                # Convert target color to HLS
-                hls_target = cv2.cvtColor(
-                    np.uint8([[target_color]]), cv2.COLOR_RGB2HLS
-                )[0][0]
-                target_hue = hls_target[0]
-
-                # Adjust hue and scale lightness
-                hue_diff = 44 - target_hue
-                h = np.mod(h + hue_diff, 180).astype(
-                    np.uint8
-                )  # Ensure hue stays within [0, 180]
-                l = np.clip(l * (hls_target[1] / 105), 0, 255).astype(
-                    np.uint8
-                )  # Scale lightness
-                s = np.clip(s * (hls_target[2] / 255), 0, 255).astype(np.uint8)
-
-                # Merge channels
-                img_hls = cv2.merge((h, l, s))
-
-                # Convert back to RGB
-                converted_img_rgb = cv2.cvtColor(img_hls, cv2.COLOR_HLS2RGB)
-
-                # Combine with alpha channel
-                converted_img_rgba = cv2.cvtColor(converted_img_rgb, cv2.COLOR_RGB2RGBA)
-                converted_img_rgba[:, :, 3] = alpha_channel
-
-                # Append color name to the end of the file name
-                file_name = file_name.split(".")[0] + f"{target_color_name}.png"
-
-                # Write the converted image to the output folder
-                output_path = os.path.join(output_folder, file_name)
-                cv2.imwrite(output_path, converted_img_rgba)
-
-
-# Input and output folders
-input_folder = "imgs"
-output_folder = "color_rotated_imgs"
-
-# Target color (in RGB format)
-target_color = [102, 51, 153]  # Example: purple color
-
-# Convert color space for images in the input folder and save to output folder
-for color_name, color_rgb in PLAYER_COLORS.items():
-    convert_color_space(input_folder, output_folder, color_rgb, color_name)
+                frames.append((file_name, img, hashlib.sha256(data).hexdigest()))
+    return frames
+
+
+def to_pixels(images):
+    # Every pixel of every image in one row, so OpenCV converts them all in
+    # one call. Returns the row and where each image starts in it. A row and
+    # not a column, OpenCV rounds a few pixels differently in one pixel wide
+    # images.
+    offsets = np.cumsum([0] + [img.shape[0] * img.shape[1] for img in images])
+    pixels = np.concatenate(
+        [img.reshape(1, -1, img.shape[2]) for img in images], axis=1
+    )
+    return pixels, offsets
+
+
+def from_pixels(pixels, offsets, shapes):
+    return [
+        pixels[0, start:end].reshape(height, width, -1)
+        for start, end, (height, width) in zip(offsets, offsets[1:], shapes)
+    ]
+
+
+def to_hls(images):
+    # The images' HLS pixels, doesn't depend on the target color so it's
+    # done once for every color
+    pixels, offsets = to_pixels(images)
+    hls = cv2.cvtColor(np.ascontiguousarray(pixels[:, :, :3]), cv2.COLOR_RGB2HLS)
+    return from_pixels(hls, offsets, [img.shape[:2] for img in images])
+
+
+def recolor(hls, target_color):
+    # Rotates the hue of HLS pixels to target_color (RGB) and scales their
+    # lightness and saturation to it. Takes any shape, returns RGB pixels.
+    hls_target = cv2.cvtColor(np.uint8([[target_color]]), cv2.COLOR_RGB2HLS)[0][0]
+    target_hue = int(hls_target[0])
+    # Each channel's new value only depends on its old one, so work them out
+    # for the 256 values a channel can have and look the pixels up in those
+    values = np.arange(256)
+
+    # Adjust hue and scale lightness. Signed, so hues below the target's
+    # wrap around the 180 of OpenCV's hue range rather than uint8's 256.
+    hue_diff = SOURCE_HUE - target_hue
+    h = np.mod(values + hue_diff, 180).astype(np.uint8)
+    l = np.clip(values * (hls_target[1] / SOURCE_LIGHTNESS), 0, 255).astype(np.uint8)
+    s = np.clip(values * (hls_target[2] / 255), 0, 255).astype(np.uint8)
+
+    table = np.stack((h, l, s), axis=-1).reshape(1, 256, 3)
+    return cv2.cvtColor(cv2.LUT(hls, table), cv2.COLOR_HLS2RGB)
+
+
+def output_name(file_name, color_name):
+    # Frog_Static1.png -> Frog_Static1Green.png
+    return file_name.split(".")[0] + f"{color_name}.png"
+
+
+def write_color(output_folder, target_color, frames):
+    # Runs in a worker process with more than one worker. frames is
+    # [(output name, HLS pixels, alpha)], all recolored in one pass.
+    hls, offsets = to_pixels([frame_hls for _, frame_hls, _ in frames])
+    rgb = from_pixels(
+        recolor(hls, target_color),
+        offsets,
+        [frame_hls.shape[:2] for _, frame_hls, _ in frames],
+    )
+    for (name, _, alpha), frame_rgb in zip(frames, rgb):
+        # Combine with alpha channel
+        img = np.dstack((frame_rgb, alpha))
+        cv2.imwrite(os.path.join(output_folder, name), img)
+    return [name for name, _, _ in frames]
+
+
+def rotate_colors(
+    input_folder=SOURCE_FOLDER,
+    output_folder=IMAGES_FOLDER,
+    colors=PLAYER_COLORS,
+    workers=os.cpu_count(),
+    force=False,
+):
+    # Makes every frog sprite in every color, a color at a time in worker
+    # processes. Returns how many outputs were made and how many were
+    # already up to date.
+    os.makedirs(output_folder, exist_ok=True)
+    manifest_path = os.path.join(output_folder, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+    if manifest.get("version") != VERSION:
+        manifest = {"version": VERSION, "outputs": {}}
+    outputs = manifest["outputs"]
+
+    frames = load_frames(input_folder)
+    hls = to_hls([img for _, img, _ in frames])
+    tasks = []
+    entries = {}
+    for color_name, color in colors.items():
+        todo = []
+        for (file_name, img, source_hash), frame_hls in zip(frames, hls):
+            name = output_name(file_name, color_name)
+            entries[name] = {"source": source_hash, "color": list(color)}
+            if (
+                force
+                or outputs.get(name) != entries[name]
+                or not os.path.exists(os.path.join(output_folder, name))
+            ):
+                todo.append((name, frame_hls, img[:, :, 3]))
+        if todo:
+            tasks.append((color, todo))
+
+    made = 0
+    if tasks:
+        if workers == 1:
+            results = [write_color(output_folder, color, todo) for color, todo in tasks]
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                futures = [
+                    pool.submit(write_color, output_folder, color, todo)
+                    for color, todo in tasks
+                ]
+                results = [future.result() for future in futures]
+        for names in results:
+            for name in names:
+                outputs[name] = entries[name]
+                made += 1
+        with open(manifest_path, "w") as file:
+            json.dump(manifest, file, indent=2, sort_keys=True)
+    return made, len(entries) - made
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="make the frog sprites in every color in settings.py"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="processes to recolor in, one per core by default",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="make every output again, even the ones that are up to date",
+    )
+    args = parser.parse_args()
+    made, skipped = rotate_colors(workers=args.workers, force=args.force)
+    print(f"Made {made} sprites, {skipped} already up to date")
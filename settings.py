@@ -0,0 +1,61 @@
+# Constants shared by the simulation, the renderer and the tools. Importing
+# this module has no side effects, so it is safe to use without a display.
+FULLSCREEN = True
+WINDOW_WIDTH = 1920
+WINDOW_HEIGHT = 1080
+GROUND_HEIGHT = 900
+TICK_RATE = 60  # Simulation steps per second
+# Most frames drawn per second. Frogs are drawn between the positions of
+# the last two ticks, so they move smoothly at any frame rate.
+MAX_FPS = 120
+# Frog sprites in their original green, shaded to each player's color when
+# they join
+SPRITE_FOLDER = "imgs"
+# The same sprites in the PLAYER_COLORS, made by rotate_colors.py
+IMAGES_FOLDER = "color_rotated_imgs"
+FROG_STATIC = [
+    f"{IMAGES_FOLDER}/Frog_Static1.png",
+    f"{IMAGES_FOLDER}/Frog_Static2.png",
+    f"{IMAGES_FOLDER}/Frog_Static3.png",
+    f"{IMAGES_FOLDER}/Frog_Static4.png",
+]
+FROG_JUMPING = [
+    f"{IMAGES_FOLDER}/Frog_Jumping1.png",
+    f"{IMAGES_FOLDER}/Frog_Jumping2.png",
+]
+FROG_FALLING = [
+    f"{IMAGES_FOLDER}/Frog_Falling1.png",
+]
+FROG_LEAPING = [
+    f"{IMAGES_FOLDER}/Frog_Leaping1.png",
+    f"{IMAGES_FOLDER}/Frog_Leaping2.png",
+]
+FROG_GRABBING = [
+    f"{IMAGES_FOLDER}/Frog_Grabbing1.png",
+    f"{IMAGES_FOLDER}/Frog_Grabbing2.png",
+]
+FROG_FRAMES = FROG_STATIC + FROG_JUMPING + FROG_FALLING + FROG_LEAPING + FROG_GRABBING
+# Size of the player hitbox, Frog_Static1.png scaled to 2/3
+PLAYER_SIZE = (66, 66)
+MAPCOMPONENTS = [
+    f"imgs/MapElement1.png",
+    f"imgs/MapElement2.png",
+    # f"imgs/MapElement3.png",
+]
+# Background layers, back to front, see parallax.py: image, how far the
+# layer moves for each pixel the camera does, and where the top left corner
+# of the image is when the game starts. Images are scaled to the window
+# width and repeat both ways, this one shows the middle of the room at first.
+BACKGROUND_LAYERS = [("imgs/Background.png", 0.1, (0, -3000))]
+# The built-in level, made with map_builder.py
+MAP_FILE = "maps/level.frogmap"
+
+PLAYER_COLORS = {
+    "Green": (0, 255, 0),
+    "DarkTeal": (48, 102, 89),
+    "BurntOrange": (187, 127, 0),
+    "Pink": (223, 167, 232),
+    "Yellow": (255, 255, 0),
+    "YellowGreen": (107, 154, 0),
+    "Magenta": (201, 0, 133),
+}
@@ -0,0 +1,420 @@
+import random
+from collections import namedtuple
+
+import pygame
+
+from settings import (
+    FROG_FALLING,
+    FROG_GRABBING,
+    FROG_JUMPING,
+    FROG_LEAPING,
+    FROG_STATIC,
+    MAPCOMPONENTS,
+    MAP_FILE,
+    PLAYER_SIZE,
+    WINDOW_HEIGHT,
+    WINDOW_WIDTH,
+)
+from spatial import GridIndex, PointIndex, query_rect
+
+# The simulation only uses pygame's Rect and Vector2 classes, neither of
+# which needs a display, so it runs headless as fast as step() is called.
+
+# What the renderer needs to draw a frog for one tick
+PlayerState = namedtuple("PlayerState", ["id", "color", "rect", "frame", "facing_left"])
+Snapshot = namedtuple("Snapshot", ["tick", "players", "map_index", "map_version"])
+
+# Pixels per tick
+GRAVITY = 1.8
+JUMP_SPEED = 30
+# How far in front of a frog it can grab another one, in pixels
+GRAB_REACH = 180
+# Pixels a frog sinks into the platform it stands on
+LANDING_DEPTH = 10
+
+# Bits of Player.state. More than one can be set at a time, animate() shows
+# the first one set in this order.
+GRABBING_ANIMATION = 1
+JUMPING = 2
+FALLING = 4
+LEAPING = 8
+
+
+class MapComponent:
+    __slots__ = ("texture", "color", "rect")
+
+    def __init__(self, width, height, color, x, y, texture=None):
+        # The renderer loads and scales the texture, the simulation only needs the rect
+        if texture is None:
+            texture = random.choice(MAPCOMPONENTS)
+        self.texture = texture
+        self.color = None
+        self.rect = pygame.Rect(0, 0, width, height)
+        self.rect.topleft = (x, y)
+
+    def reset_image(self, width, height, color, x, y):
+        # Draw as a flat color instead of the texture (used by the map builder)
+        self.color = color
+        self.rect = pygame.Rect(0, 0, width, height)
+        self.rect.topleft = (x, y)
+
+
+class Player:
+    # Slots instead of a __dict__ for each of what can be thousands of frogs
+    __slots__ = (
+        "color",
+        "frame",
+        "rect",
+        "velocity",
+        "gravity",
+        "friction",
+        "id",
+        "grabbing",
+        "grabbed",
+        "animation_counter",
+        "facing_left",
+        "state",
+    )
+
+    def __init__(self, sprite_id, color):
+        self.color = color
+        self.frame = FROG_STATIC[0]
+        self.rect = pygame.Rect((0, 0), PLAYER_SIZE)
+        self.rect.center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
+        self.velocity = pygame.Vector2(0, 0)
+        self.gravity = GRAVITY
+        self.friction = 0.1  # Add friction attribute
+        self.id = sprite_id
+        self.grabbing = False
+        self.grabbed = False
+
+        self.animation_counter = 0
+        self.facing_left = False
+        # Animation bits, LEAPING, JUMPING, FALLING and GRABBING_ANIMATION
+        self.state = 0
+
+    def update(self, map_index, carried=None, scratch=None):
+        # carried is {id: frog} of the frogs this one is carrying, scratch a
+        # Rect to reuse for the collision query
+        self.velocity.x *= 1 - self.friction
+        self.rect.move_ip(self.velocity.x, self.velocity.y)
+        if self.velocity.x < 5 and self.velocity.x > -5:
+            self.state &= ~LEAPING
+
+        # Vertical collision detection
+        falling = True
+        # Only the platforms near the frog can collide with it
+        for component in map_index.query(
+            query_rect(self.rect, self.velocity, out=scratch)
+        ):
+            if self.rect.colliderect(component.rect):
+                # Use linear interpolation to estimate the position of the sprite at the time of collision (before, since we're being lazy, and not using penetration depth)
+                # This will allow us to detect the direction of the collision
+                old_rect = self.rect.move(-self.velocity.x, -self.velocity.y)
+
+                # If we're above the object, we're probably landing on it.
+                if old_rect.bottom <= component.rect.top and self.velocity.y > 0:
+                    self.rect.bottom = component.rect.top + LANDING_DEPTH
+                    self.velocity.y = 0
+                    falling = False
+
+                # Check if we're resting on the object vertically
+                if self.rect.bottom == component.rect.top + LANDING_DEPTH:
+                    falling = False
+                    self.state &= ~(FALLING | JUMPING)
+
+                # If we're below the object, we're probably hitting our head.
+                if old_rect.top >= component.rect.bottom:
+                    self.rect.top = component.rect.bottom
+                    self.velocity.y = 0
+
+                # If we're to the left of the object, we probably hit it from the right.
+                if old_rect.right <= component.rect.left:
+                    self.rect.right = component.rect.left
+                    self.velocity.x = 0
+
+                # If we're to the right of the object, we probably hit it from the left.
+                if old_rect.left >= component.rect.right:
+                    self.rect.left = component.rect.right
+                    self.velocity.x = 0
+
+        if falling and not self.grabbed:
+            self.velocity.y += self.gravity
+            self.state |= FALLING
+
+        if self.grabbing and carried:
+            # Move the frogs we're carrying along with us
+            for sprite in carried.values():
+                sprite.rect.x = self.rect.x
+                sprite.rect.y = self.rect.y - 63
+
+        self.animate()
+
+    def animate(self):
+        state = self.state
+        if state & GRABBING_ANIMATION:
+            idx = min(int((self.animation_counter) / 6), len(FROG_GRABBING) - 1)
+            frame = FROG_GRABBING[idx]
+            if self.animation_counter > 12:
+                self.state &= ~GRABBING_ANIMATION
+        elif state & JUMPING:
+            if self.velocity.y > 0:
+                self.state = state & ~JUMPING | FALLING
+                self.animation_counter = 0
+            idx = min(int((self.animation_counter + 1) / 3), len(FROG_JUMPING) - 1)
+            frame = FROG_JUMPING[idx]
+        elif state & FALLING:
+            idx = 0
+            frame = FROG_FALLING[idx]
+        elif state & LEAPING:
+            idx = min(int((self.animation_counter) / 4), len(FROG_LEAPING) - 1)
+            frame = FROG_LEAPING[idx]
+            if self.animation_counter > 6:
+                self.state &= ~LEAPING
+        else:
+            idx = int((self.animation_counter + 1) / 5) % len(FROG_STATIC)
+            frame = FROG_STATIC[idx]
+
+        # The renderer looks the frame up in the sprite atlas
+        self.frame = frame
+
+        self.animation_counter += 1
+
+
+def create_level():
+    # The whole built-in level, see mapfile.py
+    from mapfile import load_map
+
+    return load_map(MAP_FILE)
+
+
+class Simulation:
+    # Game state and rules, advanced one fixed timestep at a time by step().
+    # Velocities are in pixels per tick, so a tick is always 1 / TICK_RATE s.
+    def __init__(self, map_components=None, physics="python"):
+        self.players = {}
+        # grabber id -> {id: frog} of the frogs it's carrying
+        self.carried = {}
+        # Frog centers, for finding who a frog can grab. Rebuilt on the first
+        # grab of a tick, or after frogs join or die.
+        self.player_index = PointIndex()
+        self.player_index_tick = None
+        # Spatial index over the map components for collision checks
+        self.map_index = GridIndex()
+        # Bumped whenever a map component is added, moved or removed
+        self.map_version = 0
+        self.tick = 0
+        # Reused every tick instead of making new ones: the frogs being
+        # stepped, and the rect collision queries are worked out in
+        self.stepped = []
+        self.scratch = pygame.Rect(0, 0, 0, 0)
+        if physics == "numpy":
+            # Optional, only needed for very large player counts
+            from physics_numpy import NumpyPhysics
+
+            self.physics = NumpyPhysics(self)
+        else:
+            self.physics = None
+        if map_components is None:
+            map_components = create_level()
+        for component in map_components:
+            self.add_map_component(component)
+
+    def add_map_component(self, component, order=None):
+        # order is the component's place in the map file, so collisions see
+        # streamed in components in the same order as a fully loaded map
+        self.map_index.insert(component, order)
+        self.map_version += 1
+
+    def remove_map_component(self, component):
+        self.map_index.remove(component)
+        self.map_version += 1
+
+    def update_map_component(self, component):
+        # Call after moving or resizing a component so collisions see it
+        self.map_index.update(component)
+        self.map_version += 1
+
+    def add_player(self, sprite_id, color):
+        player = Player(sprite_id, color=color)
+        self.players[sprite_id] = player
+        self.player_index_tick = None
+        return player
+
+    def remove_player(self, sprite_id):
+        sprite = self.players.get(sprite_id)
+        if sprite:
+            self.kill(sprite)
+        return sprite
+
+    def move(self, sprite_id, joyx, joyy):
+        sprite = self.players.get(sprite_id)
+
+        if sprite:
+            if joyy >= 50:
+                # Check if the sprite is on the ground or standing on a map component
+                if self.map_index.collides(sprite.rect):
+                    sprite.velocity.y = -JUMP_SPEED
+                    sprite.state |= JUMPING
+                    sprite.animation_counter = 0
+
+            if joyx < 5:
+                sprite.velocity.x = joyx / 5
+                sprite.facing_left = True
+                sprite.state |= LEAPING
+            elif joyx > 5:
+                sprite.facing_left = False
+                sprite.velocity.x = joyx / 5
+                sprite.state |= LEAPING
+
+    def grab(self, sprite_id):
+        sprite = self.players.get(sprite_id)
+        if sprite is None:
+            return
+
+        if sprite.grabbing:
+            sprite.grabbing = False
+            for object_sprite in self.carried.pop(sprite.id, {}).values():
+                object_sprite.grabbed = False
+
+                # Add velocity to the grabbed sprite like a throw based on direction of sprite
+                object_sprite.velocity.x = -20 if sprite.facing_left else 20
+
+        # Grab the nearest frog in front of us, if there is one
+        if not sprite.grabbing:
+            sprite.state |= GRABBING_ANIMATION
+            sprite.animation_counter = 0
+            target = self.grab_target(sprite)
+            if target is not None:
+                self.carry(sprite, target)
+
+    def grab_target(self, sprite):
+        # The frog whose center is nearest sprite's, in a straight line, out
+        # of the ones in the GRAB_REACH x 20 pixel box in front of it. Ties
+        # go to whoever joined first.
+        if self.player_index_tick != self.tick:
+            self.player_index.rebuild(self.players.values())
+            self.player_index_tick = self.tick
+        x, y = sprite.rect.center
+        left = x - GRAB_REACH if sprite.facing_left else x
+        target = None
+        nearest = None
+        for object_sprite in self.player_index.query(
+            pygame.Rect(left, y - 10, GRAB_REACH, 20)
+        ):
+            dx = abs(object_sprite.rect.centerx - x)
+            dy = abs(object_sprite.rect.centery - y)
+            # The edges of the box are out of reach
+            if 0 < dx < GRAB_REACH and dy < 10:
+                distance = dx * dx + dy * dy
+                if nearest is None or distance < nearest:
+                    target = object_sprite
+                    nearest = distance
+        return target
+
+    def carry(self, sprite, object_sprite):
+        # A frog can only be carried by one other frog at a time
+        if object_sprite.grabbed is not False:
+            self.carried[object_sprite.grabbed].pop(object_sprite.id, None)
+        object_sprite.grabbed = sprite.id
+        self.carried.setdefault(sprite.id, {})[object_sprite.id] = object_sprite
+        sprite.grabbing = True
+
+    def apply(self, kind, sprite_id, args):
+        # Run a command from the controllers' CommandQueue
+        if kind == "move":
+            self.move(sprite_id, *args)
+        elif kind == "grab":
+            self.grab(sprite_id)
+        elif kind == "connect":
+            self.add_player(sprite_id, color=args)
+        elif kind == "add_component":
+            self.add_map_component(args)
+        elif kind == "update_component":
+            self.update_map_component(args)
+        elif kind == "disconnect":
+            if self.remove_player(sprite_id):
+                print(f"Sprite {sprite_id} removed")
+            else:
+                print(f"No sprite found for id {sprite_id}")
+
+    def kill(self, sprite):
+        # Remove a dead frog and drop anyone it was carrying
+        for grabbed_sprite in self.carried.pop(sprite.id, {}).values():
+            grabbed_sprite.grabbed = False
+        if sprite.grabbed is not False:
+            self.carried[sprite.grabbed].pop(sprite.id, None)
+        self.players.pop(sprite.id, None)
+        self.player_index_tick = None
+
+    def step(self, profiler=None):
+        # Advance the game by one tick, returns the ids of the frogs that died
+        dead = []
+        # A copy, frogs are killed while going through it
+        sprites_list = self.stepped
+        sprites_list[:] = self.players.values()
+
+        if self.physics is not None:
+            self.physics.update(sprites_list)
+        else:
+            # Update each sprite individually with the map components for collision detection
+            carried = self.carried
+            for sprite in sprites_list:
+                sprite.update(self.map_index, carried.get(sprite.id), self.scratch)
+        if profiler is not None:
+            profiler.lap("physics")
+
+        # Kill lowest players if needed
+        # We have to find if they all fit vertically, so find the max distance between the highest and lowest player
+        current_lowest_player = None
+        current_highest_player = None
+        for player in self.players.values():
+            if (
+                current_lowest_player is None
+                or player.rect.bottom > current_lowest_player.rect.bottom
+            ):
+                current_lowest_player = player
+            if (
+                current_highest_player is None
+                or player.rect.top < current_highest_player.rect.top
+            ):
+                current_highest_player = player
+
+        if current_lowest_player is not None and current_highest_player is not None:
+            if (
+                current_lowest_player.rect.bottom - current_highest_player.rect.top
+                > WINDOW_HEIGHT
+            ):
+                # Kill the lowest player
+                self.kill(current_lowest_player)
+                dead.append(current_lowest_player.id)
+
+        for sprite in sprites_list:
+            if (
+                sprite.rect.top > WINDOW_HEIGHT and sprite.id in self.players
+            ):  # Assuming falling off the screen means death
+                self.kill(sprite)
+                dead.append(sprite.id)
+
+        if profiler is not None:
+            profiler.lap("death_checks")
+
+        self.tick += 1
+        return dead
+
+    def snapshot(self):
+        return Snapshot(
+            self.tick,
+            tuple(
+                PlayerState(
+                    player.id,
+                    player.color,
+                    tuple(player.rect),
+                    player.frame,
+                    player.facing_left,
+                )
+                for player in self.players.values()
+            ),
+            self.map_index,
+            self.map_version,
+        )
@@ -0,0 +1,128 @@
+# Platforms are around 200 x 80 pixels, so most of them touch 1 to 4 cells
+CELL_SIZE = 256
+
+
+class GridIndex:
+    # Uniform grid over the rects of static objects (map components). Each
+    # object is stored in every cell its rect touches, so a query only has to
+    # look at the cells under the query rect instead of at every object.
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        # item -> (insertion order, cells it was stored in)
+        self.items = {}
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        return (
+            range(rect.left // size, (rect.right - 1) // size + 1),
+            range(rect.top // size, (rect.bottom - 1) // size + 1),
+        )
+
+    def insert(self, item, order=None):
+        # order places the item among the others in query results, by
+        # default after everything inserted so far
+        columns, rows = self.cell_range(item.rect)
+        keys = [(column, row) for column in columns for row in rows]
+        for key in keys:
+            self.cells.setdefault(key, []).append(item)
+        if order is None:
+            order = self.counter
+        self.items[item] = (order, keys)
+        self.counter = max(self.counter, order + 1)
+
+    def remove(self, item):
+        order, keys = self.items.pop(item)
+        for key in keys:
+            cell = self.cells[key]
+            cell.remove(item)
+            if not cell:
+                del self.cells[key]
+        return order
+
+    def update(self, item):
+        # Re-index an item whose rect changed, keeping its place in the order
+        self.insert(item, self.remove(item))
+
+    def ordered(self):
+        items = self.items
+        return sorted(items, key=lambda item: items[item][0])
+
+    def query(self, rect):
+        # Items whose rect overlaps rect, in the order they were inserted, so
+        # collision handling sees them in the same order as the full list.
+        columns, rows = self.cell_range(rect)
+        found = set()
+        for column in columns:
+            for row in rows:
+                cell = self.cells.get((column, row))
+                if cell is not None:
+                    for item in cell:
+                        if item.rect.colliderect(rect):
+                            found.add(item)
+        if len(found) > 1:
+            items = self.items
+            return sorted(found, key=lambda item: items[item][0])
+        return list(found)
+
+    def collides(self, rect):
+        columns, rows = self.cell_range(rect)
+        for column in columns:
+            for row in rows:
+                for item in self.cells.get((column, row), ()):
+                    if item.rect.colliderect(rect):
+                        return True
+        return False
+
+
+class PointIndex:
+    # Spatial hash of the centers of moving objects (frogs). They all move
+    # every tick, so instead of being updated one by one it's rebuilt from
+    # scratch, at most once a tick and only when something queries it.
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def rebuild(self, items):
+        # Items keep the order they're given in within a cell
+        size = self.cell_size
+        cells = {}
+        for order, item in enumerate(items):
+            x, y = item.rect.center
+            cells.setdefault((x // size, y // size), []).append((order, item))
+        self.cells = cells
+
+    def query(self, rect):
+        # Items whose center is in or on the edge of rect, in the order they
+        # were given to rebuild()
+        size = self.cell_size
+        found = []
+        for column in range(rect.left // size, rect.right // size + 1):
+            for row in range(rect.top // size, rect.bottom // size + 1):
+                for order, item in self.cells.get((column, row), ()):
+                    x, y = item.rect.center
+                    if rect.left <= x <= rect.right and rect.top <= y <= rect.bottom:
+                        found.append((order, item))
+        found.sort(key=lambda entry: entry[0])
+        return [item for _, item in found]
+
+
+def query_rect(rect, velocity, margin=10, out=None):
+    # Area a moving rect can touch while its collisions are resolved: its
+    # position before and after the move, plus the 10 pixels it sinks into
+    # platforms it lands on. Worked out in out if it's given, a Rect to reuse.
+    if out is None:
+        out = rect.copy()
+    else:
+        out.update(rect)
+    out.move_ip(-velocity.x, -velocity.y)
+    out.union_ip(rect)
+    out.inflate_ip(margin * 2, margin * 2)
+    return out
@@ -0,0 +1,211 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+from palette import color_rgb
+from settings import SPRITE_FOLDER
+
+# Frogs are drawn at 2/3 of the size of the source PNGs
+SPRITE_SCALE = 2 / 3
+# Hue and lightness of the original frogs, in OpenCV's HLS ranges like
+# rotate_colors.py
+SOURCE_HUE = 44
+SOURCE_LIGHTNESS = 105
+# Colors whose frames are kept. Colors on screen are used every frame, so
+# only the frames of colors nobody is playing any more get dropped.
+MAX_COLORS = 64
+# Sector of the color wheel -> where blue, green and red come from in
+# hls_to_rgb()'s table
+SECTORS = np.array([[1, 3, 0], [1, 0, 2], [3, 0, 1], [0, 2, 1], [0, 1, 3], [2, 1, 0]])
+
+
+def rgb_to_hls(rgb):
+    # uint8 RGB pixels to HLS, hue 0-180 and the rest 0-255, like OpenCV's
+    # COLOR_RGB2HLS
+    rgb = rgb.astype(np.float32) * np.float32(1 / 255)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    vmax = rgb.max(axis=-1)
+    vmin = rgb.min(axis=-1)
+    diff = vmax - vmin
+    l = (vmax + vmin) * np.float32(0.5)
+    grey = diff <= np.finfo(np.float32).eps
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.where(l < 0.5, diff / (vmax + vmin), diff / (2 - vmax - vmin))
+        scale = np.float32(60) / diff
+        h = np.where(
+            vmax == r,
+            (g - b) * scale,
+            np.where(vmax == g, (b - r) * scale + 120, (r - g) * scale + 240),
+        )
+    h = np.where(h < 0, h + 360, h)
+    hls = np.stack((np.where(grey, 0, h) / 2, l * 255, np.where(grey, 0, s) * 255), -1)
+    return np.clip(np.rint(hls), 0, 255).astype(np.uint8)
+
+
+def hls_to_rgb(hls):
+    # Back again, like OpenCV's COLOR_HLS2RGB
+    hls = hls.astype(np.float32)
+    h = hls[..., 0] * np.float32(2 / 60)
+    l = hls[..., 1] * np.float32(1 / 255)
+    s = hls[..., 2] * np.float32(1 / 255)
+    p2 = np.where(l <= 0.5, l * (1 + s), l + s - l * s)
+    p1 = 2 * l - p2
+    h = np.where(h >= 6, h - 6, h)
+    sector = np.floor(h).astype(np.intp)
+    h -= sector
+    table = np.stack((p2, p1, p1 + (p2 - p1) * (1 - h), p1 + (p2 - p1) * h), -1)
+    rgb = np.take_along_axis(table, SECTORS[sector], axis=-1)[..., ::-1]
+    rgb = np.where((s == 0)[..., None], l[..., None], rgb)
+    return np.clip(np.rint(rgb * 255), 0, 255).astype(np.uint8)
+
+
+def shade_tables(target_color):
+    # New hue, lightness and saturation for each old value, for a frog of
+    # target_color (RGB), the same sums as rotate_colors.recolor()
+    target_hue, target_lightness, target_saturation = (
+        int(value) for value in rgb_to_hls(np.uint8([target_color]))[0]
+    )
+    values = np.arange(256)
+    return np.stack(
+        (
+            np.mod(values + SOURCE_HUE - target_hue, 180),
+            np.clip(values * (target_lightness / SOURCE_LIGHTNESS), 0, 255),
+            np.clip(values * (target_saturation / 255), 0, 255),
+        ),
+        -1,
+    ).astype(np.uint8)
+
+
+def load_sources(frames, scale=SPRITE_SCALE):
+    # Loads and scales the original green frames. Returns {(frame,
+    # facing_left): (HLS of each color in the frame, which of them each
+    # pixel is, alpha)}. Pixel arrays are in surfarray's x, y order. Frames
+    # have about a tenth as many colors as pixels, so only the colors are
+    # shaded.
+    sources = {}
+    for frame in frames:
+        image = pygame.image.load(
+            os.path.join(SPRITE_FOLDER, os.path.basename(frame))
+        ).convert_alpha()
+        for facing_left in (False, True):
+            surface = image
+            if facing_left:  # flip the image
+                surface = pygame.transform.flip(surface, True, False)
+            surface = pygame.transform.scale(
+                surface,
+                (int(surface.get_width() * scale), int(surface.get_height() * scale)),
+            )
+            # rotate_colors.py worked on OpenCV's BGR pixels as if they were
+            # RGB, the hue is worked out the same way to get the same colors
+            rgb = pygame.surfarray.array3d(surface)[..., ::-1].astype(np.int32)
+            packed = rgb[..., 0] << 16 | rgb[..., 1] << 8 | rgb[..., 2]
+            colors, pixels = np.unique(packed, return_inverse=True)
+            colors = np.stack((colors >> 16, colors >> 8 & 0xFF, colors & 0xFF), -1)
+            sources[(frame, facing_left)] = (
+                rgb_to_hls(colors),
+                pixels.reshape(packed.shape).astype(np.uint16),
+                pygame.surfarray.array_alpha(surface),
+            )
+    return sources
+
+
+class SpriteAtlas:
+    # Holds every frog frame for every color in use and facing direction,
+    # so animating a frog is only a dict lookup.
+    #
+    # sources are the original green frames from load_sources(), or from
+    # the asset bundle. A color's frames are shaded from them the first time
+    # a frog of that color is drawn in that frame, with NumPy on the frame's
+    # HLS colors, so any color works without a PNG for it.
+    def __init__(self, sources, max_colors=MAX_COLORS):
+        self.max_colors = max_colors
+        self.sources = sources
+        # color -> {(frame, facing_left): surface}, least recently drawn first
+        self.colors = OrderedDict()
+        # color -> shade_tables(), kept while the color's frames are
+        self.tables = {}
+        # Colors on screen, never dropped even past max_colors, see pin()
+        self.pinned = frozenset()
+        # Surfaces cached and bytes of pixel data they hold, kept as they
+        # change so /metrics can read them while the render thread draws
+        self.surface_count = 0
+        self.bytes = 0
+
+    def get(self, frame, color, facing_left=False):
+        surfaces = self.colors.get(color)
+        if surfaces is None:
+            surfaces = self.colors[color] = {}
+            rgb = color_rgb(color) or (0, 255, 0)
+            self.tables[color] = shade_tables(rgb)
+            self.trim()
+        else:
+            self.colors.move_to_end(color)
+        surface = surfaces.get((frame, facing_left))
+        if surface is None:
+            surface = surfaces[(frame, facing_left)] = self.shade(
+                frame, self.tables[color], facing_left
+            )
+            self.surface_count += 1
+            self.bytes += surface_bytes(surface)
+        return surface
+
+    def pin(self, colors):
+        # colors are the ones about to be drawn. With more of them than
+        # max_colors they'd push each other out and be shaded again every
+        # frame, so they're kept, and the atlas shrinks back to max_colors as
+        # they leave the screen.
+        self.pinned = colors
+        self.trim()
+
+    def trim(self):
+        # Drops the least recently drawn colors that aren't pinned until
+        # there are max_colors
+        while len(self.colors) > self.max_colors:
+            for color in self.colors:
+                if color not in self.pinned:
+                    break
+            else:
+                return
+            surfaces = self.colors.pop(color)
+            del self.tables[color]
+            self.surface_count -= len(surfaces)
+            self.bytes -= sum(map(surface_bytes, surfaces.values()))
+
+    def bound(self):
+        # Most colors kept right now
+        return max(self.max_colors, len(self.pinned))
+
+    def shade(self, frame, tables, facing_left):
+        hls, pixels, alpha = self.sources[(frame, facing_left)]
+        shaded = np.stack(
+            [tables[hls[:, channel], channel] for channel in range(3)], -1
+        )
+        surface = pygame.Surface(alpha.shape, pygame.SRCALPHA)
+        pygame.surfarray.blit_array(surface, hls_to_rgb(shaded)[pixels, ::-1])
+        pygame.surfarray.pixels_alpha(surface)[...] = alpha
+        return surface.convert_alpha()
+
+    def memory_usage(self):
+        # Bytes of pixel data held by the cached surfaces
+        return self.bytes
+
+    def metrics(self):
+        return {
+            "colors": len(self.colors),
+            "max_colors": self.max_colors,
+            "bound": self.bound(),
+            "surfaces": self.surface_count,
+            "bytes": self.bytes,
+        }
+
+    def report(self):
+        return (
+            f"Sprite atlas: {len(self.sources) // 2} frames, {len(self.colors)} colors, "
+            f"{self.surface_count} surfaces, {self.bytes / 1024:.1f} KiB"
+        )
+
+
+def surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
@@ -0,0 +1,176 @@
+import io
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+from PIL import Image
+
+from profiling import percentile
+from settings import WINDOW_HEIGHT, WINDOW_WIDTH
+
+# Size of the streamed frames, half the window each way
+STREAM_SIZE = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+# Most frames per second sent to viewers
+STREAM_FPS = 30
+JPEG_QUALITY = 70
+# Encoder threads. Pillow lets go of the GIL while it encodes, so they run
+# alongside the render thread.
+ENCODE_WORKERS = 2
+# Frames that can be waiting for or being encoded at once
+RING_SLOTS = 4
+# How many recent encode times to keep for the percentiles
+ENCODE_SAMPLES = 300
+BOUNDARY = "frame"
+MIMETYPE = f"multipart/x-mixed-replace; boundary={BOUNDARY}"
+
+
+class FrameStream:
+    # Streams the game window to browsers as MJPEG.
+    #
+    # The render thread scales the screen into a free slot of a ring of
+    # surfaces and hands the slot to an encoder thread, which reads the
+    # slot's pixels straight from the surface's buffer. When every slot is
+    # still being encoded, or a frame was captured less than an encode time
+    # ago, the frame is skipped, so the game never waits on the encoders.
+    # Viewers always get the newest encoded frame, a slow viewer only slows
+    # itself down.
+    def __init__(
+        self,
+        size=STREAM_SIZE,
+        fps=STREAM_FPS,
+        quality=JPEG_QUALITY,
+        workers=ENCODE_WORKERS,
+        slots=RING_SLOTS,
+    ):
+        self.size = size
+        self.fps = fps
+        self.quality = quality
+        self.workers = workers
+        self.slot_count = slots
+        # Made on the first capture, with the same pixel format as the screen
+        self.slots = None
+        self.rawmode = None
+        self.free = deque()
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="stream-encode")
+
+        self.lock = threading.Lock()
+        # Newest encoded frame and the capture number it came from. Encoders
+        # can finish out of order, an older frame never replaces a newer one.
+        self.frame = None
+        self.frame_number = 0
+        self.captures = 0
+        self.next_capture = 0.0
+        self.viewers = 0
+        self.closed = False
+
+        self.skipped = 0
+        self.encoded = 0
+        self.bytes_encoded = 0
+        self.encode_times = deque(maxlen=ENCODE_SAMPLES)
+        # Rolling average, sets how often frames are captured
+        self.encode_seconds = 0.0
+
+    def capture(self, screen):
+        # Called by the render thread after drawing a frame
+        if not self.viewers:
+            return
+        now = time.perf_counter()
+        if now < self.next_capture:
+            return
+        if self.slots is None:
+            self.slots = [
+                pygame.Surface(self.size, 0, screen) for _ in range(self.slot_count)
+            ]
+            self.free.extend(range(self.slot_count))
+            # Surface pixels are 32 bit words, little endian in memory
+            self.rawmode = "BGRX" if screen.get_masks()[0] == 0xFF0000 else "RGBX"
+        if not self.free:
+            self.skipped += 1
+            return
+
+        slot = self.free.popleft()
+        pygame.transform.scale(screen, self.size, self.slots[slot])
+        self.captures += 1
+        self.pool.submit(self.encode, slot, self.captures)
+        # Don't capture faster than the encoders can keep up with. Counted
+        # from when this capture was due, so game frames that don't line up
+        # with the interval don't lower the rate.
+        interval = max(1 / self.fps, self.encode_seconds / self.workers)
+        self.next_capture = max(self.next_capture + interval, now)
+
+    def encode(self, slot, number):
+        start = time.perf_counter()
+        try:
+            image = Image.frombuffer(
+                "RGB",
+                self.size,
+                self.slots[slot].get_buffer(),
+                "raw",
+                self.rawmode,
+                0,
+                1,
+            )
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=self.quality)
+        finally:
+            self.free.append(slot)
+        frame = buffer.getvalue()
+
+        seconds = time.perf_counter() - start
+        with self.lock:
+            if number > self.frame_number:
+                self.frame = frame
+                self.frame_number = number
+            self.encoded += 1
+            self.bytes_encoded += len(frame)
+            self.encode_times.append(seconds)
+            self.encode_seconds += (seconds - self.encode_seconds) * 0.1
+
+    def mjpeg(self, sleep):
+        # Response body for one viewer. sleep is socketio.sleep, which
+        # yields to the other green threads in eventlet/gevent mode.
+        with self.lock:
+            self.viewers += 1
+        try:
+            sent = 0
+            while not self.closed:
+                with self.lock:
+                    frame = self.frame
+                    number = self.frame_number
+                if number == sent:
+                    sleep(0.5 / self.fps)
+                    continue
+                sent = number
+                yield (
+                    f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                    f"Content-Length: {len(frame)}\r\n\r\n"
+                ).encode() + frame + b"\r\n"
+        finally:
+            with self.lock:
+                self.viewers -= 1
+
+    def metrics(self):
+        with self.lock:
+            times = list(self.encode_times)
+            return {
+                "viewers": self.viewers,
+                "captured": self.captures,
+                "skipped": self.skipped,
+                "encoded": self.encoded,
+                "bytes_encoded": self.bytes_encoded,
+                "capture_interval_ms": max(
+                    1 / self.fps, self.encode_seconds / self.workers
+                )
+                * 1000,
+                "encode_ms": {
+                    "p50": percentile(times, 0.5) * 1000,
+                    "p99": percentile(times, 0.99) * 1000,
+                },
+            }
+
+    def close(self):
+        # Also ends the viewers' responses
+        self.closed = True
+        self.pool.shutdown(wait=True)
@@ -0,0 +1,161 @@
+import math
+import random
+
+from settings import GROUND_HEIGHT, MAPCOMPONENTS, WINDOW_HEIGHT, WINDOW_WIDTH
+from simulation import GRAVITY, JUMP_SPEED, LANDING_DEPTH, MapComponent
+
+
+def jump_height():
+    # How high a jump gets, moving the way Player.update() does: whole
+    # pixels per tick, with gravity added after each move
+    height = 0
+    velocity = -JUMP_SPEED
+    while velocity < 0:
+        height -= int(velocity)
+        velocity += GRAVITY
+    return height
+
+
+GROUND_TOP = WINDOW_HEIGHT - 50
+# Room to get the frog's feet over the edge of the next platform
+CLEARANCE = 40
+# Highest a platform can be above the last one, 206 pixels
+MAX_RISE = jump_height() - LANDING_DEPTH - CLEARANCE
+JITTER = 10
+ROW_SPACING = MAX_RISE - 2 * JITTER
+# Widest sideways gap between one platform and the next. Frogs move about 15
+# pixels a tick sideways, and a jump that rises the full MAX_RISE still
+# lands 300 pixels out.
+MAX_GAP = 240
+
+# The path zig-zags either side of a line that drifts slowly from side to
+# side. Even rows are left of the line, odd rows right, and each platform's
+# edge nearest the line is INNER pixels from it, so consecutive platforms
+# are 150 to 230 pixels apart sideways. The platform two rows up sticks out
+# at most 60 pixels past the edge a frog jumps from, and is high enough that
+# the frog is out from under it before its head gets there.
+#
+# The line starts at the spawn point moving right, so no platform is built
+# where new frogs appear.
+INNER = 95
+OFFSET = 10
+DRIFT = 300
+# Rows per drift from side to side and back, picked by the seed
+PERIODS = (96, 192)
+PATH_WIDTHS = (160, 240)
+THICKNESS = (20, 40)
+# Ledges off the path, far enough out that they never block it
+LEDGE_CHANCE = 0.4
+LEDGE_DISTANCE = (380, 700)
+LEDGE_WIDTHS = (100, 160)
+
+# Build this far above the highest frog and keep this far below the lowest
+AHEAD = 2 * WINDOW_HEIGHT
+BEHIND = WINDOW_HEIGHT
+# Platforms the tower ever uses, a path platform and up to two ledges a row
+POOL_SIZE = 192
+PLATFORMS_PER_ROW = 3
+# Rows built per update, so climbing into new rows never builds many at once
+ROWS_PER_UPDATE = 4
+
+
+def row_platforms(row, seed, period):
+    # [(x, y, width, height, texture)] of one row, the path platform first.
+    # Only depends on the seed and the row, so a row can be built again the
+    # same after it was retired.
+    if row == 0:
+        return [(0, GROUND_TOP, WINDOW_WIDTH, GROUND_HEIGHT, MAPCOMPONENTS[0])]
+
+    rng = random.Random(f"{seed}/{row}")
+    y = GROUND_TOP - row * ROW_SPACING + rng.randint(-JITTER, JITTER)
+    drift = WINDOW_WIDTH / 2 + DRIFT * math.sin(2 * math.pi * row / period)
+    inner = INNER + rng.randint(-OFFSET, OFFSET)
+    width = rng.randrange(PATH_WIDTHS[0], PATH_WIDTHS[1] + 1, 10)
+    height = rng.randrange(THICKNESS[0], THICKNESS[1] + 1, 10)
+    x = drift + inner if row % 2 else drift - inner - width
+    platforms = [(round(x), y, width, height, rng.choice(MAPCOMPONENTS))]
+
+    for side in (-1, 1):
+        if rng.random() < LEDGE_CHANCE:
+            width = rng.randrange(LEDGE_WIDTHS[0], LEDGE_WIDTHS[1] + 1, 10)
+            distance = rng.randint(*LEDGE_DISTANCE)
+            # distance is to the edge nearest the path
+            x = drift + distance if side > 0 else drift - distance - width
+            platforms.append((round(x), y, width, height, rng.choice(MAPCOMPONENTS)))
+    return platforms
+
+
+def row_at(y):
+    return (GROUND_TOP - y) // ROW_SPACING
+
+
+class TowerGenerator:
+    # Endless tower, built a few rows at a time above the highest frog and
+    # taken down far below the lowest. Platforms come from a fixed pool, so
+    # memory stays the same however high the frogs get.
+    #
+    # Has the same update() as MapStreamer and runs on the game thread.
+    def __init__(self, simulation, seed=0, pool_size=POOL_SIZE):
+        self.simulation = simulation
+        self.seed = seed
+        self.period = random.Random(seed).randint(*PERIODS)
+        self.pool = [
+            MapComponent(0, 0, None, 0, 0, MAPCOMPONENTS[0]) for _ in range(pool_size)
+        ]
+        # Rows kept when the frogs are spread further apart than this, the
+        # ones nearest the highest frog win. Leaves room for the row of
+        # slack at either end.
+        self.max_rows = pool_size // PLATFORMS_PER_ROW - 2
+        # row -> [components]
+        self.rows = {}
+        self.builds = 0
+        self.retires = 0
+
+    def wanted_rows(self):
+        players = self.simulation.players.values()
+        if players:
+            top = min(player.rect.top for player in players)
+            bottom = max(player.rect.bottom for player in players)
+        else:
+            # Where new frogs spawn
+            top = bottom = WINDOW_HEIGHT // 2
+        highest = row_at(top - AHEAD) + 1
+        lowest = max(0, row_at(bottom + BEHIND), highest - self.max_rows + 1)
+        return lowest, highest
+
+    def update(self, rows_per_update=ROWS_PER_UPDATE):
+        lowest, highest = self.wanted_rows()
+        # One row of slack, so a frog bouncing on a row doesn't build and
+        # retire the one below it over and over
+        for row in list(self.rows):
+            if row < lowest - 1 or row > highest + 1:
+                self.retire(row)
+
+        # Bottom up, so the rows under the frogs come first
+        built = 0
+        for row in range(lowest, highest + 1):
+            if built == rows_per_update:
+                break
+            if row not in self.rows:
+                self.build(row)
+                built += 1
+
+    def build(self, row):
+        components = []
+        for i, (x, y, width, height, texture) in enumerate(
+            row_platforms(row, self.seed, self.period)
+        ):
+            component = self.pool.pop()
+            component.rect.update(x, y, width, height)
+            component.texture = texture
+            # Ordered by height, the same however the rows were built
+            self.simulation.add_map_component(component, row * PLATFORMS_PER_ROW + i)
+            components.append(component)
+        self.rows[row] = components
+        self.builds += 1
+
+    def retire(self, row):
+        for component in self.rows.pop(row):
+            self.simulation.remove_map_component(component)
+            self.pool.append(component)
+        self.retires += 1